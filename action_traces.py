@@ -0,0 +1,178 @@
+"""
+商品ごとのカート追加アクションの記録と再生
+
+エージェントの実行履歴を record_product_page の呼び出しごとに区切り、商品ごとの
+アクション列（移動・クリック・数量入力など）として保存します。次回以降は保存した
+アクション列を LLM を使わずにそのまま再生し、失敗した商品だけをエージェントに任せます。
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Iterable, List, Optional
+
+from product_cache import normalize_product_name
+
+# 再生するとLLMが必要になる、または再生してはいけないアクション
+UNREPLAYABLE_ACTIONS = {"extract", "report_product_unavailable"}
+
+
+def _action_names(history_item: Any) -> List[str]:
+    """履歴の1ステップに含まれるアクション名の一覧"""
+    if not history_item.model_output or not history_item.model_output.action:
+        return []
+    names = []
+    for action in history_item.model_output.action:
+        if action is None:
+            continue
+        names.extend(action.model_dump(exclude_unset=True).keys())
+    return names
+
+
+class ActionTraceStore:
+    """
+    商品ごとのアクション列をJSONファイルとして保存するストア
+
+    Attributes:
+        directory: アクション列を保存するディレクトリ
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.path.join(os.getcwd(), "action_traces")
+
+    def _path(self, product: str) -> str:
+        """商品に対応するファイルのパス"""
+        digest = hashlib.sha256(normalize_product_name(product).encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def has(self, product: str) -> bool:
+        """商品のアクション列が保存されているか"""
+        return os.path.exists(self._path(product))
+
+    def load(self, product: str, output_model: Any) -> Optional[Any]:
+        """
+        保存したアクション列を読み込む
+
+        Args:
+            product: 商品名
+            output_model: エージェントの出力モデル（agent.AgentOutput）
+
+        Returns:
+            AgentHistoryList。存在しない・読み込めない場合はNone
+        """
+        from browser_use.agent.views import AgentHistoryList
+
+        try:
+            return AgentHistoryList.load_from_file(self._path(product), output_model)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # 形式が変わったなど読み込めないものは捨てて記録し直す
+            self.invalidate(product)
+            return None
+
+    def save(self, product: str, history_items: Iterable[Any], secrets: Iterable[str] = ()) -> bool:
+        """
+        商品のアクション列を保存
+
+        Args:
+            product: 商品名
+            history_items: 保存する履歴ステップ（AgentHistory）
+            secrets: 記録に含まれていてはいけない文字列（パスワードなど）
+
+        Returns:
+            bool: 保存した場合True（再生できないステップや秘密情報を含む場合は保存しない）
+        """
+        from browser_use.agent.views import AgentHistoryList
+
+        items = []
+        for item in history_items:
+            names = _action_names(item)
+            if not names:
+                continue
+            if UNREPLAYABLE_ACTIONS.intersection(names):
+                return False
+            # すべてのアクションが失敗したステップは再生しても意味がない
+            if item.result and all(r.error for r in item.result):
+                continue
+            items.append(item)
+        if not items:
+            return False
+
+        data = AgentHistoryList(history=items).model_dump()
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+        if any(secret and secret in text for secret in secrets):
+            return False
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(product)
+        # 一時ファイル名は書き込みごとに変える（同じ商品を並行して保存しても混ざらない）
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return True
+
+    def invalidate(self, product: str) -> None:
+        """商品のアクション列を削除"""
+        try:
+            os.remove(self._path(product))
+        except FileNotFoundError:
+            pass
+
+
+class TraceRecorder:
+    """
+    エージェントの on_step_end フックとして使い、商品ごとのアクション列を記録する
+
+    record_product_page が呼ばれたステップまでを、その商品のアクション列として保存します。
+    """
+
+    def __init__(self, store: ActionTraceStore, secrets: Iterable[str] = ()):
+        self.store = store
+        self.secrets = list(secrets)
+        self.recorded: List[str] = []
+        self._segment_start = 0
+
+    async def on_step_end(self, agent: Any) -> None:
+        """ステップ終了ごとに呼ばれ、商品の区切りを検出したら保存する"""
+        history = agent.history.history
+        if not history or not history[-1].model_output:
+            return
+
+        for action in history[-1].model_output.action:
+            if action is None:
+                continue
+            params = action.model_dump(exclude_unset=True).get("record_product_page")
+            if not params:
+                continue
+            product = params.get("product_name", "")
+            if product and self.store.save(product, history[self._segment_start:], self.secrets):
+                self.recorded.append(product)
+            self._segment_start = len(history)
+            break
+
+
+async def replay_trace(agent: Any, history: Any, delay: float = 1.0) -> None:
+    """
+    保存したアクション列を LLM を使わずに再生する
+
+    要素が見つからない・アクションがエラーになった場合は例外を送出します。
+
+    Args:
+        agent: 再生に使うエージェント（ブラウザとツールの設定のみ使用）
+        history: ActionTraceStore.load() で読み込んだ AgentHistoryList
+        delay: ステップ間の待ち時間（秒）
+    """
+    for item in history.history:
+        if not _action_names(item):
+            continue
+        results = await agent._execute_history_step(item, delay)
+        errors = [r.error for r in results if r.error]
+        if errors:
+            raise RuntimeError(errors[0])
@@ -0,0 +1,185 @@
+"""
+常駐型の音声再生ワーカー
+
+再生用のスレッドを1本だけ常駐させ、PyAudio の出力ストリームを開いたまま
+キューに積まれたWAVを順番に再生します。WAVは wave / NumPy でプロセス内で
+デコードするため、クリップごとに ffmpeg や外部プレーヤーを起動しません。
+新しい応答が届いたときや録音を始めるときは cancel() で再生中・再生待ちの音声を止めます。
+"""
+
+import io
+import queue
+import threading
+import time
+import wave
+from typing import Callable, Optional, Tuple, Union
+
+import numpy as np
+
+# 1回の書き込みで再生するフレーム数（cancel() が効くまでの最大遅延の目安）
+WRITE_FRAMES = 1024
+
+
+def decode_wav(data: Union[bytes, io.BytesIO]) -> Tuple[bytes, int, int]:
+    """
+    WAVを16bit PCMにデコードする
+
+    Args:
+        data: WAVデータ
+
+    Returns:
+        (PCMデータ, サンプリングレート, チャンネル数)
+    """
+    if isinstance(data, (bytes, bytearray)):
+        data = io.BytesIO(data)
+    data.seek(0)
+    with wave.open(data, "rb") as w:
+        channels = w.getnchannels()
+        rate = w.getframerate()
+        width = w.getsampwidth()
+        frames = w.readframes(w.getnframes())
+
+    # 出力ストリームを開き直さずに済むよう、すべて16bitに揃える
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.int16) - 128) << 8
+    elif width == 2:
+        return frames, rate, channels
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        samples = (raw[:, 1].astype(np.int16) | (raw[:, 2].astype(np.int16) << 8))
+    elif width == 4:
+        samples = (np.frombuffer(frames, dtype=np.int32) >> 16).astype(np.int16)
+    else:
+        raise ValueError(f"未対応のサンプル幅です: {width}")
+    return samples.astype(np.int16).tobytes(), rate, channels
+
+
+class AudioPlayer:
+    """
+    キューに積まれたWAVを順番に再生する常駐ワーカー
+
+    Attributes:
+        last_start_latency: 直近のクリップがキューに積まれてから再生が始まるまでの秒数
+    """
+
+    def __init__(self, callback: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            callback: ログメッセージ用のコールバック関数
+        """
+        self.callback = callback
+        self.last_start_latency: Optional[float] = None
+
+        self._queue: "queue.Queue[Tuple[int, bytes, float]]" = queue.Queue()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._pyaudio = None
+        self._stream = None
+        self._stream_format: Optional[Tuple[int, int]] = None
+        self._playing = False
+        self._idle = True
+        self._thread = threading.Thread(target=self._run, name="AudioPlayback", daemon=True)
+        self._thread.start()
+
+    def log(self, message: str) -> None:
+        """ログメッセージをコールバック経由で送信"""
+        if self.callback:
+            self.callback(message)
+
+    @property
+    def queue_depth(self) -> int:
+        """再生待ちのクリップ数（再生中のものを含む）"""
+        return self._queue.qsize() + (1 if self._playing else 0)
+
+    def enqueue(self, audio: Union[bytes, io.BytesIO]) -> None:
+        """
+        WAVを再生キューに積む（すぐに戻る）
+
+        Args:
+            audio: WAVデータ
+        """
+        data = audio.getvalue() if isinstance(audio, io.BytesIO) else bytes(audio)
+        with self._lock:
+            generation = self._generation
+        self._queue.put((generation, data, time.perf_counter()))
+
+    def cancel(self) -> None:
+        """再生中のクリップを止め、再生待ちのクリップを破棄する"""
+        with self._lock:
+            self._generation += 1
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        キューが空になり再生が終わるまで待つ
+
+        Returns:
+            bool: 時間内に再生が終わった場合True
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self.queue_depth:
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+            time.sleep(0.02)
+        return True
+
+    def _open_stream(self, rate: int, channels: int) -> None:
+        """出力ストリームを開く（同じ形式なら開いたままのものを使う）"""
+        if self._stream is not None and self._stream_format == (rate, channels):
+            return
+        import pyaudio
+
+        if self._pyaudio is None:
+            self._pyaudio = pyaudio.PyAudio()
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+        self._stream = self._pyaudio.open(format=pyaudio.paInt16, channels=channels, rate=rate, output=True)
+        self._stream_format = (rate, channels)
+
+    def _run(self) -> None:
+        """キューからクリップを取り出して再生する（専用スレッド）"""
+        while True:
+            generation, data, enqueued_at = self._queue.get()
+            if generation != self._generation:
+                continue
+            self._playing = True
+            try:
+                pcm, rate, channels = decode_wav(data)
+                self._open_stream(rate, channels)
+
+                self.last_start_latency = time.perf_counter() - enqueued_at
+                # 連続して再生するクリップの先頭だけログに出す
+                if self._idle:
+                    self.log(f"音声再生開始（待ち時間 {self.last_start_latency * 1000:.0f}ms, 再生待ち {self._queue.qsize()} 件）")
+                    self._idle = False
+
+                step = WRITE_FRAMES * channels * 2
+                for offset in range(0, len(pcm), step):
+                    if generation != self._generation:
+                        break
+                    self._stream.write(pcm[offset:offset + step])
+            except Exception as e:
+                self.log(f"音声再生エラー: {str(e)}")
+            finally:
+                self._playing = False
+                if self._queue.empty():
+                    self._idle = True
+
+    def close(self) -> None:
+        """再生を止めて出力ストリームを閉じる"""
+        self.cancel()
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+        if self._pyaudio is not None:
+            self._pyaudio.terminate()
+            self._pyaudio = None
@@ -0,0 +1,83 @@
+"""
+録音データのアップロード準備のベンチマーク
+
+変更前の「一時ファイルに WAV を書き、開き直して読み、削除する」方式と、
+メモリ上で WAV / FLAC にする方式の所要時間とサイズを比較します。
+音声は実際の発話に近いよう、雑音に音節ごとの音を重ねたものを使います。
+FLAC は soundfile がインストールされている場合のみ計測します。
+
+    python benchmarks/bench_audio_upload.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_encoding import encode_flac, encode_wav  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+
+def make_speech_like(seconds, rng):
+    """音節（0.15秒程度）ごとに高さの変わる音と雑音を重ねた16bit PCM"""
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    pitch = 150 + 80 * np.repeat(rng.random(len(t) // 2400 + 1), 2400)[:len(t)]
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2
+    signal = 4000 * envelope * np.sin(2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE)
+    signal += rng.normal(0, 200, len(t))
+    return np.clip(signal, -32768, 32767).astype(np.int16).tobytes()
+
+
+def via_temp_file(pcm):
+    """変更前の方式：一時ファイルに書いて読み直す"""
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
+        path = temp_file.name
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(pcm)
+    with open(path, "rb") as f:
+        data = f.read()
+    os.remove(path)
+    return data
+
+
+def bench(func, pcm, repeat=20):
+    """(1回あたりのミリ秒, 出力のバイト数)"""
+    best = float("inf")
+    data = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        data = func(pcm)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, len(data)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    methods = [
+        ("一時ファイル WAV", via_temp_file),
+        ("メモリ WAV", lambda pcm: encode_wav(pcm, SAMPLE_RATE)),
+    ]
+    if encode_flac(b"\0\0" * 160, SAMPLE_RATE) is not None:
+        methods.append(("メモリ FLAC", lambda pcm: encode_flac(pcm, SAMPLE_RATE)))
+    else:
+        print("soundfile がないため FLAC は計測しません")
+
+    print(f"{'発話(秒)':>8} {'方式':<14} {'時間(ms)':>10} {'サイズ(KB)':>12}")
+    for seconds in (3, 8):
+        pcm = make_speech_like(seconds, rng)
+        for name, func in methods:
+            elapsed, size = bench(func, pcm)
+            print(f"{seconds:>8} {name:<14} {elapsed:>10.2f} {size / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
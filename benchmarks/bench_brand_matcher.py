@@ -0,0 +1,98 @@
+"""
+ブランドマッピング検索のマイクロベンチマーク
+
+従来の線形走査（完全一致→部分一致の2回走査）と BrandMatcher を、
+数千件のマッピングで比較します。
+
+    python benchmarks/bench_brand_matcher.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brand_matcher import BrandMatcher  # noqa: E402
+
+KANA = "アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワン"
+BASE_ITEMS = ["牛乳", "食パン", "卵", "コーヒー", "ヨーグルト", "納豆", "豆腐", "バター", "チーズ", "ハム"]
+
+
+def linear_lookup(brand_map, product_name):
+    """変更前の get_preferred_brand と同じ線形走査"""
+    if not product_name:
+        return None
+    low = product_name.lower()
+    for k, v in brand_map.items():
+        if k.lower() == low:
+            return v
+    for k, v in brand_map.items():
+        if k.lower() in low:
+            return v
+    return None
+
+
+def make_mapping(size, rng):
+    """ランダムなキーワード → ブランドの対応表を作る"""
+    mapping = {item: f"ブランド{i}" for i, item in enumerate(BASE_ITEMS)}
+    while len(mapping) < size:
+        word = "".join(rng.choice(KANA) for _ in range(rng.randint(3, 8)))
+        mapping[word] = f"ブランド{len(mapping)}"
+    return mapping
+
+
+def make_queries(count, rng):
+    """よくある商品名（ヒットするもの・しないもの）を作る"""
+    queries = []
+    for _ in range(count):
+        prefix = "".join(rng.choice(KANA) for _ in range(rng.randint(0, 4)))
+        queries.append(prefix + rng.choice(BASE_ITEMS + ["キャベツ", "にんじん", "トマト"]))
+    return queries
+
+
+def bench(func, queries, repeat=3):
+    """1回あたりの平均時間（マイクロ秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for q in queries:
+            func(q)
+        best = min(best, time.perf_counter() - started)
+    return best / len(queries) * 1e6
+
+
+def main():
+    rng = random.Random(0)
+    queries = make_queries(2000, rng)
+    print(f"{'件数':>8} {'線形走査(µs)':>14} {'BrandMatcher(µs)':>18} {'倍率':>8} {'構築(ms)':>10}")
+
+    for size in (100, 1000, 5000, 20000):
+        mapping = make_mapping(size, rng)
+
+        started = time.perf_counter()
+        matcher = BrandMatcher(mapping)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        # ヒットの有無が一致することを確認（複数一致時の選び方は方針が異なる）
+        for q in queries[:200]:
+            if (linear_lookup(mapping, q) is None) != (matcher.find(q) is None):
+                raise AssertionError(f"不一致: {q}")
+
+        linear = bench(lambda q: linear_lookup(mapping, q), queries)
+        indexed = bench(matcher.find, queries)
+        print(f"{size:>8} {linear:>14.2f} {indexed:>18.2f} {linear / indexed:>7.1f}x {build_ms:>10.1f}")
+
+    # 増分更新のコスト（1件追加してから次の検索まで。作り直しの償却分を含む）
+    mapping = make_mapping(20000, rng)
+    matcher = BrandMatcher(mapping)
+    started = time.perf_counter()
+    for i in range(100):
+        matcher.add(f"追加キーワード{i}", "追加ブランド")
+        matcher.find(queries[i])
+    print(f"20000件に1件追加 + 検索: {(time.perf_counter() - started) / 100 * 1000:.2f} ms/回")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+起動時間のベンチマーク
+
+モジュールごとの読み込み時間（それぞれ新しいプロセスで計測）と、main.py の読み込みから
+最初の画面が描画されて操作できるようになるまでの時間を計測します。
+画面の計測にはディスプレイが必要です（ない場合は読み込み時間だけを表示します）。
+
+    python benchmarks/bench_startup.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (表示名, 読み込む文)
+MODULES = [
+    ("tkinter", "import tkinter"),
+    ("pydantic", "import pydantic"),
+    ("numpy", "import numpy"),
+    ("requests", "import requests"),
+    ("pyaudio", "import pyaudio"),
+    ("pydub", "import pydub"),
+    ("soundfile", "import soundfile"),
+    ("groq", "import groq"),
+    ("openai", "import openai"),
+    ("browser_use", "from browser_use import Agent, ChatGroq, Tools"),
+    ("shopping_session", "import shopping_session"),
+    ("main", "import main"),
+]
+
+IMPORT_SCRIPT = """
+import time
+started = time.perf_counter()
+{statement}
+print(time.perf_counter() - started)
+"""
+
+# 最初の画面を描画するまでと、バックグラウンドの読み込みが終わるまでを計測する
+FRAME_SCRIPT = """
+import json, os, time
+started = time.perf_counter()
+import tkinter as tk
+import main
+imported = time.perf_counter() - started
+root = tk.Tk()
+app = main.AINetSuperApp(root)
+root.update()
+first_frame = time.perf_counter() - started
+while not app.prewarmer.done:
+    root.update()
+    time.sleep(0.01)
+print(json.dumps({
+    "import_main": imported,
+    "first_frame": first_frame,
+    "prewarm_done": time.perf_counter() - started,
+    "prewarm_steps": app.prewarmer.timings,
+}))
+os._exit(0)
+"""
+
+
+def run_python(code, cwd, timeout=120):
+    """新しいプロセスで code を実行し、標準出力の最後の行を返す（失敗時はNone）"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env,
+                            capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0 or not result.stdout.strip():
+        return None
+    return result.stdout.strip().splitlines()[-1]
+
+
+def measure_import(statement, cwd, repeat=3):
+    """読み込み時間の最小値（ミリ秒）。読み込めなければNone"""
+    best = None
+    for _ in range(repeat):
+        output = run_python(IMPORT_SCRIPT.format(statement=statement), cwd)
+        if output is None:
+            return None
+        best = min(best or float("inf"), float(output) * 1000)
+    return best
+
+
+def main():
+    # main.py はカレントディレクトリにログやキャッシュを作るため、一時ディレクトリで実行する
+    with tempfile.TemporaryDirectory() as cwd:
+        print(f"{'モジュール':<18} {'読み込み(ms)':>12}")
+        for name, statement in MODULES:
+            elapsed = measure_import(statement, cwd)
+            text = "未インストール" if elapsed is None else f"{elapsed:.0f}"
+            print(f"{name:<18} {text:>12}")
+
+        if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+            print("\nディスプレイがないため、画面の描画までの時間は計測しません")
+            return
+
+        started = time.perf_counter()
+        output = run_python(FRAME_SCRIPT, cwd)
+        wall = time.perf_counter() - started
+        if output is None:
+            print("\n画面の起動に失敗しました")
+            return
+        result = json.loads(output)
+        print(f"\nmain.py の読み込み:          {result['import_main'] * 1000:.0f}ms")
+        print(f"最初の画面の描画まで:        {result['first_frame'] * 1000:.0f}ms"
+              f"（プロセス起動から {wall * 1000:.0f}ms 以内）")
+        print(f"バックグラウンドの読み込み完了: {result['prewarm_done'] * 1000:.0f}ms")
+        for step, seconds in result["prewarm_steps"].items():
+            print(f"  {step:<16} {seconds * 1000:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
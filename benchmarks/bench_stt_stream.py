@@ -0,0 +1,131 @@
+"""
+ストリーミング音声認識のベンチマーク
+
+Vosk サーバーの代わりにローカルで動く簡易サーバー（WebSocket とアップロード用の HTTP）を立て、
+録音が終わってから認識結果が返るまでの時間を、録音後にまとめて送る従来の方式と
+VoskStreamingClient で比較します。簡易サーバーは音声の長さ × REAL_TIME_FACTOR 秒かけて
+「認識」し、固定の文字列を返します。
+
+    python benchmarks/bench_stt_stream.py
+"""
+
+import io
+import json
+import os
+import sys
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from websockets.sync.server import serve
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stt_stream import VoskStreamingClient  # noqa: E402
+
+SAMPLE_RATE = 16000
+CHUNK = 1024
+# 認識にかかる時間（音声の長さに対する比）
+REAL_TIME_FACTOR = 0.3
+TRANSCRIPT = "牛乳 を 二 本 リスト に 追加 して"
+
+
+def recognize_cost(num_bytes):
+    """num_bytes の音声を認識するのにかかる秒数"""
+    return num_bytes / 2 / SAMPLE_RATE * REAL_TIME_FACTOR
+
+
+def ws_handler(websocket):
+    """vosk-server の asr_server.py と同じ要領で応答する"""
+    received = 0
+    words = TRANSCRIPT.split()
+    for message in websocket:
+        if isinstance(message, str):
+            if "eof" in message:
+                websocket.send(json.dumps({"text": TRANSCRIPT}))
+                break
+            continue  # config
+        time.sleep(recognize_cost(len(message)))
+        received += len(message)
+        shown = min(len(words), int(received / 2 / SAMPLE_RATE * 2))
+        websocket.send(json.dumps({"partial": " ".join(words[:shown])}))
+
+
+class UploadHandler(BaseHTTPRequestHandler):
+    """従来の /stt アップロードの代役（受け取った音声全体を認識してから返す）"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(recognize_cost(len(body)))
+        payload = json.dumps({"text": TRANSCRIPT}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def chunks(seconds):
+    """録音したことにする無音のチャンク"""
+    for _ in range(int(seconds * SAMPLE_RATE / CHUNK)):
+        yield b"\0\0" * CHUNK
+
+
+def run_upload(url, seconds):
+    """録音後にWAVをアップロード。録音終了から結果までの秒数"""
+    frames = []
+    for chunk in chunks(seconds):
+        time.sleep(CHUNK / SAMPLE_RATE)  # 録音の実時間
+        frames.append(chunk)
+    finished = time.perf_counter()
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(b"".join(frames))
+    buf.seek(0)
+    response = requests.post(url, files={"file": ("audio.wav", buf, "audio/wav")}, timeout=30)
+    assert response.json()["text"]
+    return time.perf_counter() - finished
+
+
+def run_streaming(url, seconds):
+    """録音しながら送信。(録音終了から結果までの秒数, 最初の途中結果までの秒数)"""
+    client = VoskStreamingClient(url, sample_rate=SAMPLE_RATE)
+    client.start()
+    for chunk in chunks(seconds):
+        time.sleep(CHUNK / SAMPLE_RATE)
+        client.send(chunk)
+    text = client.finish()
+    assert text
+    return client.final_latency, client.first_partial_time
+
+
+def main():
+    http_server = ThreadingHTTPServer(("127.0.0.1", 0), UploadHandler)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    upload_url = f"http://127.0.0.1:{http_server.server_address[1]}/stt"
+
+    ws_server = serve(ws_handler, "127.0.0.1", 0)
+    threading.Thread(target=ws_server.serve_forever, daemon=True).start()
+    ws_url = f"ws://127.0.0.1:{ws_server.socket.getsockname()[1]}"
+
+    print(f"認識速度: 実時間の {REAL_TIME_FACTOR} 倍")
+    print(f"{'発話(秒)':>8} {'従来: 結果まで(ms)':>20} {'ストリーミング: 結果まで(ms)':>28} {'最初の途中結果(ms)':>20}")
+    for seconds in (2, 4, 8):
+        upload = run_upload(upload_url, seconds)
+        streaming, first_partial = run_streaming(ws_url, seconds)
+        print(f"{seconds:>8} {upload * 1000:>20.0f} {streaming * 1000:>28.0f} {(first_partial or 0) * 1000:>20.0f}")
+
+    http_server.shutdown()
+    ws_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+一括音声合成のベンチマーク
+
+AivisSpeech の代わりにローカルで動く簡易 TTS サーバーを立て、変更前の
+threading_synthesis と同じ合成の仕方（テキスト数ぶんのスレッド・接続の使い捨て・
+全件の二重合成）と、tts_aivis.synthesize_batch を比較します。再生は行いません。
+
+    python benchmarks/bench_tts_batch.py
+"""
+
+import io
+import json
+import os
+import sys
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_aivis  # noqa: E402
+
+# 簡易サーバーの処理時間（秒）と同時に処理できる数（GPU 1枚程度を想定）
+QUERY_DELAY = 0.02
+SYNTHESIS_DELAY = 0.15
+SERVER_CAPACITY = 4
+
+TEXTS = [
+    "こんにちは！",
+    "牛乳をリストに追加しました。",
+    "他に必要な商品はありますか？",
+    "卵もリストに追加しました。",
+    "他に必要な商品はありますか？",
+    "食パンは明治のものを探します。",
+    "他に必要な商品はありますか？",
+    "注文処理を開始します。",
+]
+
+
+def make_wav(seconds=0.5, rate=24000):
+    """無音のWAVデータ"""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\0\0" * int(seconds * rate))
+    return buf.getvalue()
+
+
+class StandInTTSServer(ThreadingHTTPServer):
+    """/audio_query と /synthesis だけに応答する TTS サーバーの代役"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.wav = make_wav()
+        self.capacity = threading.Semaphore(SERVER_CAPACITY)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.connections = 0
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive を有効にする
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        with self.server.lock:
+            self.server.requests += 1
+
+        with self.server.capacity:
+            if self.path.startswith("/audio_query"):
+                time.sleep(QUERY_DELAY)
+                body, content_type = json.dumps({"accent_phrases": []}).encode(), "application/json"
+            else:
+                time.sleep(SYNTHESIS_DELAY)
+                body, content_type = self.server.wav, "audio/wav"
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def legacy_synthesis(url, text):
+    """変更前の create_synthesis（毎回新しい接続）"""
+    query = requests.post(f"{url}/audio_query", params={"text": text, "speaker": 1}).json()
+    response = requests.post(
+        f"{url}/synthesis",
+        params={"speaker": 1},
+        headers={"accept": "audio/wav", "Content-Type": "application/json"},
+        data=json.dumps(query),
+    )
+    return io.BytesIO(response.content)
+
+
+def run_legacy(url, texts):
+    """変更前の threading_synthesis の合成部分。(最初の1件までの秒数, 全体の秒数)"""
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=len(texts))
+    futures = [executor.submit(legacy_synthesis, url, text) for text in texts]
+    audio_ios = [future.result() for future in futures]
+    first = time.perf_counter() - started
+
+    # 結果を使わない二重合成
+    for text in texts:
+        thread = threading.Thread(target=legacy_synthesis, args=(url, text))
+        thread.start()
+    thread.join(5)
+    executor.shutdown()
+    assert len(audio_ios) == len(texts)
+    return first, time.perf_counter() - started
+
+
+def run_batch(url, texts):
+    """synthesize_batch。(最初の1件までの秒数, 全体の秒数)"""
+    started = time.perf_counter()
+    first = None
+    count = 0
+    for _ in tts_aivis.synthesize_batch(texts, url=url, speaker_id=1):
+        if first is None:
+            first = time.perf_counter() - started
+        count += 1
+    assert count == len(texts)
+    return first, time.perf_counter() - started
+
+
+def main():
+    server = StandInTTSServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    time.sleep(0.5)
+
+    print(f"テキスト {len(TEXTS)} 件（重複 {len(TEXTS) - len(set(TEXTS))} 件）, サーバー同時処理数 {SERVER_CAPACITY}")
+    print(f"{'方式':<16} {'最初の1件(ms)':>14} {'全体(ms)':>10} {'リクエスト':>10} {'接続':>6}")
+    for name, func in (("変更前", run_legacy), ("synthesize_batch", run_batch)):
+        time.sleep(0.5)  # 二重合成の後始末を待つ
+        server.reset()
+        first, total = func(server.url, TEXTS)
+        time.sleep(0.5)
+        print(f"{name:<16} {first * 1000:>14.0f} {total * 1000:>10.0f} {server.requests:>10} {server.connections:>6}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+ブランドマッピングの高速検索
+
+商品キーワード → 優先ブランドの対応表から、商品名に含まれるキーワードを
+Aho-Corasick 法で一度の走査で見つけます。キーワード数に関係なく、
+検索コストは商品名の長さに比例します。
+"""
+
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class _Automaton:
+    """キーワード集合から作る Aho-Corasick オートマトン（作成後は変更しない）"""
+
+    def __init__(self, keywords):
+        # トライ木（ノード番号ごとの遷移・失敗リンク・終端キーワード）
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.terminal: List[Optional[str]] = [None]
+        # 失敗リンクをたどって最初に見つかる終端ノード（出力リンク）
+        self.output: List[int] = [0]
+
+        for key in keywords:
+            node = 0
+            for ch in key:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.terminal.append(None)
+                    self.output.append(0)
+                node = nxt
+            self.terminal[node] = key
+
+        # 幅優先で失敗リンクと出力リンクを計算
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for ch, child in self.goto[node].items():
+                fail = self.fail[node]
+                while fail and ch not in self.goto[fail]:
+                    fail = self.fail[fail]
+                fail = self.goto[fail].get(ch, 0)
+                self.fail[child] = fail
+                self.output[child] = fail if self.terminal[fail] else self.output[fail]
+                queue.append(child)
+
+    def longest(self, text: str, removed: Set[str]) -> Optional[Tuple[int, int, str]]:
+        """
+        text に含まれる最長のキーワードを探す
+
+        Args:
+            text: 小文字化済みの商品名
+            removed: オートマトン作成後に削除されたキーワード（無視する）
+
+        Returns:
+            (長さ, 開始位置, キーワード)。なければNone
+        """
+        goto, fail, terminal, output = self.goto, self.fail, self.terminal, self.output
+        best = None
+        node = 0
+        for pos, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+
+            # この位置で終わるキーワードを長い順にたどる（削除済みは飛ばす）
+            hit = node if terminal[node] else output[node]
+            while hit and terminal[hit] in removed:
+                hit = output[hit]
+            # 同じ長さなら先に見つかった（商品名の前方にある）ものを優先
+            if hit and (best is None or len(terminal[hit]) > best[0]):
+                key = terminal[hit]
+                best = (len(key), pos - len(key) + 1, key)
+        return best
+
+
+class BrandMatcher:
+    """
+    商品名から優先ブランドを探すマルチパターン検索器
+
+    マッチングは大文字小文字を区別しません（大文字小文字だけが異なるキーワードは
+    同じものとして扱い、後から登録したものが優先されます）。
+    複数のキーワードが一致する場合は次の順で決定します。
+
+    1. 商品名とキーワードの完全一致
+    2. 商品名に含まれる最も長いキーワード
+    3. 同じ長さなら商品名の中で先に現れるキーワード
+
+    追加/削除はオートマトンを作り直さずに差分として保持し、差分が
+    rebuild_threshold 件を超えた時点でまとめて作り直します。
+    """
+
+    def __init__(self, mapping: Optional[Dict[str, str]] = None, rebuild_threshold: int = 32):
+        """
+        Args:
+            mapping: 商品キーワード → ブランド名の辞書
+            rebuild_threshold: オートマトンを作り直すまでに溜める追加/削除の件数
+        """
+        self.rebuild_threshold = rebuild_threshold
+        # 追加/削除（UIスレッド）と検索（AI応答スレッド）が並行するため
+        self._lock = threading.Lock()
+        self._brands: Dict[str, str] = {}
+        for keyword, brand in (mapping or {}).items():
+            if keyword:
+                self._brands[keyword.lower()] = brand
+
+        self._automaton = _Automaton(self._brands)
+        self._built: Set[str] = set(self._brands)
+        # オートマトン作成後の差分
+        self._added: Set[str] = set()
+        self._removed: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._brands)
+
+    def add(self, keyword: str, brand: str) -> None:
+        """
+        キーワードを追加/更新する
+
+        Args:
+            keyword: 商品キーワード
+            brand: 優先ブランド名
+        """
+        key = keyword.lower()
+        if not key:
+            return
+        with self._lock:
+            self._brands[key] = brand
+            if key in self._built:
+                self._removed.discard(key)
+            else:
+                self._added.add(key)
+
+    def remove(self, keyword: str) -> bool:
+        """
+        キーワードを削除する
+
+        Args:
+            keyword: 商品キーワード
+
+        Returns:
+            bool: キーワードが登録されていて削除した場合True
+        """
+        key = keyword.lower()
+        with self._lock:
+            if self._brands.pop(key, None) is None:
+                return False
+            if key in self._built:
+                self._removed.add(key)
+            else:
+                self._added.discard(key)
+            return True
+
+    def _rebuild(self) -> None:
+        """登録中のキーワードでオートマトンを作り直す（ロック取得済みで呼ぶ）"""
+        self._automaton = _Automaton(self._brands)
+        self._built = set(self._brands)
+        self._added = set()
+        self._removed = set()
+
+    def find(self, product_name: str) -> Optional[str]:
+        """
+        商品名に対する優先ブランドを返す
+
+        Args:
+            product_name: 商品名
+
+        Returns:
+            優先ブランド名。一致するキーワードがなければNone
+        """
+        match = self.find_keyword(product_name)
+        return self._brands.get(match) if match is not None else None
+
+    def apply(self, product_name: str) -> Tuple[str, Optional[str]]:
+        """
+        優先ブランドを付けた商品名を返す
+
+        Args:
+            product_name: 商品名
+
+        Returns:
+            (表示名, 優先ブランド名)。ブランドが商品名に含まれていれば表示名はそのまま、
+            一致するキーワードがなければ (商品名, None)
+        """
+        brand = self.find(product_name)
+        if brand and brand.lower() not in product_name.lower():
+            return f"{product_name}（{brand}）", brand
+        return product_name, brand
+
+    def find_keyword(self, product_name: str) -> Optional[str]:
+        """
+        商品名に一致したキーワード（小文字化済み）を返す
+
+        Args:
+            product_name: 商品名
+
+        Returns:
+            一致したキーワード。なければNone
+        """
+        if not product_name:
+            return None
+
+        low = product_name.lower()
+
+        with self._lock:
+            # 完全一致を優先
+            if low in self._brands:
+                return low
+
+            if len(self._added) + len(self._removed) > self.rebuild_threshold:
+                self._rebuild()
+            automaton, added, removed = self._automaton, list(self._added), set(self._removed)
+
+        best = automaton.longest(low, removed)
+
+        # まだオートマトンに入っていない追加分は直接探す
+        for key in added:
+            start = low.find(key)
+            if start < 0:
+                continue
+            if best is None or len(key) > best[0] or (len(key) == best[0] and start < best[1]):
+                best = (len(key), start, key)
+
+        return best[2] if best else None
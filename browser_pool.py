@@ -0,0 +1,313 @@
+"""
+ブラウザセッションプール
+
+起動済み・ログイン済みのブラウザセッションをプロセス全体で使い回すためのプールです。
+browser-use のセッションは作成したイベントループに紐づくため、プールは専用の
+イベントループスレッドを持ち、すべてのブラウザ操作をそのループ上で実行します。
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def default_browser_factory(headless: bool = False, user_data_dir: Optional[str] = None) -> Any:
+    """
+    プール用のブラウザインスタンスを作成（エージェント終了後も閉じない設定）
+
+    Args:
+        headless: ウィンドウを表示しないか
+        user_data_dir: ブラウザのプロフィールのディレクトリ（アカウントごとに分ける場合に指定）
+    """
+    from browser_use import Browser
+
+    options = {"user_data_dir": user_data_dir} if user_data_dir else {}
+    return Browser(
+        disable_security=True,
+        headless=headless,
+        keep_alive=True,
+        **options,
+    )
+
+
+@dataclass
+class PooledBrowser:
+    """
+    プールが管理するブラウザセッション
+
+    Attributes:
+        browser: browser-use のブラウザセッション
+        account_key: 最後に使用したアカウントのキー（未使用ならNone）
+        logged_in: account_key のアカウントでログイン済みかどうか
+        created_at: 起動時刻
+        last_used: 最後に返却された時刻
+        uses: 貸し出し回数
+    """
+    browser: Any
+    account_key: Optional[str] = None
+    logged_in: bool = False
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    uses: int = 0
+
+
+class BrowserPool:
+    """
+    起動済みブラウザセッションのプール
+
+    ShoppingThread はアカウントごとにセッションを借りて (acquire)、
+    処理後に返却 (release) します。返却されたセッションは開いたまま保持され、
+    同じアカウントの次回注文ではブラウザ起動とログインを省略できます。
+    """
+
+    def __init__(
+        self,
+        max_size: int = 2,
+        idle_timeout: float = 600.0,
+        health_timeout: float = 3.0,
+        browser_factory: Optional[Callable[[], Any]] = None,
+        callback: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Args:
+            max_size: 同時に保持するブラウザの最大数
+            idle_timeout: 未使用のまま保持する最大秒数（超えたら終了）
+            health_timeout: ヘルスチェックのタイムアウト秒数
+            browser_factory: ブラウザを作成する関数
+            callback: ログメッセージ用のコールバック関数
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_timeout = health_timeout
+        self.browser_factory = browser_factory or default_browser_factory
+        self.callback = callback
+
+        self._idle: List[PooledBrowser] = []
+        self._leased: Dict[int, PooledBrowser] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+        self._condition: Optional[asyncio.Condition] = None
+        self._eviction_task: Optional[asyncio.Task] = None
+
+    def log(self, message: str) -> None:
+        """ログメッセージをコールバック経由で送信"""
+        if self.callback:
+            self.callback(message)
+
+    # ----------------- イベントループ -----------------
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """プール専用のイベントループ（初回アクセス時に起動）"""
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                ready = threading.Event()
+                loop = asyncio.new_event_loop()
+
+                def run_loop():
+                    asyncio.set_event_loop(loop)
+                    self._condition = asyncio.Condition()
+                    self._eviction_task = loop.create_task(self._eviction_loop())
+                    ready.set()
+                    loop.run_forever()
+
+                self._loop = loop
+                self._loop_thread = threading.Thread(
+                    target=run_loop, name="BrowserPoolLoop", daemon=True
+                )
+                self._loop_thread.start()
+                ready.wait()
+            return self._loop
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """
+        コルーチンをプールのイベントループで実行し、結果を待つ
+
+        Args:
+            coro: 実行するコルーチン
+
+        Returns:
+            コルーチンの戻り値
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result()
+
+    # ----------------- 貸し出し/返却 -----------------
+    async def acquire(self, account_key: str) -> PooledBrowser:
+        """
+        ブラウザセッションを借りる
+
+        同じアカウントでログイン済みのセッションを優先し、なければ未使用の
+        セッション、それもなければ新しいブラウザを起動します。
+        上限に達していて空きもない場合は返却を待ちます。
+        ヘルスチェック・ブラウザの終了と起動はロックを持たずに行うため、
+        その間も他の貸し出し・返却は待たされません（枠は先に確保しておく）。
+
+        Args:
+            account_key: アカウントを識別するキー
+
+        Returns:
+            PooledBrowser: 貸し出されたセッション
+        """
+        while True:
+            evicted = None
+            async with self._condition:
+                while True:
+                    entry = self._take_idle(account_key)
+                    if entry is not None:
+                        launching = False
+                        break
+
+                    if len(self._idle) + len(self._leased) >= self.max_size:
+                        if not self._idle:
+                            await self._condition.wait()
+                            continue
+                        # 上限に達している場合は他アカウントの空きセッションを終了して枠を譲り受ける
+                        evicted = self._idle.pop(0)
+
+                    entry = PooledBrowser(browser=self.browser_factory())
+                    launching = True
+                    break
+                # 枠を確保してから確認・起動する（その間に他の acquire が上限を超えないように）
+                self._leased[id(entry)] = entry
+
+            if evicted is not None:
+                await self._close(evicted, "他アカウント用の枠を確保")
+
+            if launching:
+                try:
+                    await entry.browser.start()
+                except Exception:
+                    await self._forget(entry)
+                    raise
+                break
+
+            if await self._is_healthy(entry):
+                break
+            # 不健全なセッションは破棄して、残りの空きセッションから選び直す
+            await self._forget(entry)
+            await self._close(entry, "ヘルスチェック失敗")
+
+        if entry.account_key != account_key:
+            entry.account_key = account_key
+            entry.logged_in = False
+        entry.uses += 1
+        return entry
+
+    async def release(self, entry: PooledBrowser, healthy: bool = True) -> None:
+        """
+        借りたセッションを返却する
+
+        Args:
+            entry: acquire() で借りたセッション
+            healthy: False の場合はプールに戻さずブラウザを終了する
+        """
+        async with self._condition:
+            if self._leased.pop(id(entry), None) is None:
+                return
+            if healthy:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            self._condition.notify()
+
+        if not healthy:
+            await self._close(entry, "異常終了したセッション")
+
+    async def _forget(self, entry: PooledBrowser) -> None:
+        """起動に失敗したセッションの枠を解放する"""
+        async with self._condition:
+            self._leased.pop(id(entry), None)
+            self._condition.notify()
+
+    def _take_idle(self, account_key: str) -> Optional[PooledBrowser]:
+        """空きセッションから最適なものを取り出す（ロック取得済みで呼ぶ。健全かは呼び出し側で確認する）"""
+        # 他アカウントのCookieが残ったセッションは使わない
+        # 同じアカウント・ログイン済み > 同じアカウント > 新しく使われたもの の順
+        candidates = [e for e in self._idle if e.account_key in (account_key, None)]
+        if not candidates:
+            return None
+        entry = max(
+            candidates,
+            key=lambda e: (e.account_key == account_key and e.logged_in,
+                           e.account_key == account_key,
+                           e.last_used),
+        )
+        self._idle.remove(entry)
+        return entry
+
+    # ----------------- ヘルスチェック/退避 -----------------
+    async def _is_healthy(self, entry: PooledBrowser) -> bool:
+        """CDP接続が生きているかを軽量なコマンドで確認"""
+        try:
+            await asyncio.wait_for(
+                entry.browser.cdp_client.send.Browser.getVersion(),
+                timeout=self.health_timeout,
+            )
+            return True
+        except Exception:
+            return False
+
+    async def evict_idle(self) -> int:
+        """
+        idle_timeout を超えて使われていないセッションを終了する
+
+        Returns:
+            int: 終了したセッション数
+        """
+        now = time.monotonic()
+        async with self._condition:
+            expired = [e for e in self._idle if now - e.last_used > self.idle_timeout]
+            for entry in expired:
+                self._idle.remove(entry)
+            if expired:
+                self._condition.notify_all()
+
+        for entry in expired:
+            await self._close(entry, "一定時間未使用")
+        return len(expired)
+
+    async def _eviction_loop(self) -> None:
+        """定期的に未使用セッションを退避する"""
+        interval = max(1.0, min(60.0, self.idle_timeout / 4))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                self.log(f"ブラウザプールの退避処理でエラー: {str(e)}")
+
+    async def _close(self, entry: PooledBrowser, reason: str) -> None:
+        """ブラウザを終了する"""
+        self.log(f"ブラウザを終了します（{reason}）")
+        try:
+            await entry.browser.kill()
+        except Exception as e:
+            self.log(f"ブラウザ終了中にエラー: {str(e)}")
+
+    async def close_all(self) -> None:
+        """空きセッションをすべて終了する（貸し出し中のものは返却時に戻る）"""
+        async with self._condition:
+            entries, self._idle = self._idle, []
+        for entry in entries:
+            await self._close(entry, "プールを終了")
+
+    def stats(self) -> Dict[str, int]:
+        """プールの状態（空き数・貸し出し数）を返す"""
+        return {"idle": len(self._idle), "leased": len(self._leased)}
+
+
+_default_pool: Optional[BrowserPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """プロセス全体で共有するブラウザプールを返す"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = BrowserPool()
+        return _default_pool
@@ -0,0 +1,135 @@
+"""
+買い物リスト（カート）のモデル
+
+商品を ProductInfo（商品名と数量）で保持し、正規化した商品名をキーにした索引で
+重複チェック・削除を O(1) で引けるようにします。同じ商品を追加すると数量を合算します。
+変更のたびに「何行目に何が起きたか」だけを on_change で通知するため、
+画面側はリスト全体を描き直さずに該当行だけを更新できます。
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from models import ProductInfo
+from product_cache import normalize_product_name
+
+MAX_QUANTITY = 99  # ProductInfo.quantity の上限
+
+# on_change で通知する変更の種類
+CHANGE_INSERT = "insert"
+CHANGE_UPDATE = "update"
+CHANGE_DELETE = "delete"
+CHANGE_CLEAR = "clear"
+
+
+def format_item(item: ProductInfo) -> str:
+    """リスト表示用の文字列（数量が2以上なら「×数量」を付ける）"""
+    if item.quantity > 1:
+        return f"{item.name} ×{item.quantity}"
+    return item.name
+
+
+class Cart:
+    """
+    商品名をキーに索引を持つ買い物リスト
+
+    Attributes:
+        on_change: 変更時に呼ばれる（引数: 変更の種類, 行番号, 商品。clear の場合は -1, None）
+    """
+
+    def __init__(self, on_change: Optional[Callable[[str, int, Optional[ProductInfo]], None]] = None):
+        self.on_change = on_change
+        self._items: List[ProductInfo] = []
+        self._keys: List[str] = []  # 各行の正規化した商品名（削除時に正規化し直さないため）
+        self._index: Dict[str, int] = {}  # 正規化した商品名 → 行番号
+
+    def _notify(self, change: str, position: int, item: Optional[ProductInfo]) -> None:
+        if self.on_change:
+            self.on_change(change, position, item)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[ProductInfo]:
+        return iter(list(self._items))
+
+    def __contains__(self, name: str) -> bool:
+        return normalize_product_name(name) in self._index
+
+    def get(self, name: str) -> Optional[ProductInfo]:
+        """商品名（表記揺れは吸収）から商品を引く"""
+        position = self._index.get(normalize_product_name(name))
+        return None if position is None else self._items[position]
+
+    def item_at(self, position: int) -> ProductInfo:
+        """行番号から商品を引く"""
+        return self._items[position]
+
+    def names(self) -> List[str]:
+        """商品名のリスト（追加した順）"""
+        return [item.name for item in self._items]
+
+    def quantities(self) -> Dict[str, int]:
+        """商品名 → 数量"""
+        return {item.name: item.quantity for item in self._items}
+
+    def add(self, name: str, quantity: int = 1) -> Tuple[ProductInfo, bool]:
+        """
+        商品を追加する（すでにある商品なら数量を合算する）
+
+        数量は追加分・合算後とも 1〜MAX_QUANTITY に丸める（会話から追加する画面向け）。
+        範囲外の数量を誤りとして扱う場合は、呼び出し側で先に ProductInfo で検証する。
+
+        Args:
+            name: 商品名
+            quantity: 追加する数量
+
+        Returns:
+            (追加・更新後の商品, 既存の商品に合算した場合True)
+
+        Raises:
+            pydantic.ValidationError: 商品名が空の場合
+        """
+        item = ProductInfo(name=name, quantity=min(max(quantity, 1), MAX_QUANTITY))
+        key = normalize_product_name(item.name)
+        position = self._index.get(key)
+        if position is None:
+            self._index[key] = len(self._items)
+            self._items.append(item)
+            self._keys.append(key)
+            self._notify(CHANGE_INSERT, len(self._items) - 1, item)
+            return item, False
+
+        current = self._items[position]
+        merged = current.model_copy(update={"quantity": min(current.quantity + item.quantity, MAX_QUANTITY)})
+        self._items[position] = merged
+        self._notify(CHANGE_UPDATE, position, merged)
+        return merged, True
+
+    def remove(self, name: str) -> Optional[ProductInfo]:
+        """
+        商品を削除する
+
+        Returns:
+            削除した商品。リストになければNone
+        """
+        position = self._index.get(normalize_product_name(name))
+        if position is None:
+            return None
+        return self.remove_at(position)
+
+    def remove_at(self, position: int) -> ProductInfo:
+        """指定した行の商品を削除する"""
+        item = self._items.pop(position)
+        del self._index[self._keys.pop(position)]
+        # 後ろの行の行番号を詰める
+        for i in range(position, len(self._keys)):
+            self._index[self._keys[i]] = i
+        self._notify(CHANGE_DELETE, position, item)
+        return item
+
+    def clear(self) -> None:
+        """すべての商品を削除する"""
+        self._items.clear()
+        self._keys.clear()
+        self._index.clear()
+        self._notify(CHANGE_CLEAR, -1, None)
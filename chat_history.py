@@ -0,0 +1,190 @@
+"""
+チャット履歴のトークン予算管理
+
+Groq に送るメッセージを「システムプロンプト + これまでの要約 + 直近のやり取り」に
+絞り込みます。予算からあふれた古いやり取りや商品追加の通知は、応答処理とは別の
+スレッドで要約にまとめていくため、会話が長くなっても送信量はほぼ一定です。
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+# メッセージ1件あたりの役割・区切りのオーバーヘッド
+MESSAGE_OVERHEAD_TOKENS = 4
+
+ROLE_LABELS = {"user": "ユーザー", "assistant": "アシスタント", "system": "通知"}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    トークン数の概算
+
+    英数字はおよそ4文字で1トークン、日本語などの非ASCII文字は1文字1トークンとして数えます。
+
+    Args:
+        text: 対象の文字列
+
+    Returns:
+        int: 概算トークン数
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def message_tokens(message: Dict) -> int:
+    """メッセージ1件の概算トークン数"""
+    return estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+
+def digest(messages: List[Dict], width: int = 80) -> str:
+    """要約が間に合っていないメッセージを1行ずつに縮めたもの"""
+    lines = []
+    for msg in messages:
+        content = (msg.get("content") or "").replace("\n", " ")
+        if not content:
+            continue
+        if len(content) > width:
+            content = content[:width - 1] + "…"
+        lines.append(f"{ROLE_LABELS.get(msg.get('role'), msg.get('role'))}: {content}")
+    return "\n".join(lines)
+
+
+class ChatHistoryManager:
+    """
+    送信するチャット履歴を予算内に収めるマネージャー
+
+    Attributes:
+        max_tokens: 1回のリクエストで送る履歴の概算トークン数の上限
+        min_recent: 予算に関係なく原文のまま送る直近メッセージ数
+        last_request_tokens: 直近のリクエストで送った概算トークン数
+    """
+
+    def __init__(
+        self,
+        summarizer: Optional[Callable[[str, List[Dict]], str]] = None,
+        max_tokens: int = 3000,
+        min_recent: int = 6,
+        max_summary_tokens: int = 600,
+        callback: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Args:
+            summarizer: (これまでの要約, 新たに要約するメッセージ) から新しい要約を作る関数
+            max_tokens: 1回のリクエストで送る履歴の概算トークン数の上限
+            min_recent: 予算に関係なく原文のまま送る直近メッセージ数
+            max_summary_tokens: 要約の概算トークン数の上限（超えた分は古い行から捨てる）
+            callback: ログメッセージ用のコールバック関数
+        """
+        self.summarizer = summarizer
+        self.max_tokens = max_tokens
+        self.min_recent = min_recent
+        self.max_summary_tokens = max_summary_tokens
+        self.callback = callback
+        self.last_request_tokens = 0
+
+        self._lock = threading.Lock()
+        self._summary = ""
+        # 要約に含まれているメッセージの範囲（messages[:_summarized_upto]）
+        self._summarized_upto = 0
+        self._summarizing = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ChatSummary")
+
+    def log(self, message: str) -> None:
+        """ログメッセージをコールバック経由で送信"""
+        if self.callback:
+            self.callback(message)
+
+    @property
+    def summary(self) -> str:
+        """現在のローリング要約"""
+        return self._summary
+
+    def build_request(self, messages: List[Dict]) -> Tuple[List[Dict], int]:
+        """
+        送信するメッセージを組み立てる
+
+        Args:
+            messages: チャット履歴全体（先頭がシステムプロンプト）
+
+        Returns:
+            (送信するメッセージ, 概算トークン数)
+        """
+        with self._lock:
+            head = messages[:1] if messages and messages[0].get("role") == "system" else []
+            budget = self.max_tokens - sum(message_tokens(m) for m in head) - estimate_tokens(self._summary)
+
+            # 新しい方から予算に収まるだけ原文のまま残す
+            start = len(messages)
+            used = 0
+            while start > len(head):
+                tokens = message_tokens(messages[start - 1])
+                if len(messages) - start >= self.min_recent and used + tokens > budget:
+                    break
+                used += tokens
+                start -= 1
+
+            # ツール実行結果だけが呼び出し元から切り離されないようにする
+            while start > len(head) and start < len(messages) and messages[start].get("tool_call_id"):
+                start -= 1
+
+            summarized_upto = max(self._summarized_upto, len(head))
+            pending = messages[summarized_upto:start]
+            if pending and not self._summarizing:
+                self._schedule_summary(list(pending), start)
+
+            request = list(head)
+            summary_parts = []
+            if self._summary:
+                summary_parts.append(f"これまでの会話の要約:\n{self._summary}")
+            if pending:
+                summary_parts.append(f"要約前の過去のやり取り:\n{digest(pending)}")
+            if summary_parts:
+                request.append({"role": "system", "content": "\n\n".join(summary_parts)})
+            request.extend(messages[start:])
+
+            self.last_request_tokens = sum(message_tokens(m) for m in request)
+            return request, self.last_request_tokens
+
+    def _schedule_summary(self, chunk: List[Dict], upto: int) -> None:
+        """古いメッセージの要約をバックグラウンドで更新する（ロック取得済みで呼ぶ）"""
+        self._summarizing = True
+        previous = self._summary
+
+        def job():
+            summary = None
+            if self.summarizer:
+                try:
+                    summary = self.summarizer(previous, chunk)
+                except Exception as e:
+                    self.log(f"会話の要約に失敗しました: {str(e)}")
+            if not summary:
+                summary = "\n".join(part for part in (previous, digest(chunk)) if part)
+
+            with self._lock:
+                self._summary = self._clip(summary.strip())
+                self._summarized_upto = upto
+                self._summarizing = False
+
+        self._executor.submit(job)
+
+    def _clip(self, summary: str) -> str:
+        """要約を上限に収める（新しい行を優先して残す）"""
+        if estimate_tokens(summary) <= self.max_summary_tokens:
+            return summary
+        kept = []
+        used = 0
+        for line in reversed(summary.splitlines()):
+            used += estimate_tokens(line) + 1
+            if used > self.max_summary_tokens:
+                break
+            kept.append(line)
+        return "\n".join(reversed(kept))
+
+    def reset(self) -> None:
+        """要約を破棄する（チャット履歴を作り直したとき用）"""
+        with self._lock:
+            self._summary = ""
+            self._summarized_upto = 0
@@ -0,0 +1,169 @@
+"""
+チャット応答のストリーミング表示
+
+Groq の stream=True 応答を受け取りながら、本文はチャット欄に逐次表示し、
+ツール呼び出しは断片（delta）を組み立てて最後にまとめて返します。
+チャット欄への書き込みはフレーム単位（FRAME_MS ごと）にまとめて行い、
+トークンごとに Tk のイベントを積まないようにしています。
+"""
+
+import threading
+import time
+import tkinter as tk
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+# チャット欄へまとめて書き込む間隔（ミリ秒）
+FRAME_MS = 33
+
+
+class ToolCallAccumulator:
+    """ストリーミングで分割されて届くツール呼び出しを組み立てる"""
+
+    def __init__(self):
+        self._calls: Dict[int, Dict[str, str]] = {}
+
+    def add(self, deltas: Any) -> None:
+        """
+        チャンクの delta.tool_calls を取り込む
+
+        Args:
+            deltas: delta.tool_calls（index ごとに id・名前・引数の断片を持つ）
+        """
+        for delta in deltas or []:
+            call = self._calls.setdefault(delta.index, {"id": "", "type": "function", "name": "", "arguments": ""})
+            if delta.id:
+                call["id"] = delta.id
+            if getattr(delta, "type", None):
+                call["type"] = delta.type
+            function = getattr(delta, "function", None)
+            if function is not None:
+                if function.name:
+                    call["name"] += function.name
+                if function.arguments:
+                    call["arguments"] += function.arguments
+
+    def result(self) -> List[Any]:
+        """非ストリーミング応答の message.tool_calls と同じ形で返す"""
+        return [
+            SimpleNamespace(
+                id=call["id"],
+                type=call["type"],
+                function=SimpleNamespace(name=call["name"], arguments=call["arguments"] or "{}"),
+            )
+            for _, call in sorted(self._calls.items())
+        ]
+
+
+@dataclass
+class StreamResult:
+    """ストリーミング応答をまとめた結果"""
+    content: str = ""
+    tool_calls: List[Any] = field(default_factory=list)
+    # リクエスト開始から最初のトークン（本文またはツール呼び出し）までの秒数
+    first_token_time: Optional[float] = None
+    total_time: float = 0.0
+
+
+def stream_completion(client: Any, on_text: Callable[[str], None], **kwargs) -> StreamResult:
+    """
+    chat.completions.create をストリーミングで呼び出す
+
+    Args:
+        client: Groq クライアント
+        on_text: 本文の断片が届くたびに呼ばれる関数
+        **kwargs: chat.completions.create に渡す引数（stream は自動で指定）
+
+    Returns:
+        StreamResult: 本文・ツール呼び出し・所要時間
+    """
+    started = time.perf_counter()
+    result = StreamResult()
+    parts = []
+    tool_calls = ToolCallAccumulator()
+
+    for chunk in client.chat.completions.create(stream=True, **kwargs):
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        text = getattr(delta, "content", None)
+        deltas = getattr(delta, "tool_calls", None)
+        if (text or deltas) and result.first_token_time is None:
+            result.first_token_time = time.perf_counter() - started
+        if text:
+            parts.append(text)
+            on_text(text)
+        if deltas:
+            tool_calls.add(deltas)
+
+    result.content = "".join(parts)
+    result.tool_calls = tool_calls.result()
+    result.total_time = time.perf_counter() - started
+    return result
+
+
+class ChatStreamView:
+    """
+    ストリーミング中の応答をチャット欄に書き込むビュー
+
+    push() はワーカースレッドから呼んでよく、実際の書き込みは root.after で
+    メインスレッドからフレーム単位にまとめて行います。
+    """
+
+    def __init__(self, root: tk.Misc, text_widget: tk.Text, prefix: str = "アシスタント: ", tag: str = "bot_tag"):
+        self.root = root
+        self.text_widget = text_widget
+        self.prefix = prefix
+        self.tag = tag
+        self._lock = threading.Lock()
+        self._pending: List[str] = []
+        self._scheduled = False
+        self._started = False
+        self._finished = False
+
+    @property
+    def started(self) -> bool:
+        """本文を1文字でも表示し始めたか"""
+        return self._started
+
+    def push(self, text: str) -> None:
+        """本文の断片を表示待ちに追加する"""
+        with self._lock:
+            if not self._started:
+                self._started = True
+                self._pending.append(None)  # 見出しを書き込む目印
+            self._pending.append(text)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.root.after(FRAME_MS, self._flush)
+
+    def finish(self) -> None:
+        """ストリーミング終了。残りを書き込んで応答の区切りを入れる"""
+        with self._lock:
+            if not self._started:
+                return
+            self._finished = True
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.root.after(0, self._flush)
+
+    def _flush(self) -> None:
+        """溜まった断片をまとめてチャット欄に書き込む（メインスレッド）"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            finished = self._finished
+            self._scheduled = False
+
+        self.text_widget.configure(state='normal')
+        for text in pending:
+            if text is None:
+                self.text_widget.insert(tk.END, self.prefix, self.tag)
+            else:
+                self.text_widget.insert(tk.END, text)
+        if finished:
+            self.text_widget.insert(tk.END, "\n\n")
+        self.text_widget.see(tk.END)
+        self.text_widget.configure(state='disabled')
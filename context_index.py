@@ -0,0 +1,107 @@
+"""
+チャット履歴の商品コンテキスト索引
+
+タスクプロンプトに添える「補足情報」（例：「牛乳はメグミルクがいい」）を、
+チャット履歴全体を商品ごとに走査せずに取り出すための転置索引です。
+メッセージが追加されるたびに差分だけを索引に加えます。
+"""
+
+import re
+import threading
+from typing import Dict, Iterable, List
+
+# 商品の希望・特徴を述べている行の手がかりとなる語
+CUE_PATTERN = re.compile(r"がいい|希望|欲しい|推奨|特徴|ブランド")
+
+# 索引の対象にするメッセージの役割
+INDEXED_ROLES = ("user", "assistant")
+
+
+def _grams(text: str) -> List[str]:
+    """検索に使う文字 bigram の一覧（1文字の場合はその文字）"""
+    if len(text) < 2:
+        return [text] if text else []
+    return [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+def _index_grams(text: str) -> set:
+    """索引に登録する文字 unigram と bigram（1文字の商品名でも引けるように）"""
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class ChatContextIndex:
+    """
+    チャット履歴の行を文字 n-gram で引ける転置索引
+
+    希望を表す語（CUE_PATTERN）を含む行だけを索引に入れるため、
+    通常の会話が長くなっても索引はほとんど大きくなりません。
+    """
+
+    def __init__(self, messages: Iterable[Dict] = ()):
+        self._lock = threading.Lock()
+        self._lines: List[str] = []
+        self._lower: List[str] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._seen = 0
+        for msg in messages:
+            self.add_message(msg)
+
+    def add_message(self, msg: Dict) -> None:
+        """
+        メッセージを1件索引に追加
+
+        Args:
+            msg: {"role", "content"} 形式のメッセージ
+        """
+        with self._lock:
+            self._seen += 1
+            if msg.get("role") not in INDEXED_ROLES:
+                return
+            for line in (msg.get("content") or "").splitlines():
+                if not CUE_PATTERN.search(line):
+                    continue
+                line_id = len(self._lines)
+                low = line.lower()
+                self._lines.append(line)
+                self._lower.append(low)
+                for gram in _index_grams(low):
+                    self._postings.setdefault(gram, []).append(line_id)
+
+    def sync(self, messages: List[Dict]) -> None:
+        """
+        まだ索引に入っていない末尾のメッセージを追加（messages は追記のみの前提）
+
+        Args:
+            messages: チャット履歴
+        """
+        for msg in messages[self._seen:]:
+            self.add_message(msg)
+
+    def lookup(self, product: str) -> List[str]:
+        """
+        商品名の後ろに希望を表す語が続く行を返す
+
+        Args:
+            product: 商品名
+
+        Returns:
+            List[str]: 該当する行（元の表記のまま、出現順）
+        """
+        key = product.lower()
+        grams = _grams(key)
+        if not grams:
+            return []
+
+        with self._lock:
+            postings = [self._postings.get(gram) for gram in set(grams)]
+            if not all(postings):
+                return []
+            # 最も短い posting list の候補だけを検証する
+            candidates = min(postings, key=len)
+            result = []
+            for line_id in candidates:
+                low = self._lower[line_id]
+                pos = low.find(key)
+                if pos >= 0 and CUE_PATTERN.search(low, pos + len(key)):
+                    result.append(self._lines[line_id])
+            return result
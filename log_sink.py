@@ -0,0 +1,145 @@
+"""
+ログ欄への一括書き込みとファイルへの記録
+
+各スレッドの log_message() はキューに積むだけにし、Tk のメインスレッドが一定間隔
+（frame_ms）でまとめて取り出してログ欄に1回で書き込みます。ログ欄は max_lines 行を
+超えた分を古い方から削除し、すべてのログは JSONL 形式でローテーションするファイルにも残します。
+"""
+
+import json
+import logging
+import os
+import queue
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+import tkinter as tk
+
+
+class JsonLineFormatter(logging.Formatter):
+    """ログレコードを1行のJSONにする"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(
+            {
+                "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+                "level": record.levelname,
+                "thread": record.threadName,
+                "message": record.getMessage(),
+            },
+            ensure_ascii=False,
+        )
+
+
+class LogSink:
+    """
+    ログ欄とログファイルへの書き込みをまとめるシンク
+
+    Attributes:
+        max_lines: ログ欄に残す最大行数
+        frame_ms: ログ欄に書き込む間隔（ミリ秒）
+        path: JSONL ログファイルのパス（Noneならファイルに残さない）
+    """
+
+    def __init__(
+        self,
+        max_lines: int = 2000,
+        frame_ms: int = 100,
+        path: Optional[str] = None,
+        max_bytes: int = 5 * 1024 * 1024,
+        backup_count: int = 3,
+    ):
+        """
+        Args:
+            max_lines: ログ欄に残す最大行数
+            frame_ms: ログ欄に書き込む間隔（ミリ秒）
+            path: JSONL ログファイルのパス（Noneならファイルに残さない）
+            max_bytes: ログファイルをローテーションするサイズ
+            backup_count: 残す古いログファイルの数
+        """
+        self.max_lines = max_lines
+        self.frame_ms = frame_ms
+        self.path = path
+
+        # UI 向けのキュー（SimpleQueue の put はどのスレッドからでもすぐに戻る）
+        self._pending: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self._root = None
+        self._text_widget = None
+        self._after_id = None
+
+        # ファイルへの書き込みは QueueListener の専用スレッドで行う
+        self._logger = logging.getLogger(f"{__name__}.{id(self)}")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        self._listener = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+            handler.setFormatter(JsonLineFormatter())
+            records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+            self._logger.addHandler(QueueHandler(records))
+            self._listener = QueueListener(records, handler)
+            self._listener.start()
+
+    def emit(self, message: str, level: int = logging.INFO) -> None:
+        """
+        ログを1件追加する（どのスレッドからでも呼べる）
+
+        Args:
+            message: ログメッセージ
+            level: ログレベル（ファイルに記録する）
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self._pending.put(f"[{timestamp}] {message}")
+        if self._listener is not None:
+            self._logger.log(level, message)
+
+    def attach(self, root: tk.Misc, text_widget: tk.Text) -> None:
+        """
+        ログ欄への定期的な書き込みを始める（メインスレッドから呼ぶ）
+
+        Args:
+            root: Tk のルートウィンドウ
+            text_widget: ログ欄
+        """
+        self._root = root
+        self._text_widget = text_widget
+        self._drain()
+
+    def _drain(self) -> None:
+        """溜まったログをまとめてログ欄に書き込む（メインスレッド）"""
+        lines = []
+        while True:
+            try:
+                lines.append(self._pending.get_nowait())
+            except queue.Empty:
+                break
+
+        if lines:
+            widget = self._text_widget
+            # 1回のフレームで書き込むのは最大 max_lines 行まで（それより前は削除される分）
+            lines = lines[-self.max_lines:]
+            widget.configure(state='normal')
+            widget.insert(tk.END, "\n".join(lines) + "\n")
+            excess = int(widget.index('end-1c').split('.')[0]) - 1 - self.max_lines
+            if excess > 0:
+                widget.delete("1.0", f"{excess + 1}.0")
+            widget.see(tk.END)
+            widget.configure(state='disabled')
+
+        self._after_id = self._root.after(self.frame_ms, self._drain)
+
+    def close(self) -> None:
+        """定期書き込みを止め、ログファイルを閉じる"""
+        if self._after_id is not None and self._root is not None:
+            try:
+                self._root.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
@@ -0,0 +1,237 @@
+"""
+ログイン状態（Cookie・localStorage）の暗号化キャッシュ
+
+アカウントごとにブラウザのストレージ状態を暗号化して保存し、次回起動時に
+復元することでエージェントのログイン手順を省略します。
+暗号鍵はアカウントのパスワードから導出するため、鍵ファイルは保存しません
+（パスワードが変わると古いキャッシュは復号できず、自動的に無効になります）。
+"""
+
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+SALT_SIZE = 16
+KDF_ITERATIONS = 200_000
+
+# localStorage を復元するスクリプト（同じオリジンで1タブにつき1回だけ実行）
+RESTORE_SCRIPT = """
+(() => {{
+  if (location.origin !== {origin} || sessionStorage.getItem('__netsuper_restored')) return;
+  const items = {items};
+  for (const [k, v] of items) localStorage.setItem(k, v);
+  sessionStorage.setItem('__netsuper_restored', '1');
+}})();
+"""
+
+
+class LoginStateCache:
+    """
+    アカウントごとのストレージ状態を暗号化して保存するキャッシュ
+
+    Attributes:
+        directory: キャッシュファイルを保存するディレクトリ
+        max_age: キャッシュを有効とみなす最大秒数
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_age: float = 7 * 24 * 3600):
+        self.directory = directory or os.path.join(os.getcwd(), "login_state")
+        self.max_age = max_age
+
+    def _path(self, link: str, aeon_id: str) -> str:
+        """アカウントに対応するキャッシュファイルのパス"""
+        digest = hashlib.sha256(f"{link}|{aeon_id}".encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.bin")
+
+    @staticmethod
+    def _fernet(aeon_id: str, pass_word: str, salt: bytes) -> Fernet:
+        """パスワードから暗号鍵を導出"""
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            iterations=KDF_ITERATIONS,
+        )
+        key = kdf.derive(f"{aeon_id}:{pass_word}".encode("utf-8"))
+        return Fernet(base64.urlsafe_b64encode(key))
+
+    def save(self, link: str, aeon_id: str, pass_word: str, state: Dict[str, Any]) -> None:
+        """
+        ストレージ状態を暗号化して保存
+
+        Args:
+            link: ネットスーパーのURL
+            aeon_id: ログインID
+            pass_word: ログインパスワード（鍵の導出に使用）
+            state: storage_state 形式の辞書（cookies, origins）
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        salt = os.urandom(SALT_SIZE)
+        payload = json.dumps({"saved_at": time.time(), "state": state}, ensure_ascii=False)
+        token = self._fernet(aeon_id, pass_word, salt).encrypt(payload.encode("utf-8"))
+
+        path = self._path(link, aeon_id)
+        # 一時ファイル名は書き込みごとに変える（同じアカウントを並行して保存しても混ざらない）
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(salt + token)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        try:
+            os.chmod(path, 0o600)
+        except OSError:
+            pass
+
+    def load(self, link: str, aeon_id: str, pass_word: str) -> Optional[Dict[str, Any]]:
+        """
+        保存済みのストレージ状態を読み込んで検証
+
+        Args:
+            link: ネットスーパーのURL
+            aeon_id: ログインID
+            pass_word: ログインパスワード
+
+        Returns:
+            有効なストレージ状態。存在しない・復号できない・期限切れの場合はNone
+        """
+        path = self._path(link, aeon_id)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return None
+
+        try:
+            salt, token = blob[:SALT_SIZE], blob[SALT_SIZE:]
+            payload = self._fernet(aeon_id, pass_word, salt).decrypt(token)
+            data = json.loads(payload.decode("utf-8"))
+        except (InvalidToken, ValueError):
+            self.invalidate(link, aeon_id)
+            return None
+
+        if time.time() - data.get("saved_at", 0) > self.max_age:
+            self.invalidate(link, aeon_id)
+            return None
+
+        state = data.get("state") or {}
+        now = time.time()
+        state["cookies"] = [c for c in state.get("cookies", []) if not self._expired(c, now)]
+        if not self.has_live_cookies(state, link, now):
+            self.invalidate(link, aeon_id)
+            return None
+        return state
+
+    def invalidate(self, link: str, aeon_id: str) -> None:
+        """アカウントのキャッシュを削除"""
+        try:
+            os.remove(self._path(link, aeon_id))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _expired(cookie: Dict[str, Any], now: float) -> bool:
+        """Cookieが期限切れかどうか（expires が -1 / 0 のものはセッションCookie）"""
+        expires = cookie.get("expires", -1)
+        return 0 < expires <= now
+
+    @classmethod
+    def has_live_cookies(cls, state: Dict[str, Any], link: str, now: Optional[float] = None) -> bool:
+        """
+        サイトの有効なCookieが残っているかを確認（ネットワークアクセスなしの簡易検証）
+
+        Args:
+            state: storage_state 形式の辞書
+            link: ネットスーパーのURL
+            now: 現在時刻（省略時は time.time()）
+
+        Returns:
+            bool: サイトのドメインに有効期限内のCookieが1つ以上あればTrue
+        """
+        now = time.time() if now is None else now
+        host = urlparse(link).hostname or ""
+        for cookie in state.get("cookies", []):
+            domain = cookie.get("domain", "").lstrip(".")
+            if (host == domain or host.endswith("." + domain)) and not cls._expired(cookie, now):
+                return True
+        return False
+
+
+async def export_browser_state(browser: Any, link: str) -> Dict[str, Any]:
+    """
+    ブラウザからCookieとサイトの localStorage を取得
+
+    Args:
+        browser: browser-use のブラウザセッション
+        link: ネットスーパーのURL（localStorage を取得するオリジン）
+
+    Returns:
+        storage_state 形式の辞書
+    """
+    state = await browser.export_storage_state()
+
+    parsed = urlparse(link)
+    origin = f"{parsed.scheme}://{parsed.netloc}"
+    try:
+        cdp_session = await browser.get_or_create_cdp_session()
+        result = await cdp_session.cdp_client.send.Runtime.evaluate(
+            params={
+                "expression": "location.origin + '\\n' + JSON.stringify(Object.entries(localStorage))",
+                "returnByValue": True,
+            },
+            session_id=cdp_session.session_id,
+        )
+        page_origin, items = result["result"]["value"].split("\n", 1)
+        if page_origin == origin:
+            state["origins"] = [{
+                "origin": origin,
+                "localStorage": [{"name": k, "value": v} for k, v in json.loads(items)],
+            }]
+    except Exception:
+        # localStorage が取れなくてもCookieだけで十分ログイン状態は保てる
+        pass
+    return state
+
+
+async def restore_browser_state(browser: Any, state: Dict[str, Any]) -> None:
+    """
+    保存したCookieと localStorage をブラウザに復元
+
+    Args:
+        browser: 起動済みの browser-use のブラウザセッション
+        state: storage_state 形式の辞書
+    """
+    cookies = []
+    for cookie in state.get("cookies", []):
+        cookie = dict(cookie)
+        # CDPでは expires を省略するとセッションCookieになる
+        if cookie.get("expires", -1) <= 0:
+            cookie.pop("expires", None)
+        cookies.append(cookie)
+    if cookies:
+        await browser.cdp_client.send.Storage.setCookies(params={"cookies": cookies})
+
+    origins = [o for o in state.get("origins", []) if o.get("localStorage")]
+    if origins:
+        cdp_session = await browser.get_or_create_cdp_session()
+        for origin in origins:
+            items = [[item["name"], item["value"]] for item in origin["localStorage"]]
+            script = RESTORE_SCRIPT.format(
+                origin=json.dumps(origin["origin"]),
+                items=json.dumps(items, ensure_ascii=False),
+            )
+            await cdp_session.cdp_client.send.Page.addScriptToEvaluateOnNewDocument(
+                params={"source": script},
+                session_id=cdp_session.session_id,
+            )
@@ -1,26 +1,32 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
-from datetime import datetime
-import io
-import requests
-from pydub import AudioSegment
-from pydub.playback import play
 import re
 import os
 import time
 import json
-import pyaudio
-import wave
-import numpy as np
 # モジュールのインポート
-from shopping_session import ShoppingThread
+# groq・browser-use・numpy・pyaudio・requests などの重いモジュールは画面の表示後に
+# バックグラウンドで読み込む（Prewarmer）か、使う関数の中で読み込む
+from shopping_session import (ShoppingThread, PRODUCT_ADDED, PRODUCT_RETRY, RESULT_SUCCEEDED, RESULT_STOPPED,
+                              preload_browser_use)
+from browser_pool import get_browser_pool
+from brand_matcher import BrandMatcher
+from context_index import ChatContextIndex
+from chat_history import ChatHistoryManager
+from chat_stream import ChatStreamView, stream_completion
+from speech_pipeline import SpeechPipeline
+from tts_cache import TTSCache
+from stt_stream import VoskStreamingClient
+from stt_hedge import HedgedRecognizer
+from vosk_local import LocalVosk
+from log_sink import LogSink
+from cart import Cart, CHANGE_INSERT, CHANGE_UPDATE, CHANGE_DELETE, format_item
+from prewarm import Prewarmer, import_modules
 from pydantic import BaseModel
 import traceback
-from openai import OpenAI
+from types import SimpleNamespace
 from dotenv import load_dotenv
-from browser_use import ChatGroq
-from groq import Groq
 
 # .envファイルを読み込み
 load_dotenv()
@@ -30,6 +36,7 @@ NET_SUPER_PASSWORD = "***************"  # ネットスーパーのパスワー
 
 # STT/TTSサーバー設定
 STT_SERVER_URL = "http://192.168.1.5:3000/stt"
+STT_STREAM_URL = "ws://192.168.1.5:2700"  # Vosk WebSocket サーバー（ストリーミング認識用）
 TTS_SERVER_URL = "http://192.168.1.5:10101"
 TTS_SPEAKER_ID = 753902784  # sayo
 
@@ -44,19 +51,38 @@ class AINetSuperApp:
         self.root.title("AIチャット対応ネットスーパー自動買い物アシスタント")
         self.root.attributes('-fullscreen', True)
 
-        self.products = []
+        # ログはキューに積み、ログ欄へは一定間隔でまとめて書き込む（ファイルにも JSONL で残す）
+        self.log_sink = LogSink(path=os.path.join(os.getcwd(), "logs", "netsuper.jsonl"))
+
+        # 買い物リスト（変更は該当行だけ product_listbox に反映する）
+        self.cart = Cart(on_change=self.on_cart_change)
         self.worker = None
         self.task_prompt = None
 
         # 音声録音状態管理
         self.is_recording = False
         self.recording_thread = None
+        self.mic_capture = None  # 常時オープンのマイク入力（有効時のみ）
 
         # STT/TTS設定
         self.stt_url = STT_SERVER_URL
+        self.stt_stream_url = STT_STREAM_URL
         self.tts_url = TTS_SERVER_URL
         self.tts_speaker = TTS_SPEAKER_ID
-        self.stt_engine = "vosk"  # デフォルトはVosk ("vosk" or "whisper")
+        # 合成済み音声のキャッシュ（決まった言い回しはサーバーに問い合わせずに再生）
+        self.tts_cache = TTSCache(directory=os.path.join(os.getcwd(), "tts_cache"))
+        self.audio_player = None  # 常駐の再生ワーカー（get_audio_player() で作成）
+        self._audio_player_lock = threading.Lock()
+        self.speech_pipelines = []  # 合成・再生中の応答の読み上げ
+        self.stt_engine = "vosk"  # デフォルトはVosk ("vosk", "vosk_local", "whisper" or "hedged")
+        # "vosk_local": プロセス内の Vosk（モデルは起動時にバックグラウンドで読み込む）
+        self.local_vosk = LocalVosk(callback=self.log_message)
+        # "hedged": 同じ録音を Vosk と Whisper に同時に送り、先に得られた結果を使う（Whisper を優先）
+        self.stt_hedge = HedgedRecognizer(
+            {"vosk": self.send_wav_to_vosk, "whisper": self.send_wav_to_whisper},
+            preferred="whisper",
+            callback=self.log_message,
+        )
 
         # 接続情報設定
         self.link = 'https://shop.aeon.com/netsuper/'
@@ -66,8 +92,13 @@ class AINetSuperApp:
         # OpenAI API設定
         self.api_key = os.environ.get("GROQ_API_KEY", "")
         self.messages = []
-        self.client = Groq(api_key=self.api_key,)
-        self.groq = Groq(api_key=self.api_key,)
+        self.context_index = ChatContextIndex()  # 商品ごとの補足情報を引くための索引
+        # groq の読み込みに時間がかかるため、クライアントは画面の表示後に initialize_openai() で作る
+        self.client = None
+        self.groq = None
+        self.clients_ready = threading.Event()
+        # 送信する履歴をトークン予算内に収める（古いやり取りは裏で要約）
+        self.history = ChatHistoryManager(summarizer=self.summarize_history, callback=self.log_message)
         self.system_content = """あなたは優れた買い物アシスタントです。
         お客様が欲しい商品をリストにまとめる手助けをしてください。
         お客様が「〜を買いたい」「〜が欲しい」と言ったら、その商品を抽出してください。
@@ -77,28 +108,64 @@ class AINetSuperApp:
 
         # ブランドマッピング機能
         self.brand_map = {}  # 商品名 -> ブランド名のマッピング
+        self.brand_matcher = BrandMatcher()  # brand_map の検索用インデックス
         self.brand_map_path = os.path.join(os.getcwd(), "brand_map.json")
         self.load_brand_map()
 
-        self.st = ShoppingThread(
-            self.products,
-            self.link,
-            self.aeon_id,
-            self.pass_word,
-            self.log_message,  # コールバック関数
-            self.handle_error,  # エラーコールバック関数
-            self.task_prompt  # この時点ではNoneだが後で設定される
-        )
+        # ブラウザプールのログ（未使用ブラウザの終了など）をログ欄に表示
+        get_browser_pool().callback = self.log_message
+
         self.create_widgets()
-        self.initialize_openai()
+        self.log_sink.attach(self.root, self.log_text)
+        self.append_message({"role": "system", "content": self.system_content})
+
+        # 画面を表示してから、使う順に重いモジュールを読み込んでおく
+        self.prewarmer = Prewarmer(
+            [
+                ("AIクライアント", self.initialize_openai),
+                ("音声入出力", import_modules("numpy", "pyaudio", "vad", "audio_player", "mic_capture")),
+                ("音声合成・認識", import_modules("requests", "tts_aivis", "audio_encoding")),
+                ("再生ワーカー", self.get_audio_player),
+                ("Vosk モデル", self.preload_local_vosk),
+                ("browser-use", preload_browser_use),
+            ],
+            callback=self.log_message,
+        )
+        self.root.after(100, self.prewarmer.start)
 
     def initialize_openai(self):
+        """AIクライアントを作成（起動後にバックグラウンドで呼ばれる）"""
         try:
+            from groq import Groq
+
             self.client = Groq(api_key=self.api_key,)
-            self.messages.append({"role": "system", "content": self.system_content})
+            self.groq = Groq(api_key=self.api_key,)
             self.log_message("AIアシスタントを初期化しました")
         except Exception as e:
             self.log_message(f"AIアシスタントの初期化に失敗しました: {str(e)}")
+        finally:
+            self.clients_ready.set()
+
+    def wait_for_clients(self, timeout=30):
+        """AIクライアントの作成を待つ（起動直後に話しかけられた場合）"""
+        if not self.clients_ready.is_set():
+            self.log_message("AIアシスタントの準備を待っています...")
+            self.clients_ready.wait(timeout)
+        return self.client is not None
+
+    def get_audio_player(self):
+        """常駐の再生ワーカー（初回に作成）"""
+        with self._audio_player_lock:
+            if self.audio_player is None:
+                from audio_player import AudioPlayer
+
+                self.audio_player = AudioPlayer(callback=self.log_message)
+            return self.audio_player
+
+    def preload_local_vosk(self):
+        """内蔵 Vosk のモデルがあれば読み込みを始める"""
+        if self.local_vosk.available:
+            self.local_vosk.preload()
 
     def create_widgets(self):
         # ===== 大きめフォント設定（高齢者向け） =====
@@ -160,6 +227,11 @@ class AINetSuperApp:
                                       variable=self.voice_enabled)
         voice_check.pack(anchor=tk.W)
 
+        self.streaming_enabled = tk.BooleanVar(value=True)
+        streaming_check = ttk.Checkbutton(voice_frame, text="応答を逐次表示する（ストリーミング）",
+                                          variable=self.streaming_enabled)
+        streaming_check.pack(anchor=tk.W)
+
         # 右側：音声入力ボタン（目立つ位置に配置）
         voice_input_frame = ttk.LabelFrame(shopping_frame, text="🎤 音声入力", padding="15")
         voice_input_frame.pack(fill=tk.X, pady=10)
@@ -173,12 +245,20 @@ class AINetSuperApp:
         self.stt_engine_var = tk.StringVar(value="vosk")
         vosk_radio = ttk.Radiobutton(
             stt_engine_frame,
-            text="Vosk (ローカル)",
+            text="Vosk (サーバー)",
             variable=self.stt_engine_var,
             value="vosk"
         )
         vosk_radio.pack(side=tk.LEFT, padx=5)
 
+        vosk_local_radio = ttk.Radiobutton(
+            stt_engine_frame,
+            text="Vosk (内蔵)",
+            variable=self.stt_engine_var,
+            value="vosk_local"
+        )
+        vosk_local_radio.pack(side=tk.LEFT, padx=5)
+
         whisper_radio = ttk.Radiobutton(
             stt_engine_frame,
             text="Whisper (Groq API)",
@@ -187,6 +267,32 @@ class AINetSuperApp:
         )
         whisper_radio.pack(side=tk.LEFT, padx=5)
 
+        hedged_radio = ttk.Radiobutton(
+            stt_engine_frame,
+            text="両方 (速い方)",
+            variable=self.stt_engine_var,
+            value="hedged"
+        )
+        hedged_radio.pack(side=tk.LEFT, padx=5)
+
+        # 発話の終わりで録音を自動停止する（オフなら固定時間録音）
+        self.vad_enabled = tk.BooleanVar(value=True)
+        vad_check = ttk.Checkbutton(voice_input_frame, text="話し終わったら自動で録音を停止",
+                                    variable=self.vad_enabled)
+        vad_check.pack(anchor=tk.W)
+
+        # Vosk に録音しながら音声を送り、途中結果を入力欄に表示する
+        self.stt_streaming = tk.BooleanVar(value=True)
+        stt_stream_check = ttk.Checkbutton(voice_input_frame, text="Vosk: 話しながら認識（途中結果を表示）",
+                                           variable=self.stt_streaming)
+        stt_stream_check.pack(anchor=tk.W)
+
+        # マイクを開いたままにして、ボタンを押した直前の音声から録音する
+        self.mic_always_on = tk.BooleanVar(value=False)
+        mic_check = ttk.Checkbutton(voice_input_frame, text="マイクを常に開いておく（すぐに録音開始）",
+                                    variable=self.mic_always_on, command=self.toggle_mic_capture)
+        mic_check.pack(anchor=tk.W, pady=(0, 10))
+
         self.voice_input_button = ttk.Button(
             voice_input_frame,
             text="🎤 音声入力を開始",
@@ -303,12 +409,30 @@ class AINetSuperApp:
         exec_frame = ttk.LabelFrame(shopping_frame, text="実行コントロール", padding="10")
         exec_frame.pack(fill=tk.X, pady=5)
 
+        # 並列実行オプション
+        parallel_frame = ttk.Frame(exec_frame)
+        parallel_frame.pack(fill=tk.X, pady=(0, 5))
+
+        self.parallel_enabled = tk.BooleanVar(value=False)
+        parallel_check = ttk.Checkbutton(parallel_frame, text="商品ごとに並列でカートに追加",
+                                         variable=self.parallel_enabled)
+        parallel_check.pack(side=tk.LEFT)
+
+        ttk.Label(parallel_frame, text="同時実行数:").pack(side=tk.LEFT, padx=(15, 5))
+        self.parallel_limit = tk.IntVar(value=3)
+        parallel_spin = ttk.Spinbox(parallel_frame, from_=1, to=8, width=3,
+                                    textvariable=self.parallel_limit, font=LARGE_FONT)
+        parallel_spin.pack(side=tk.LEFT)
+
         self.start_button = ttk.Button(exec_frame, text="買い物を開始", command=self.start_shopping)
         self.start_button.pack(fill=tk.X, ipady=6)
 
         self.stop_button = ttk.Button(exec_frame, text="処理を停止", command=self.stop_shopping, state=tk.DISABLED)
         self.stop_button.pack(fill=tk.X, pady=5, ipady=6)
 
+        self.shopping_status_label = ttk.Label(exec_frame, text="待機中", foreground="gray")
+        self.shopping_status_label.pack(anchor=tk.W)
+
         # ログ表示
         log_label = ttk.Label(exec_frame, text="ログ:")
         log_label.pack(anchor=tk.W, pady=2)
@@ -348,16 +472,48 @@ class AINetSuperApp:
 
         self.chat_entry.delete(0, tk.END)
         self.display_user_message(user_message)
+        self.stop_speech()
 
         # AIに送信
-        self.messages.append({"role": "user", "content": user_message})
+        self.append_message({"role": "user", "content": user_message})
 
         # 別スレッドでAI応答を取得
         threading.Thread(target=self.get_ai_response).start()
 
+    def append_message(self, message):
+        """チャット履歴にメッセージを追加し、商品コンテキストの索引も更新する"""
+        self.messages.append(message)
+        self.context_index.add_message(message)
+
+    def summarize_history(self, summary, messages):
+        """
+        古いやり取りをローリング要約に畳み込む（ChatHistoryManager のバックグラウンドスレッドから呼ばれる）
+
+        Args:
+            summary: これまでの要約
+            messages: 新たに要約に含めるメッセージ
+
+        Returns:
+            str: 更新後の要約
+        """
+        conversation = "\n".join(
+            f"{msg.get('role')}: {msg.get('content')}" for msg in messages if msg.get("content")
+        )
+        response = self.client.chat.completions.create(
+            model="llama-3.1-8b-instant",
+            messages=[
+                {"role": "system", "content": """買い物アシスタントとお客様の会話の要約を更新してください。
+                買い物リストへの追加・削除、ブランドや数量などお客様の希望は必ず残してください。
+                挨拶などの重要でないやり取りは省き、300文字以内の日本語で要約だけを出力してください。"""},
+                {"role": "user", "content": f"これまでの要約:\n{summary or '（なし）'}\n\n追加の会話:\n{conversation}"},
+            ],
+            temperature=0.0,
+        )
+        return response.choices[0].message.content or summary
+
     def get_ai_response(self):
         try:
-            if not self.client:
+            if not self.wait_for_clients():
                 self.display_bot_message("エラー: AIクライアントが初期化されていません。APIキーを確認してください。")
                 return
 
@@ -414,17 +570,20 @@ class AINetSuperApp:
                 }
             ]
 
-            response = self.client.chat.completions.create(
+            streaming = self.streaming_enabled.get()
+            request_messages, tokens = self.history.build_request(self.messages)
+            self.log_message(f"AIへの送信トークン数（概算）: {tokens}")
+            message, displayed, spoken = self.create_completion(
+                streaming,
                 model="openai/gpt-oss-120b",
-                messages=self.messages,
+                messages=request_messages,
                 temperature=0.5,
                 tools=tools,
                 tool_choice="auto",
             )
 
             # ツール呼び出しがあるか確認
-            message = response.choices[0].message
-            self.messages.append({"role": "assistant", "content": message.content or ""})
+            self.append_message({"role": "assistant", "content": message.content or ""})
 
             # ツール呼び出しの処理
             if hasattr(message, 'tool_calls') and message.tool_calls:
@@ -440,7 +599,8 @@ class AINetSuperApp:
                             # 関数の実行
                             if function_name == "add_product_to_list":
                                 product_name = function_args.get("product_name", "")
-                                function_result = self.add_product(product_name)
+                                quantity = function_args.get("quantity") or 1
+                                function_result = self.add_product(product_name, int(quantity))
                             elif function_name == "remove_product_from_list":
                                 product_name = function_args.get("product_name", "")
                                 function_result = self.remove_product(product_name)
@@ -457,7 +617,7 @@ class AINetSuperApp:
                             function_result = f"エラー: {str(func_error)}"
 
                         # 修正: roleを'tool'に変更
-                        self.messages.append({
+                        self.append_message({
                             "role": "assistant",
                             "tool_call_id": tool_call.id,
                             "name": function_name,
@@ -466,17 +626,21 @@ class AINetSuperApp:
 
                 # ツール呼び出し結果を元に再度AIに問い合わせ
                 try:
-                    second_response = self.client.chat.completions.create(
+                    request_messages, tokens = self.history.build_request(self.messages)
+                    self.log_message(f"AIへの送信トークン数（概算）: {tokens}")
+                    second_message, second_displayed, second_spoken = self.create_completion(
+                        streaming,
                         model="openai/gpt-oss-120b",
-                        messages=self.messages,
+                        messages=request_messages,
                         temperature=0.5,
                     )
 
-                    bot_message = second_response.choices[0].message.content
-                    self.messages.append({"role": "assistant", "content": bot_message})
+                    bot_message = second_message.content
+                    self.append_message({"role": "assistant", "content": bot_message})
 
                     # UI更新
-                    self.root.after(0, lambda: self.process_bot_response(bot_message))
+                    self.root.after(0, lambda: self.process_bot_response(
+                        bot_message, displayed=second_displayed, spoken=second_spoken))
                 except Exception as second_error:
                     self.log_message(f"2回目の応答取得エラー: {str(second_error)}")
                     self.root.after(0, lambda: self.display_bot_message(f"エラーが発生しました: {str(second_error)}"))
@@ -484,18 +648,68 @@ class AINetSuperApp:
                 # 通常の応答処理
                 bot_message = message.content
                 # UI更新
-                self.root.after(0, lambda: self.process_bot_response(bot_message))
+                self.root.after(0, lambda: self.process_bot_response(bot_message, displayed=displayed, spoken=spoken))
 
         except Exception as e:
             error_details = traceback.format_exc()
             self.log_message(f"エラー詳細: {error_details}")
             self.root.after(0, lambda: self.display_bot_message(f"エラーが発生しました: {str(e)}"))
 
-    def process_bot_response(self, message):
-        self.display_bot_message(message)
+    def create_completion(self, streaming, **kwargs):
+        """
+        チャット補完を実行する
+
+        ストリーミング時は本文を届いた順にチャット欄へ表示し（音声合成が有効なら文ごとに読み上げ）、
+        最初のトークンまでの時間をログに出します。
+
+        Args:
+            streaming: ストリーミングで応答を受け取るか
+            **kwargs: chat.completions.create に渡す引数
+
+        Returns:
+            (message, displayed, spoken): content・tool_calls を持つ応答メッセージ、チャット欄に表示済みか、
+            読み上げのパイプラインに渡し済みか
+        """
+        if not streaming:
+            response = self.client.chat.completions.create(**kwargs)
+            return response.choices[0].message, False, False
+
+        view = ChatStreamView(self.root, self.chat_history)
+        speech = self.create_speech_pipeline() if self.voice_enabled.get() else None
+
+        def on_text(text):
+            view.push(text)
+            if speech:
+                speech.feed(text)
 
-        # 音声合成が有効なら実行
-        if self.voice_enabled.get():
+        try:
+            result = stream_completion(self.client, on_text, **kwargs)
+        finally:
+            view.finish()
+            if speech:
+                speech.finish()
+
+        if result.first_token_time is not None:
+            self.log_message(
+                f"最初のトークンまで: {result.first_token_time:.2f}秒（応答全体: {result.total_time:.2f}秒）"
+            )
+        spoken = speech is not None and bool(result.content)
+        return SimpleNamespace(content=result.content, tool_calls=result.tool_calls), view.started, spoken
+
+    def process_bot_response(self, message, displayed=False, spoken=False):
+        """
+        AI応答の後処理（表示・音声合成・商品追加の確認）
+
+        Args:
+            message: 応答本文
+            displayed: ストリーミングでチャット欄に表示済みの場合True
+            spoken: ストリーミング中に読み上げのパイプラインに渡し済みの場合True
+        """
+        if not displayed:
+            self.display_bot_message(message)
+
+        # 音声合成が有効なら実行（ストリーミング中に読み上げ済みなら二重に読み上げない）
+        if self.voice_enabled.get() and not spoken:
             threading.Thread(target=self.synthesize_speech, args=(message,)).start()
 
         # 商品提案を検出して追加確認ダイアログを表示
@@ -505,7 +719,7 @@ class AINetSuperApp:
             if messagebox.askyesno("商品追加確認", f"「{product}」を買い物リストに追加しますか？"):
                 self.add_product(product)
                 # AIに追加を通知して確認メッセージを表示
-                self.messages.append({"role": "user", "content": f"{product}をリストに追加します"})
+                self.append_message({"role": "user", "content": f"{product}をリストに追加します"})
                 threading.Thread(target=self.get_ai_response).start()
 
     def start_shopping(self):
@@ -513,7 +727,7 @@ class AINetSuperApp:
             messagebox.showwarning("警告", "すでに処理が実行中です")
             return
 
-        if not self.products:
+        if not len(self.cart):
             messagebox.showwarning("警告", "商品リストが空です。商品を追加してください。")
             return
 
@@ -525,6 +739,19 @@ class AINetSuperApp:
             messagebox.showwarning("警告", "ウェブサイト、ID、パスワードのすべてを入力してください。")
             return
 
+        # Tk の変数はこの（Tk の）スレッドで読み、ワーカーには値だけを渡す
+        parallel = self.parallel_enabled.get()
+        try:
+            parallel_limit = self.parallel_limit.get()
+        except tk.TclError:
+            messagebox.showwarning("警告", "同時実行数には1〜8の数字を入力してください。")
+            return
+        parallel_limit = min(max(parallel_limit, 1), 8)
+        if parallel:
+            # ワーカーのブラウザもプールから借りるため、メインの1台と合わせた数までプールの上限を広げる
+            pool = get_browser_pool()
+            pool.max_size = max(pool.max_size, parallel_limit + 1)
+
         self.start_button["state"] = "disabled"
         self.stop_button["state"] = "normal"
         self.log_message("買い物処理を開始します...")
@@ -540,17 +767,25 @@ class AINetSuperApp:
 
             # 新しいワーカーを作成
             self.worker = ShoppingThread(
-                self.products.copy(),
+                self.cart.names(),
                 self.link,
                 self.aeon_id,
                 self.pass_word,
                 self.log_message,
-                self.handle_error,
-                None  # 初期値はNone
+                None,  # エラーは on_finished で受け取る
+                None,  # 初期値はNone
+                parallel=parallel,
+                max_concurrency=parallel_limit,
+                quantities=self.cart.quantities(),
+                on_started=self.on_shopping_started,
+                on_progress=self.on_shopping_progress,
+                on_finished=self.on_shopping_finished,
+                dispatch=lambda fn: self.root.after(0, fn)
             )
 
             # メッセージ履歴を設定
             self.worker.messages = self.messages.copy()
+            self.worker.context_index = self.context_index
 
             # タスクプロンプトを生成
             try:
@@ -563,12 +798,9 @@ class AINetSuperApp:
             # ワーカーにタスクプロンプトを設定
             self.worker.task_prompt = self.task_prompt
 
-            # スレッド開始
+            # スレッド開始（終了は on_finished で通知される）
             self.worker.start()
 
-            # ステータス監視スレッド開始
-            threading.Thread(target=self.monitor_thread_status, daemon=True).start()
-
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
@@ -577,35 +809,36 @@ class AINetSuperApp:
             self.stop_button["state"] = "disabled"
             messagebox.showerror("エラー", f"買い物処理の開始に失敗しました: {str(e)}")
 
-    def synthesize_speech(self, text):
-        """TTSサーバーを使用して音声合成を実行"""
-        try:
-            # 長すぎる場合は短縮
-            if len(text) > 300:
-                text = text[:297] + "..."
-
-            # 音声合成用のクエリを作成
-            params = {"text": text, "speaker": self.tts_speaker}
-            query_response = requests.post(
-                f"{self.tts_url}/audio_query",
-                params=params,
-                timeout=10
-            ).json()
-
-            # 音声合成を実行
-            audio_response = requests.post(
-                f"{self.tts_url}/synthesis",
-                params={"speaker": self.tts_speaker},
-                headers={"accept": "audio/wav", "Content-Type": "application/json"},
-                data=json.dumps(query_response),
-                timeout=30
-            )
+    def create_speech_pipeline(self):
+        """
+        現在のTTS設定で文単位の音声合成パイプラインを作成
+
+        再生は常駐の再生ワーカーのキューに積むため、複数の応答の音声が重なることはありません。
+        """
+        import tts_aivis
+
+        pipeline = SpeechPipeline(
+            synthesize=lambda sentence: tts_aivis.create_synthesis(
+                sentence, self.tts_url, self.tts_speaker, cache=self.tts_cache
+            ),
+            play=self.get_audio_player().enqueue,
+            callback=self.log_message,
+        )
+        self.speech_pipelines = [p for p in self.speech_pipelines if not p.done] + [pipeline]
+        return pipeline
 
-            # レスポンスから音声データを取得して再生
-            audio_io = io.BytesIO(audio_response.content)
-            audio = AudioSegment.from_file(audio_io, format="wav")
-            play(audio)
+    def stop_speech(self):
+        """読み上げ中・読み上げ待ちの音声を止める（新しいメッセージの送信や録音の開始時）"""
+        pipelines, self.speech_pipelines = self.speech_pipelines, []
+        for pipeline in pipelines:
+            pipeline.cancel()
+        if self.audio_player:
+            self.audio_player.cancel()
 
+    def synthesize_speech(self, text):
+        """TTSサーバーを使用して文ごとに音声合成し、合成できた文から順に再生"""
+        try:
+            self.create_speech_pipeline().speak(text)
         except Exception as e:
             self.log_message(f"音声合成エラー: {str(e)}")
 
@@ -616,15 +849,18 @@ class AINetSuperApp:
             if os.path.exists(self.brand_map_path):
                 with open(self.brand_map_path, "r", encoding="utf-8") as f:
                     self.brand_map = json.load(f)
+                self.brand_matcher = BrandMatcher(self.brand_map)
                 # ウィジェットが存在する場合のみログ出力
                 if hasattr(self, 'log_text'):
                     self.log_message(f"ブランドマップを読み込みました: {len(self.brand_map)}件")
             else:
                 self.brand_map = {}
+                self.brand_matcher = BrandMatcher()
         except Exception as e:
             if hasattr(self, 'log_text'):
                 self.log_message(f"ブランドマップ読み込みエラー: {str(e)}")
             self.brand_map = {}
+            self.brand_matcher = BrandMatcher()
 
     def save_brand_map(self):
         """brand_map.json に保存する"""
@@ -646,6 +882,7 @@ class AINetSuperApp:
 
         # 上書き/追加
         self.brand_map[key] = brand
+        self.brand_matcher.add(key, brand)
         self.save_brand_map()
         self.update_brand_listbox()
 
@@ -669,6 +906,7 @@ class AINetSuperApp:
 
         if key in self.brand_map:
             del self.brand_map[key]
+            self.brand_matcher.remove(key)
             self.save_brand_map()
             self.update_brand_listbox()
             self.log_message(f"ブランド設定を削除しました: {key}")
@@ -680,23 +918,8 @@ class AINetSuperApp:
             self.brand_listbox.insert(tk.END, f"{k} → {v}")
 
     def get_preferred_brand(self, product_name):
-        """product_name に対して brand_map のキーが含まれていれば優先ブランドを返す（部分一致、ケース不問）"""
-        if not product_name:
-            return None
-
-        low = product_name.lower()
-
-        # 完全一致を優先
-        for k, v in self.brand_map.items():
-            if k.lower() == low:
-                return v
-
-        # 部分一致（キーワードが商品名に含まれる）
-        for k, v in self.brand_map.items():
-            if k.lower() in low:
-                return v
-
-        return None
+        """product_name に対して brand_map のキーが含まれていれば優先ブランドを返す（完全一致 > 最長の部分一致、ケース不問）"""
+        return self.brand_matcher.find(product_name)
 
     def toggle_voice_input(self):
         """音声入力のオン/オフを切り替え"""
@@ -706,41 +929,80 @@ class AINetSuperApp:
             self.voice_input_button.config(text="🎤 音声入力")
             self.log_message("録音を停止しました")
         else:
-            # 録音を開始
+            # 録音を開始（読み上げ中の音声がマイクに入らないよう止める）
+            self.stop_speech()
             self.is_recording = True
             self.voice_input_button.config(text="⏹️ 停止")
             self.log_message("🎤 録音準備中...")
             self.recording_thread = threading.Thread(target=self.record_audio_input, daemon=True)
             self.recording_thread.start()
 
-    def record_audio_input(self, duration=5, sample_rate=16000, input_volume=3.0):
-        """マイクから音声を録音してSTTで変換し、チャットに送信"""
+    def toggle_mic_capture(self):
+        """常時オープンのマイク入力を開始/停止"""
+        if self.mic_always_on.get():
+            if self.mic_capture is None:
+                from mic_capture import MicCapture
+
+                self.mic_capture = MicCapture(callback=self.log_message)
+            self.mic_capture.start()
+        elif self.mic_capture is not None:
+            self.mic_capture.stop()
+            self.log_message("マイクの常時オープンを停止しました")
+
+    def record_audio_input(self, duration=5, sample_rate=16000, input_volume=3.0, max_duration=15):
+        """
+        マイクから音声を録音してSTTで変換し、チャットに送信
+
+        VADが有効な場合は話し終わった時点（無音が続いた時点）で録音を止め、前後の無音を切り落とします。
+        最長でも max_duration 秒で止めます。VADが無効な場合は duration 秒録音します。
+        """
+        stream_client = None
         try:
+            import numpy as np
+            import pyaudio
+            from vad import EnergyVAD
+
+            vad = EnergyVAD(sample_rate=sample_rate, max_duration=max_duration) if self.vad_enabled.get() else None
+
+            # 接続（最大 open_timeout 秒）はマイクを開く前に済ませる（開いた後だと待つ間に入力があふれる）
+            stt_engine = self.stt_engine_var.get()
+            if stt_engine == "vosk_local":
+                stream_client = self.start_local_vosk(sample_rate)
+            elif stt_engine == "vosk" and self.stt_streaming.get():
+                stream_client = self.start_stt_stream(sample_rate)
+
             CHUNK = 1024
             FORMAT = pyaudio.paInt16
             CHANNELS = 1
 
-            audio = pyaudio.PyAudio()
-
-            stream = audio.open(
-                format=FORMAT,
-                channels=CHANNELS,
-                rate=sample_rate,
-                input=True,
-                frames_per_buffer=CHUNK
-            )
+            capture = self.mic_capture if self.mic_capture and self.mic_capture.running else None
+            if capture and capture.sample_rate == sample_rate:
+                # 開いたままのマイクから、ボタンを押す直前の音声を含めて読み出す
+                audio = None
+                stream = capture.reader(pre_roll=0.3)
+            else:
+                audio = pyaudio.PyAudio()
+
+                stream = audio.open(
+                    format=FORMAT,
+                    channels=CHANNELS,
+                    rate=sample_rate,
+                    input=True,
+                    frames_per_buffer=CHUNK
+                )
 
-            # マイクのウォームアップ（最初の数フレームを破棄）
-            self.log_message("マイクを準備中...")
-            warmup_chunks = int(sample_rate / CHUNK * 0.5)  # 0.5秒間ウォームアップ
-            for _ in range(warmup_chunks):
-                stream.read(CHUNK)  # 読み捨て
+                # マイクのウォームアップ（最初の数フレームを破棄）
+                self.log_message("マイクを準備中...")
+                warmup_chunks = int(sample_rate / CHUNK * 0.5)  # 0.5秒間ウォームアップ
+                for _ in range(warmup_chunks):
+                    stream.read(CHUNK)  # 読み捨て
 
             self.log_message("録音中...")
 
             frames = []
             # 録音時間を少し長めに調整（ウォームアップ分を考慮）
-            total_chunks = int(sample_rate / CHUNK * (duration + 0.5))
+            total_chunks = int(sample_rate / CHUNK * ((max_duration if vad else duration) + 0.5))
+            started = time.time()
 
             for i in range(total_chunks):
                 if not self.is_recording:
@@ -752,32 +1014,50 @@ class AINetSuperApp:
                 audio_data = np.frombuffer(data, dtype=np.int16)
                 audio_data = np.clip(audio_data * input_volume, -32768, 32767).astype(np.int16)
                 frames.append(audio_data.tobytes())
+                if stream_client:
+                    stream_client.send(frames[-1])
 
-            stream.stop_stream()
-            stream.close()
-            audio.terminate()
-
-            self.log_message("✓ 録音完了")
-
-            # 一時ファイルとして保存
-            import tempfile
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_wav_path = temp_file.name
+                if vad and vad.process(frames[-1]):
+                    break
 
-            with wave.open(temp_wav_path, "wb") as wf:
-                wf.setnchannels(CHANNELS)
-                wf.setsampwidth(audio.get_sample_size(FORMAT))
-                wf.setframerate(sample_rate)
-                wf.writeframes(b"".join(frames))
+            if audio is not None:
+                stream.stop_stream()
+                stream.close()
+                audio.terminate()
+
+            if vad:
+                # 前後の無音を切り落として送る
+                if not vad.speech_detected:
+                    self.log_message("⚠ 発話が検出されませんでした")
+                    if stream_client:
+                        stream_client.close()
+                    self.is_recording = False
+                    self.root.after(0, lambda: self.voice_input_button.config(text="🎤 音声入力を開始"))
+                    self.root.after(0, lambda: self.recording_status_label.config(text="準備完了", foreground="gray"))
+                    return
+                frames = [vad.trimmed()]
+                self.log_message(
+                    f"✓ 録音完了（{time.time() - started:.1f}秒で停止、送信する音声 {len(frames[0]) / 2 / sample_rate:.1f}秒）"
+                )
+            else:
+                self.log_message("✓ 録音完了")
 
-            # STTサーバーに送信
-            recognized_text = self.send_wav_to_stt(temp_wav_path)
+            recognized_text = None
+            if stream_client:
+                # 録音中に送った音声の最終結果を受け取る（失敗したら従来どおりアップロード）
+                try:
+                    recognized_text = stream_client.finish()
+                    rtf = getattr(stream_client, "real_time_factor", None)
+                    self.log_message(
+                        f"音声認識: 最終結果まで {stream_client.final_latency * 1000:.0f}ms"
+                        + (f"（RTF {rtf:.2f}）" if rtf is not None else "")
+                    )
+                except Exception as e:
+                    self.log_message(f"{str(e)}（録音データを送信して認識します）")
 
-            # 一時ファイルを削除
-            try:
-                os.remove(temp_wav_path)
-            except Exception as e:
-                self.log_message(f"一時ファイル削除エラー: {str(e)}")
+            if recognized_text is None:
+                # 録音データをメモリ上でエンコードしてSTTに送信
+                recognized_text = self.send_audio_to_stt(b"".join(frames), sample_rate)
 
             # 認識されたテキストをチャットに入力
             if recognized_text:
@@ -796,27 +1076,86 @@ class AINetSuperApp:
 
         except Exception as e:
             self.log_message(f"音声入力エラー: {str(e)}")
+            if stream_client:
+                stream_client.close()
             self.is_recording = False
             self.root.after(0, lambda: self.voice_input_button.config(text="🎤 音声入力を開始"))
             self.root.after(0, lambda: self.recording_status_label.config(text="エラー", foreground="red"))
 
-    def send_wav_to_stt(self, wav_path):
-        """WAVファイルを選択されたSTTエンジンに送信してテキストを取得"""
+    def show_partial_transcript(self, text):
+        """認識の途中結果を入力欄に表示（認識スレッドから呼ばれる）"""
+        def update():
+            self.chat_entry.delete(0, tk.END)
+            self.chat_entry.insert(0, text)
+        self.root.after(0, update)
+
+    def start_local_vosk(self, sample_rate):
+        """
+        プロセス内の Vosk で録音しながらの認識を開始する
+
+        Returns:
+            LocalVoskSession。モデルが使えない場合はNone（録音後に Vosk サーバーへ送信する）
+        """
+        if not self.local_vosk.ready:
+            self.log_message("内蔵 Vosk のモデルが読み込まれていません（録音後に Vosk サーバーへ送信します）")
+            self.local_vosk.preload()
+            return None
+        return self.local_vosk.session(sample_rate, on_partial=self.show_partial_transcript)
+
+    def start_stt_stream(self, sample_rate):
+        """
+        Vosk サーバーへのストリーミング認識を開始する
+
+        Returns:
+            VoskStreamingClient。接続できない場合はNone（録音後にアップロードする）
+        """
+        client = VoskStreamingClient(
+            self.stt_stream_url,
+            sample_rate=sample_rate,
+            on_partial=self.show_partial_transcript,
+            callback=self.log_message,
+        )
+        try:
+            client.start()
+            return client
+        except Exception as e:
+            self.log_message(f"Vosk ストリーミングに接続できません: {str(e)}（録音後に送信します）")
+            return None
+
+    def send_audio_to_stt(self, pcm, sample_rate):
+        """
+        録音データを選択されたSTTエンジンに送信してテキストを取得
+
+        Args:
+            pcm: 16bit モノラルの PCM データ
+            sample_rate: サンプリングレート
+        """
         # 選択されたSTTエンジンを取得
         stt_engine = self.stt_engine_var.get()
 
         if stt_engine == "whisper":
-            return self.send_wav_to_whisper(wav_path)
+            return self.send_wav_to_whisper(pcm, sample_rate)
+        elif stt_engine == "vosk_local" and self.local_vosk.ready:
+            return self.local_vosk.transcribe(pcm, sample_rate)
+        elif stt_engine == "hedged":
+            text, _ = self.stt_hedge.recognize(pcm, sample_rate)
+            stats = self.stt_hedge.stats()
+            self.log_message("STT（並列）採用率: " + ", ".join(
+                f"{name} {st['win_rate']:.0%}（平均 {st['avg_latency'] * 1000:.0f}ms）" for name, st in stats.items()
+            ))
+            return text
         else:
-            return self.send_wav_to_vosk(wav_path)
+            return self.send_wav_to_vosk(pcm, sample_rate)
 
-    def send_wav_to_vosk(self, wav_path):
-        """WAVファイルをVosk STTサーバーに送信してテキストを取得"""
+    def send_wav_to_vosk(self, pcm, sample_rate):
+        """録音データをWAVにしてVosk STTサーバーに送信してテキストを取得"""
         try:
-            with open(wav_path, "rb") as audio_file:
-                # stt_client.pyと同じ形式でファイルを送信
-                files = {"file": ("audio.wav", audio_file, "audio/wav")}
-                response = requests.post(self.stt_url, files=files, timeout=10)
+            import requests
+            from audio_encoding import encode_wav
+
+            # stt_client.pyと同じ形式で送信（一時ファイルを使わずメモリ上のWAVをそのまま送る）
+            files = {"file": ("audio.wav", encode_wav(pcm, sample_rate), "audio/wav")}
+            response = requests.post(self.stt_url, files=files, timeout=10)
 
             self.log_message(f"Vosk STT: HTTP {response.status_code}")
 
@@ -844,30 +1183,31 @@ class AINetSuperApp:
             self.log_message(f"詳細: {traceback.format_exc()}")
             return ""
 
-    def send_wav_to_whisper(self, wav_path):
-        """WAVファイルをGroq Whisper APIに送信してテキストを取得"""
+    def send_wav_to_whisper(self, pcm, sample_rate):
+        """録音データをGroq Whisper APIに送信してテキストを取得（soundfile があればFLACで送る）"""
         try:
-            if not self.groq:
+            if not self.wait_for_clients():
                 self.log_message("エラー: Groq APIクライアントが初期化されていません")
                 return ""
 
-            file_size = os.path.getsize(wav_path)
-            self.log_message(f"Whisper API: ファイルサイズ {file_size} bytes")
+            from audio_encoding import encode_for_upload
+
+            filename, data, _ = encode_for_upload(pcm, sample_rate)
+            file_size = len(data)
+            self.log_message(f"Whisper API: {filename} {file_size} bytes（PCM {len(pcm)} bytes）")
 
             # ファイルサイズが小さすぎる場合は警告
             if file_size < 1000:
                 self.log_message("警告: 音声ファイルが小さすぎる可能性があります")
 
-            # ファイルを開いて送信
-            with open(wav_path, "rb") as audio_file:
-                # Groq APIに送信（最もシンプルな方法）
-                transcription = self.groq.audio.transcriptions.create(
-                    file=(os.path.basename(wav_path), audio_file),
-                    model="whisper-large-v3",
-                    language="ja",
-                    response_format="verbose_json",  # より詳細な情報を取得
-                    temperature=0.0
-                )
+            # Groq APIに送信（メモリ上のデータをそのまま送る）
+            transcription = self.groq.audio.transcriptions.create(
+                file=(filename, data),
+                model="whisper-large-v3",
+                language="ja",
+                response_format="verbose_json",  # より詳細な情報を取得
+                temperature=0.0
+            )
 
             # レスポンスからテキストを取得
             if hasattr(transcription, 'text'):
@@ -916,10 +1256,17 @@ class AINetSuperApp:
         self.chat_history.see(tk.END)
         self.chat_history.configure(state='disabled')
 
-    def update_product_listbox(self):
-        self.product_listbox.delete(0, tk.END)  # 一旦全部クリア
-        for product in self.products:
-            self.product_listbox.insert(tk.END, product)
+    def on_cart_change(self, change, position, item):
+        """買い物リストの変更を該当行だけ product_listbox に反映する"""
+        if change == CHANGE_INSERT:
+            self.product_listbox.insert(position, format_item(item))
+        elif change == CHANGE_UPDATE:
+            self.product_listbox.delete(position)
+            self.product_listbox.insert(position, format_item(item))
+        elif change == CHANGE_DELETE:
+            self.product_listbox.delete(position)
+        else:
+            self.product_listbox.delete(0, tk.END)
 
     def add_product_manual(self):
         product = self.product_entry.get().strip()
@@ -927,53 +1274,49 @@ class AINetSuperApp:
             self.add_product(product)
             self.product_entry.delete(0, tk.END)
 
-    def add_product(self, product):
+    def add_product(self, product, quantity=1):
         if not product:
             return "商品名が指定されていません"
 
-        # 優先ブランドがあれば適用
-        brand = self.get_preferred_brand(product)
-        display_name = product
+        # 優先ブランドがあれば適用（既にブランド表記が含まれていれば付加しない）
+        display_name, brand = self.brand_matcher.apply(product)
+        if display_name != product:
+            self.log_message(f"ブランド「{brand}」を適用しました")
 
-        if brand:
-            # 既にブランド表記が含まれていないか確認して付加
-            if brand.lower() not in product.lower():
-                display_name = f"{product}（{brand}）"
-                self.log_message(f"ブランド「{brand}」を適用しました")
-
-        # 重複チェック
-        if display_name in self.products:
-            return f"「{display_name}」は既にリストに追加されています"
+        # すでにある商品なら数量を合算する
+        item, merged = self.cart.add(display_name, quantity)
+        if merged:
+            self.log_message(f"商品「{item.name}」の数量を{item.quantity}個にしました")
+            notification = f"ユーザーが「{item.name}」の数量を{item.quantity}個にしました"
+            self.append_message({"role": "system", "content": notification})
+            return f"「{item.name}」はリストにあるため、数量を{item.quantity}個にしました。他に必要な商品はありますか？"
 
-        self.products.append(display_name)
-        self.product_listbox.insert(tk.END, display_name)
-        self.log_message(f"商品「{display_name}」をリストに追加しました")
-        self.update_product_listbox()
+        self.log_message(f"商品「{format_item(item)}」をリストに追加しました")
 
         # AIに追加を通知（ブランド情報を含める）
-        notification = f"ユーザーが「{product}」を買い物リストに追加しました"
+        notification = f"ユーザーが「{product}」を{item.quantity}個買い物リストに追加しました"
         if brand:
             notification += f"（優先ブランド: {brand}）"
-        self.messages.append({"role": "system", "content": notification})
+        self.append_message({"role": "system", "content": notification})
 
         # 商品追加のフィードバックメッセージを返す
-        return f"「{display_name}」をリストに追加しました。他に必要な商品はありますか？"
+        return f"「{format_item(item)}」をリストに追加しました。他に必要な商品はありますか？"
 
     def remove_product(self, product):
         """商品をリストから削除する"""
         if not product:
             return "商品名が指定されていません"
 
-        if product not in self.products:
+        item = self.cart.remove(product)
+        if item is None:
             return f"「{product}」はリストに存在しません"
 
-        self.products.remove(product)
-        self.update_product_listbox()
+        product = item.name
         self.log_message(f"商品「{product}」をリストから削除しました")
 
         # AIに削除を通知
         notification = f"ユーザーが「{product}」を買い物リストから削除しました"
-        self.messages.append({"role": "system", "content": notification})
+        self.append_message({"role": "system", "content": notification})
 
         return f"「{product}」をリストから削除しました"
 
@@ -984,15 +1327,12 @@ class AINetSuperApp:
 
         # 逆順に削除（インデックスがずれないように）
         for i in sorted(selected, reverse=True):
-            product = self.product_listbox.get(i)
-            self.product_listbox.delete(i)
-            self.products.remove(product)
-            self.log_message(f"商品「{product}」をリストから削除しました")
+            item = self.cart.remove_at(i)
+            self.log_message(f"商品「{item.name}」をリストから削除しました")
 
     def clear_list(self):
-        if self.product_listbox.size() > 0:
-            self.product_listbox.delete(0, tk.END)
-            self.products.clear()
+        if len(self.cart) > 0:
+            self.cart.clear()
             self.log_message("商品リストをクリアしました")
 
     def stop_shopping(self):
@@ -1002,50 +1342,42 @@ class AINetSuperApp:
                 self.worker.stop()
                 self.stop_button["state"] = "disabled"
 
-    def monitor_thread_status(self):
-        """ワーカースレッドのステータスを監視して、完了したらUIを更新する"""
-        while self.worker and self.worker.is_alive():
-            # 0.5秒ごとにチェック
-            time.sleep(0.5)
+    def on_shopping_started(self, total):
+        """買い物処理の開始（メインスレッド）"""
+        self.shopping_status_label.config(text=f"実行中: 0/{total}件", foreground="blue")
 
-        # スレッドが終了したらUIを更新
-        self.root.after(0, self.update_ui_after_thread)
-
-    def update_ui_after_thread(self):
-        """スレッド終了後のUI更新を行う"""
-        self.start_button["state"] = "normal"
-        self.stop_button["state"] = "disabled"
-        self.log_message("処理が完了しました")
-
-    def handle_error(self, error_msg):
-        self.log_message(error_msg)
-        self.root.after(0, lambda: self.update_ui_after_error(error_msg))
+    def on_shopping_progress(self, product, status, added, total):
+        """商品ごとの進捗（メインスレッド）"""
+        if status == PRODUCT_ADDED:
+            self.log_message(f"進捗: 「{product}」をカートに追加しました（{added}/{total}件）")
+        elif status == PRODUCT_RETRY:
+            self.log_message(f"進捗: 「{product}」は注文前にもう一度追加します")
+        else:
+            self.log_message(f"進捗: 「{product}」の商品ページが見つかりません。検索し直します")
+        self.shopping_status_label.config(text=f"実行中: {added}/{total}件")
 
-    def update_ui_after_error(self, error_msg):
+    def on_shopping_finished(self, result, error_msg):
+        """買い物処理の終了（メインスレッド）"""
         self.start_button["state"] = "normal"
         self.stop_button["state"] = "disabled"
-        messagebox.showerror("エラー", error_msg)
-
-    def log_message(self, message):
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        message_with_timestamp = f"[{timestamp}] {message}"
-
-        # UIスレッドからの呼び出しか確認
-        if threading.current_thread() == threading.main_thread():
-            self._update_log(message_with_timestamp)
+        if result == RESULT_SUCCEEDED:
+            self.shopping_status_label.config(text="完了", foreground="green")
+            self.log_message("処理が完了しました")
+        elif result == RESULT_STOPPED:
+            self.shopping_status_label.config(text="中断しました", foreground="gray")
+            self.log_message("処理を中断しました")
         else:
-            # 別スレッドからの場合、UIスレッドにタスクを委譲
-            self.root.after(0, lambda: self._update_log(message_with_timestamp))
+            self.shopping_status_label.config(text="エラー", foreground="red")
+            messagebox.showerror("エラー", error_msg)
 
-    def _update_log(self, message):
-        self.log_text.configure(state='normal')
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)  # 自動スクロール
-        self.log_text.configure(state='disabled')
+    def log_message(self, message):
+        """ログを追加（どのスレッドからでも呼べる。ログ欄への表示は LogSink がまとめて行う）"""
+        self.log_sink.emit(message)
 
     def on_closing(self):
         if self.worker and self.worker.is_alive():
             if messagebox.askyesno("確認", "処理が実行中です。本当に終了しますか？"):
+                self.release_resources()
                 self.log_message("終了処理中...")
                 # 先にrunningフラグをFalseにしてループを抜ける
                 self.worker.running = False
@@ -1055,8 +1387,17 @@ class AINetSuperApp:
             else:
                 return
         else:
+            self.release_resources()
             self.root.destroy()
 
+    def release_resources(self):
+        """終了時に再生ワーカー・常時オープンのマイク・ログファイルを閉じる"""
+        if self.audio_player:
+            self.audio_player.close()
+        if self.mic_capture:
+            self.mic_capture.stop()
+        self.log_sink.close()
+
 
 # models.py ファイル用のコード
 if not os.path.exists('models.py'):
@@ -0,0 +1,182 @@
+"""
+常時オープンのマイク入力
+
+マイクの入力ストリームを1本だけ開いたままにし、録音した音声を固定長の
+リングバッファ（事前確保した NumPy 配列）に書き続けます。音声入力ボタンを
+押すたびにストリームを開いてウォームアップを捨てる必要がなくなり、押した直前
+（pre_roll 秒）の音声から録音を始められます。
+"""
+
+import threading
+from typing import Callable, Optional
+
+import numpy as np
+
+
+class MicCapture:
+    """
+    マイク入力をリングバッファに書き続けるバックグラウンドの録音サービス
+
+    Attributes:
+        sample_rate: サンプリングレート
+        chunk: 1回に読み込むフレーム数
+        overruns: 読み出しが追いつかず古い音声が上書きされた回数
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        chunk: int = 1024,
+        buffer_seconds: float = 30.0,
+        callback: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Args:
+            sample_rate: サンプリングレート（16bit モノラル）
+            chunk: 1回に読み込むフレーム数
+            buffer_seconds: リングバッファに保持する秒数
+            callback: ログメッセージ用のコールバック関数
+        """
+        self.sample_rate = sample_rate
+        self.chunk = chunk
+        self.callback = callback
+        self.overruns = 0
+
+        self._buffer = np.zeros(int(sample_rate * buffer_seconds), dtype=np.int16)
+        self._written = 0  # これまでに書き込んだサンプル数の合計
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def log(self, message: str) -> None:
+        """ログメッセージをコールバック経由で送信"""
+        if self.callback:
+            self.callback(message)
+
+    @property
+    def running(self) -> bool:
+        """録音中か"""
+        return self._running
+
+    def start(self) -> None:
+        """入力ストリームを開いて録音を始める"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="MicCapture", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """録音をやめて入力ストリームを閉じる"""
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self) -> None:
+        """入力ストリームから読み込んでリングバッファに書く（専用スレッド）"""
+        import pyaudio
+
+        audio = pyaudio.PyAudio()
+        stream = None
+        try:
+            stream = audio.open(
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=self.sample_rate,
+                input=True,
+                frames_per_buffer=self.chunk,
+            )
+            self.log("マイクを常時オープンにしました")
+            size = self._buffer.size
+            while self._running:
+                samples = np.frombuffer(stream.read(self.chunk, exception_on_overflow=False), dtype=np.int16)
+                with self._condition:
+                    start = self._written % size
+                    end = start + samples.size
+                    if end <= size:
+                        self._buffer[start:end] = samples
+                    else:
+                        split = size - start
+                        self._buffer[start:] = samples[:split]
+                        self._buffer[:end - size] = samples[split:]
+                    self._written += samples.size
+                    self._condition.notify_all()
+        except Exception as e:
+            self.log(f"マイク入力エラー: {str(e)}")
+        finally:
+            self._running = False
+            if stream is not None:
+                stream.stop_stream()
+                stream.close()
+            audio.terminate()
+            with self._condition:
+                self._condition.notify_all()
+
+    def reader(self, pre_roll: float = 0.3) -> "MicReader":
+        """
+        現在位置（の pre_roll 秒前）から読み出すリーダーを作る
+
+        Args:
+            pre_roll: 遡って含める秒数
+
+        Returns:
+            MicReader: 録音した音声を順に読み出すリーダー
+        """
+        with self._condition:
+            back = min(int(pre_roll * self.sample_rate), self._written, self._buffer.size)
+            return MicReader(self, self._written - back)
+
+    def _read(self, position: int, frames: int, timeout: float):
+        """
+        position から frames サンプルを読み出す（揃うまで待つ）
+
+        Returns:
+            (PCMデータ, 次の読み出し位置)。録音が止まっていてデータが揃わない場合はデータが短くなる
+        """
+        size = self._buffer.size
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._written - position >= frames or not self._running, timeout=timeout
+            )
+            # 上書きされた分は読み飛ばす
+            if self._written - position > size:
+                self.overruns += 1
+                position = self._written - size
+            frames = min(frames, self._written - position)
+            start = position % size
+            end = start + frames
+            if end <= size:
+                data = self._buffer[start:end].tobytes()
+            else:
+                data = self._buffer[start:].tobytes() + self._buffer[:end - size].tobytes()
+        return data, position + frames
+
+
+class MicReader:
+    """MicCapture の音声を pyaudio の stream.read() と同じ要領で読み出すリーダー"""
+
+    def __init__(self, capture: MicCapture, position: int):
+        self.capture = capture
+        self.position = position
+
+    def read(self, frames: int, timeout: float = 2.0) -> bytes:
+        """
+        次の frames サンプルを読み出す
+
+        Args:
+            frames: 読み出すサンプル数
+            timeout: データが揃うまで待つ最大秒数
+
+        Returns:
+            bytes: 16bit モノラルの PCM データ
+
+        Raises:
+            RuntimeError: マイク入力が止まっている場合
+        """
+        data, self.position = self.capture._read(self.position, frames, timeout)
+        if not data and not self.capture.running:
+            raise RuntimeError("マイク入力が停止しています")
+        return data
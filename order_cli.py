@@ -0,0 +1,247 @@
+"""
+画面なしで注文を実行するコマンド
+
+注文内容を JSON ファイルで受け取り、GUI や音声のモジュールを読み込まずに
+OrderScheduler で注文し、結果と手順ごとの所要時間を JSON で出力します。
+異なるアカウントの注文は --browsers の数まで並行して実行し、失敗した注文は --retries 回まで
+間隔を空けて再実行します。ログは標準エラー出力に、結果は標準出力（または --output のファイル）に書きます。
+
+    python order_cli.py order orders.json
+    python -m order_cli order orders.json --headless --browsers 3 --output result.json
+
+注文ファイルの例（注文1件ならオブジェクト、複数なら配列か {"orders": [...]}）:
+
+    {
+      "id": "weekly",
+      "link": "https://shop.aeon.com/netsuper/",
+      "aeon_id": "00000000000",
+      "password_env": "AEON_PASSWORD",
+      "products": ["食パン", {"name": "牛乳", "quantity": 2}],
+      "brands": {"牛乳": "明治"}
+    }
+
+password の代わりに password_env で環境変数名を指定できます。brands を省略した場合は
+brand_map.json（あれば）の優先ブランドを使います。
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from brand_matcher import BrandMatcher
+from cart import MAX_QUANTITY, Cart
+from models import ProductInfo, WebpageInfo
+from order_scheduler import OrderRequest, OrderScheduler
+from shopping_session import RESULT_SUCCEEDED
+
+# OrderScheduler の結果以外に order_cli が返す結果
+RESULT_INVALID = "invalid"  # 注文内容の検証に失敗した
+
+
+def log(message: str) -> None:
+    """ログを標準エラー出力に書く（標準出力は結果のJSON専用）"""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"[{timestamp}] {message}", file=sys.stderr, flush=True)
+
+
+def load_orders(path: str) -> List[Dict[str, Any]]:
+    """
+    注文ファイルを読み込む
+
+    Args:
+        path: JSONファイルのパス（"-" なら標準入力）
+
+    Returns:
+        List[Dict[str, Any]]: 注文のリスト
+    """
+    if path == "-":
+        data = json.load(sys.stdin)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("orders", [data])
+    if not isinstance(data, list):
+        raise ValueError("注文ファイルはオブジェクトか配列にしてください")
+    return data
+
+
+def load_brand_map(path: str) -> Dict[str, str]:
+    """brand_map.json を読み込む（なければ空辞書）"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_cart(order: Dict[str, Any], default_brands: Dict[str, str]) -> Cart:
+    """
+    注文の商品リストから優先ブランドを適用したカートを作る
+
+    Cart.add() は数量を丸めるため、範囲外の数量は丸めずに誤りとして扱う。
+
+    Raises:
+        ValueError: 商品リストが空・形式が不正な場合、同じ商品の合計数量が上限を超える場合
+        pydantic.ValidationError: 商品名・数量が不正な場合
+    """
+    products = order.get("products") or []
+    if not products:
+        raise ValueError("products が空です")
+
+    matcher = BrandMatcher(order.get("brands", default_brands))
+    cart = Cart()
+    for product in products:
+        if isinstance(product, str):
+            name, quantity = product, 1
+        elif isinstance(product, dict):
+            name, quantity = product.get("name", ""), product.get("quantity", 1)
+        else:
+            raise ValueError(f"商品の形式が不正です: {product!r}")
+        display_name, _ = matcher.apply(name.strip())
+        item = ProductInfo(name=display_name, quantity=quantity)
+        current = cart.get(item.name)
+        if current is not None and current.quantity + item.quantity > MAX_QUANTITY:
+            raise ValueError(f"「{item.name}」の合計数量が上限（{MAX_QUANTITY}個）を超えています")
+        cart.add(item.name, item.quantity)
+    return cart
+
+
+def resolve_password(order: Dict[str, Any]) -> str:
+    """password または password_env（環境変数名）からパスワードを得る"""
+    if order.get("password"):
+        return order["password"]
+    env_name = order.get("password_env")
+    if env_name and os.environ.get(env_name):
+        return os.environ[env_name]
+    raise ValueError("password または password_env（設定済みの環境変数名）を指定してください")
+
+
+def prepare_order(
+    order: Dict[str, Any],
+    number: int,
+    default_brands: Dict[str, str],
+) -> Tuple[Optional[OrderRequest], Optional[str]]:
+    """
+    注文内容を検証してスケジューラに渡す注文を作る
+
+    Args:
+        order: 注文内容
+        number: 注文の通し番号（id がない場合の名前に使う）
+        default_brands: brands を省略した注文に使う優先ブランド
+
+    Returns:
+        (注文, None)。注文内容が不正な場合は (None, 理由)
+    """
+    try:
+        cart = build_cart(order, default_brands)
+        link = WebpageInfo(link=order.get("link") or WebpageInfo().link).link
+        aeon_id = order.get("aeon_id") or ""
+        if not aeon_id:
+            raise ValueError("aeon_id を指定してください")
+        password = resolve_password(order)
+    except Exception as e:
+        return None, str(e)
+
+    request = OrderRequest(
+        order_id=str(order.get("id") or f"order-{number}"),
+        link=link,
+        aeon_id=aeon_id,
+        pass_word=password,
+        products=cart.names(),
+        quantities=cart.quantities(),
+    )
+    return request, None
+
+
+def format_result(request: OrderRequest, outcome: Dict[str, Any], prepare_time: float) -> Dict[str, Any]:
+    """スケジューラの結果を出力用の形にする"""
+    return {
+        "id": request.order_id,
+        "result": outcome["result"],
+        "error": outcome["error"],
+        "attempts": outcome["attempts"],
+        "products": [
+            {
+                "name": name,
+                "quantity": request.quantities.get(name, 1),
+                "status": outcome["products"].get(name),
+                "added_at": outcome["product_times"].get(name),
+            }
+            for name in request.products
+        ],
+        "timings": {"prepare": round(prepare_time, 3), **outcome["timings"]},
+        "wall_time": outcome["wall_time"],
+        "queue_time": outcome["queue_time"],
+        "run_time": outcome["run_time"],
+    }
+
+
+def command_order(args: argparse.Namespace) -> int:
+    """order サブコマンド"""
+    started = time.perf_counter()
+    orders = load_orders(args.file)
+    default_brands = load_brand_map(args.brand_map)
+    scheduler = OrderScheduler(
+        max_browsers=args.browsers,
+        max_attempts=args.retries + 1,
+        backoff=args.backoff,
+        order_timeout=args.timeout,
+        headless=args.headless,
+        callback=log,
+    )
+
+    # 受け付けた順に結果を並べる（不正な注文はその場で結果にする）
+    entries = []
+    for number, order in enumerate(orders, 1):
+        prepare_started = time.perf_counter()
+        request, error = prepare_order(order, number, default_brands)
+        if request is None:
+            order_id = str(order.get("id") or f"order-{number}") if isinstance(order, dict) else f"order-{number}"
+            log(f"{order_id}: 注文内容が不正です: {error}")
+            entries.append({"id": order_id, "result": RESULT_INVALID, "error": error, "products": [], "timings": {}})
+            continue
+        entries.append((request, scheduler.submit(request), time.perf_counter() - prepare_started))
+    scheduler.shutdown(wait=True)
+
+    results = [
+        entry if isinstance(entry, dict) else format_result(entry[0], entry[1].result(), entry[2])
+        for entry in entries
+    ]
+    report = {"orders": results, "stats": scheduler.stats(), "elapsed": round(time.perf_counter() - started, 3)}
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0 if all(r["result"] == RESULT_SUCCEEDED for r in results) else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="画面なしでネットスーパーの注文を実行します")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    order_parser = subparsers.add_parser("order", help="注文ファイルの注文を順番に実行する")
+    order_parser.add_argument("file", help="注文ファイル（JSON、- で標準入力）")
+    order_parser.add_argument("--output", "-o", help="結果のJSONを書き込むファイル（省略時は標準出力）")
+    order_parser.add_argument("--headless", action="store_true", help="ブラウザのウィンドウを表示しない")
+    order_parser.add_argument("--timeout", type=float, default=None, help="1回の実行の最大時間（秒）")
+    order_parser.add_argument("--browsers", type=int, default=1,
+                              help="同時に動かすブラウザの数（異なるアカウントの注文を並行して実行する）")
+    order_parser.add_argument("--retries", type=int, default=2, help="失敗した注文を再実行する回数")
+    order_parser.add_argument("--backoff", type=float, default=30.0,
+                              help="1回目の再実行までの待ち時間（秒、再実行のたびに2倍）")
+    order_parser.add_argument("--brand-map", default=os.path.join(os.getcwd(), "brand_map.json"),
+                              help="brands を省略した注文に使うブランドマップ")
+    order_parser.set_defaults(handler=command_order)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,390 @@
+"""
+複数アカウントの注文スケジューラ
+
+複数の世帯（イオンIDの異なるアカウント）の注文をキューで受け付け、同時に動かす
+ブラウザの数を max_browsers 以内に抑えながら並行して実行します。
+
+- アカウントごとに別のブラウザプロフィール（user_data_dir）とブラウザプールを使うため、
+  Cookie やカートが他のアカウントと混ざることはありません
+- 同じアカウントの注文は同時に実行せず、受け付けた順に1件ずつ実行します
+- 失敗した注文は待ち時間を倍々に延ばしながら（指数バックオフ）再実行します。
+  再実行ではカートに追加済みの商品を除き、残りの商品の追加と注文手続きだけを行います。
+  ただし注文手続きを始めた後の失敗・タイムアウトは、注文済みの可能性があるため再実行しません
+- キューの長さ・実行中の数・注文ごとの所要時間を stats() / 結果で確認できます
+- 商品キャッシュ・アクション列・ログイン状態はすべての注文で1つずつを共有します
+  （注文ごとに読み込むと、並行して実行した注文の書き込みが互いに上書きされて失われるため）
+
+ブラウザの数を数えやすくするため、注文は商品ごとの並列追加（parallel）なしで実行し、
+注文が終わるたびにそのアカウントのブラウザを閉じます（ログイン状態はプロフィールに残ります）。
+"""
+
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from action_traces import ActionTraceStore
+from browser_pool import BrowserPool, default_browser_factory
+from login_state import LoginStateCache
+from product_cache import ProductCache
+from shopping_session import ShoppingThread, PRODUCT_ADDED, RESULT_FAILED, RESULT_STOPPED, RESULT_SUCCEEDED
+
+# ShoppingThread の結果以外にスケジューラが返す結果
+RESULT_TIMEOUT = "timeout"  # order_timeout 以内に終わらなかった
+RESULT_CANCELLED = "cancelled"  # 実行前に shutdown された
+
+# 再実行する結果
+RETRYABLE_RESULTS = (RESULT_FAILED, RESULT_TIMEOUT)
+
+
+@dataclass
+class OrderRequest:
+    """
+    スケジューラに渡す注文1件
+
+    Attributes:
+        order_id: 注文の名前（ログと結果に使う）
+        link: ネットスーパーのURL
+        aeon_id: ログインID
+        pass_word: ログインパスワード
+        products: 購入する商品のリスト
+        quantities: 商品名 → 購入数量（ない商品は1個）
+    """
+    order_id: str
+    link: str
+    aeon_id: str
+    pass_word: str
+    products: List[str]
+    quantities: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def account_key(self) -> str:
+        """アカウントを識別するキー（ShoppingThread.account_key と同じ）"""
+        return f"{self.link}|{self.aeon_id}"
+
+
+@dataclass
+class _Job:
+    """キュー内の注文と実行状況"""
+    request: OrderRequest
+    future: Future
+    submitted_at: float
+    not_before: float = 0.0  # 再実行の待ち時間が明ける時刻
+    attempts: int = 0
+    started_at: Optional[float] = None  # 最初の実行を始めた時刻
+    run_seconds: float = 0.0  # 実行にかかった時間の合計（待ち時間を除く）
+    progress: Dict[str, str] = field(default_factory=dict)  # 商品名 → 最新の状態（全実行分）
+    errors: List[str] = field(default_factory=list)
+
+
+class OrderScheduler:
+    """
+    複数アカウントの注文を、ブラウザの数を抑えて並行実行するスケジューラ
+
+    Attributes:
+        max_browsers: 同時に動かすブラウザ（＝同時に実行する注文）の最大数
+        max_attempts: 1件の注文を実行する最大回数（1なら再実行しない）
+        backoff: 1回目の再実行までの待ち時間（秒）
+        backoff_factor: 再実行のたびに待ち時間を何倍にするか
+        order_timeout: 1回の実行の最大時間（秒、Noneなら無制限）
+        headless: ブラウザのウィンドウを表示しないか
+        profile_root: アカウントごとのブラウザプロフィールを置くディレクトリ
+        product_cache: すべての注文で共有する商品キャッシュ
+        trace_store: すべての注文で共有するアクション列の保存先
+        login_state_cache: すべての注文で共有するログイン状態のキャッシュ
+    """
+
+    def __init__(
+        self,
+        max_browsers: int = 2,
+        max_attempts: int = 3,
+        backoff: float = 30.0,
+        backoff_factor: float = 2.0,
+        order_timeout: Optional[float] = None,
+        headless: bool = False,
+        profile_root: Optional[str] = None,
+        stop_grace: float = 60.0,
+        callback: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Args:
+            max_browsers: 同時に動かすブラウザの最大数
+            max_attempts: 1件の注文を実行する最大回数
+            backoff: 1回目の再実行までの待ち時間（秒）
+            backoff_factor: 再実行のたびに待ち時間を何倍にするか
+            order_timeout: 1回の実行の最大時間（秒）
+            headless: ブラウザのウィンドウを表示しないか
+            profile_root: ブラウザプロフィールのディレクトリ（省略時は ./browser_profiles）
+            stop_grace: タイムアウトで停止を要求した後、終了を確認する間隔（秒）。
+                終了するまではブラウザの枠とアカウントを空けない
+            callback: ログメッセージ用のコールバック関数
+        """
+        self.max_browsers = max(1, max_browsers)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.backoff_factor = backoff_factor
+        self.order_timeout = order_timeout
+        self.headless = headless
+        self.profile_root = profile_root or os.path.join(os.getcwd(), "browser_profiles")
+        self.stop_grace = stop_grace
+        self.callback = callback
+        self.product_cache = ProductCache()
+        self.trace_store = ActionTraceStore()
+        self.login_state_cache = LoginStateCache()
+
+        self._condition = threading.Condition()
+        self._pending: List[_Job] = []
+        self._busy_accounts: Set[str] = set()
+        self._in_flight = 0
+        self._pools: Dict[str, BrowserPool] = {}
+        self._dispatcher: Optional[threading.Thread] = None
+        self._closed = False
+        self._completed = 0
+        self._failed = 0
+        self._retries = 0
+        self._wall_times: List[float] = []
+
+    def log(self, message: str) -> None:
+        """ログメッセージをコールバック経由で送信"""
+        if self.callback:
+            self.callback(message)
+
+    # ----------------- 受け付け -----------------
+    def submit(self, request: OrderRequest) -> Future:
+        """
+        注文をキューに入れる
+
+        Args:
+            request: 注文
+
+        Returns:
+            Future: 注文が終わると結果の辞書（result, attempts, wall_time など）が入る
+
+        Raises:
+            RuntimeError: shutdown() の後に呼ばれた場合
+        """
+        job = _Job(request=request, future=Future(), submitted_at=time.perf_counter())
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("スケジューラは終了しています")
+            self._pending.append(job)
+            queued = len(self._pending)
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name="OrderScheduler", daemon=True)
+                self._dispatcher.start()
+            self._condition.notify_all()
+        self.log(f"{request.order_id}: 注文を受け付けました（待ち {queued}件）")
+        return job.future
+
+    def stats(self) -> Dict[str, Any]:
+        """キューの長さ・実行中の数・完了数・平均所要時間"""
+        with self._condition:
+            wall_times = list(self._wall_times)
+            return {
+                "queued": len(self._pending),
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "retries": self._retries,
+                "max_browsers": self.max_browsers,
+                "avg_wall_time": round(sum(wall_times) / len(wall_times), 3) if wall_times else None,
+            }
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """
+        新しい注文の受け付けをやめる
+
+        Args:
+            wait: キューの注文（cancel_pending なら実行中の注文だけ）が終わるまで待つか
+            cancel_pending: まだ始まっていない注文を取り消すか（結果は RESULT_CANCELLED）
+        """
+        with self._condition:
+            self._closed = True
+            cancelled, self._pending = (self._pending, []) if cancel_pending else ([], self._pending)
+            self._condition.notify_all()
+        for job in cancelled:
+            self._resolve(job, {"result": RESULT_CANCELLED, "error": None, "timings": {}})
+
+        if wait and self._dispatcher is not None:
+            self._dispatcher.join()
+
+    # ----------------- 実行 -----------------
+    def _next_ready(self, now: float) -> Optional[_Job]:
+        """待ち時間が明けていて、同じアカウントの注文が実行中でない最も古い注文を取り出す"""
+        for i, job in enumerate(self._pending):
+            if job.not_before <= now and job.request.account_key not in self._busy_accounts:
+                return self._pending.pop(i)
+        return None
+
+    def _dispatch_loop(self) -> None:
+        """空きができるたびに次の注文を実行する（専用スレッド）"""
+        while True:
+            with self._condition:
+                while True:
+                    # 実行中の注文が再実行待ちに戻ることがあるため、それも終わるまで待つ
+                    if self._closed and not self._pending and not self._in_flight:
+                        return
+                    now = time.perf_counter()
+                    job = self._next_ready(now) if self._in_flight < self.max_browsers else None
+                    if job is not None:
+                        break
+                    # 再実行待ちの注文があれば、その時刻まで待つ
+                    waits = [j.not_before - now for j in self._pending if j.not_before > now]
+                    self._condition.wait(min(waits) if waits else None)
+                self._in_flight += 1
+                self._busy_accounts.add(job.request.account_key)
+            threading.Thread(target=self._run_job, args=(job,), name=f"Order-{job.request.order_id}",
+                             daemon=True).start()
+
+    def _run_job(self, job: _Job) -> None:
+        """注文を1回実行し、失敗したら再実行の予約をする（注文ごとのスレッド）"""
+        request = job.request
+        job.attempts += 1
+        if job.started_at is None:
+            job.started_at = time.perf_counter()
+
+        started = time.perf_counter()
+        try:
+            outcome = self._attempt(job)
+        except Exception as e:
+            outcome = {"result": RESULT_FAILED, "error": f"エラーが発生しました: {str(e)}", "timings": {}}
+        job.run_seconds += time.perf_counter() - started
+        if outcome.get("error"):
+            job.errors.append(outcome["error"])
+
+        # 注文手続きを始めた後なら注文済みの可能性があるため、二重注文を避けて再実行しない
+        retryable = outcome["result"] in RETRYABLE_RESULTS
+        if retryable and outcome.get("checkout_started"):
+            self.log(f"{request.order_id}: 注文手続きを始めた後の{outcome['result']}のため再実行しません"
+                     "（注文履歴を確認してください）")
+            retryable = False
+        retry = retryable and job.attempts < self.max_attempts
+        with self._condition:
+            self._in_flight -= 1
+            self._busy_accounts.discard(request.account_key)
+            if retry:
+                delay = self.backoff * self.backoff_factor ** (job.attempts - 1)
+                job.not_before = time.perf_counter() + delay
+                self._pending.append(job)
+                self._retries += 1
+            self._condition.notify_all()
+
+        if retry:
+            self.log(f"{request.order_id}: {outcome['result']}のため{delay:.0f}秒後に再実行します"
+                     f"（{job.attempts}/{self.max_attempts}回目が終了）")
+            return
+        self._resolve(job, outcome)
+
+    def _attempt(self, job: _Job) -> Dict[str, Any]:
+        """ShoppingThread で注文を1回実行する（カートに追加済みの商品は除く）"""
+        request = job.request
+        products = [p for p in request.products if job.progress.get(p) != PRODUCT_ADDED]
+        pool = self._pool_for(request.account_key)
+
+        def order_log(message: str) -> None:
+            self.log(f"{request.order_id}: {message}")
+
+        worker = ShoppingThread(
+            products,
+            request.link,
+            request.aeon_id,
+            request.pass_word,
+            order_log,
+            None,
+            browser_pool=pool,
+            login_state_cache=self.login_state_cache,
+            product_cache=self.product_cache,
+            trace_store=self.trace_store,
+            quantities=request.quantities,
+        )
+        order_log(f"注文を開始します（{len(products)}件、{job.attempts}回目）")
+        worker.start()
+        try:
+            outcome = worker.completion.result(self.order_timeout)
+        except FutureTimeout:
+            # 停止を要求し、ブラウザを返却するまで待つ
+            stop_requested = time.perf_counter()
+            worker.stop()
+            worker.join(self.stop_grace)
+            # まだ動いている間はブラウザを使っているため、枠とアカウントを空けずに終わるまで待つ
+            while worker.is_alive():
+                order_log(f"停止を要求してから{time.perf_counter() - stop_requested:.0f}秒経っても終了しないため、"
+                          "ブラウザの枠を空けずに終了を待っています")
+                worker.join(self.stop_grace)
+            outcome = self._timeout_outcome(worker)
+        finally:
+            # 他のアカウントにブラウザの枠を譲るため、注文ごとに閉じる
+            try:
+                pool.run(pool.close_all())
+            except Exception as e:
+                order_log(f"ブラウザの終了中にエラー: {str(e)}")
+
+        job.progress.update(outcome.get("products", {}))
+        return outcome
+
+    def _timeout_outcome(self, worker: ShoppingThread) -> Dict[str, Any]:
+        """タイムアウトで停止させたワーカーの結果（停止までに終わった商品・注文手続きの開始を含む）"""
+        error = f"{self.order_timeout}秒以内に完了しませんでした"
+        if not worker.completion.done():
+            return {
+                "result": RESULT_TIMEOUT,
+                "error": error,
+                "products": dict(worker.progress),
+                "timings": dict(worker.timings),
+                "product_times": dict(worker.product_times),
+                "checkout_started": worker.checkout_started,
+            }
+        outcome = dict(worker.completion.result())
+        # 停止の要求で終わった場合だけタイムアウトとし、停止前に成功・失敗していればその結果を使う
+        if outcome["result"] == RESULT_STOPPED:
+            outcome.update(result=RESULT_TIMEOUT, error=error)
+        return outcome
+
+    def _resolve(self, job: _Job, outcome: Dict[str, Any]) -> None:
+        """注文の結果を Future に入れる"""
+        now = time.perf_counter()
+        wall_time = now - job.submitted_at
+        with self._condition:
+            if outcome["result"] == RESULT_SUCCEEDED:
+                self._completed += 1
+            elif outcome["result"] != RESULT_CANCELLED:
+                self._failed += 1
+            if job.attempts:
+                self._wall_times.append(wall_time)
+
+        request = job.request
+        job.future.set_result({
+            "id": request.order_id,
+            "result": outcome["result"],
+            "error": outcome.get("error"),
+            "attempts": job.attempts,
+            "errors": job.errors,
+            "products": dict(job.progress),
+            "timings": outcome.get("timings", {}),
+            "product_times": outcome.get("product_times", {}),
+            "wall_time": round(wall_time, 3),
+            "queue_time": round((job.started_at or now) - job.submitted_at, 3),
+            "run_time": round(job.run_seconds, 3),
+        })
+        self.log(f"{request.order_id}: 注文が終了しました: {outcome['result']}"
+                 f"（{job.attempts}回実行、{wall_time:.1f}秒）")
+
+    def _pool_for(self, account_key: str) -> BrowserPool:
+        """アカウント専用のブラウザプール（プロフィールもアカウントごとに分ける）"""
+        with self._condition:
+            pool = self._pools.get(account_key)
+            if pool is None:
+                digest = hashlib.sha256(account_key.encode("utf-8")).hexdigest()[:16]
+                profile = os.path.join(self.profile_root, digest)
+                os.makedirs(profile, exist_ok=True)
+                headless = self.headless
+                pool = BrowserPool(
+                    max_size=1,
+                    browser_factory=lambda: default_browser_factory(headless=headless, user_data_dir=profile),
+                    callback=self.log,
+                )
+                self._pools[account_key] = pool
+            return pool
@@ -0,0 +1,92 @@
+"""
+重いモジュールのバックグラウンド読み込み
+
+browser-use・groq・音声関係のモジュールは読み込みに数百ミリ秒〜1秒以上かかるため、
+起動時には読み込まずに画面を先に表示し、表示後に専用スレッドで順に読み込みます。
+読み込みが終わる前に使われた場合は、その場で読み込まれる（Python のインポートロックで
+二重に読み込まれることはない）ため、待ち時間が短くなるだけで動作は変わりません。
+"""
+
+import importlib
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# (手順名, 読み込み処理)
+Step = Tuple[str, Callable[[], Any]]
+
+
+def import_modules(*names: str) -> Callable[[], None]:
+    """
+    モジュールを順に読み込む手順を作る
+
+    Args:
+        names: モジュール名
+
+    Returns:
+        Callable[[], None]: Prewarmer に渡す読み込み処理
+    """
+    def load() -> None:
+        for name in names:
+            importlib.import_module(name)
+    return load
+
+
+class Prewarmer:
+    """
+    読み込み手順を専用スレッドで順に実行する
+
+    Attributes:
+        steps: 実行する手順（先に必要になるものから並べる）
+        timings: 手順名 → 所要時間（秒）
+        errors: 手順名 → 失敗した理由（未インストールのモジュールなど）
+    """
+
+    def __init__(self, steps: List[Step], callback: Optional[Callable[[str], None]] = None):
+        self.steps = steps
+        self.callback = callback
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+
+    def log(self, message: str) -> None:
+        """ログメッセージをコールバック経由で送信"""
+        if self.callback:
+            self.callback(message)
+
+    @property
+    def done(self) -> bool:
+        """すべての手順が終わったか"""
+        return self._done.is_set()
+
+    def start(self) -> None:
+        """バックグラウンドで読み込みを始める（2回目以降は何もしない）"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="Prewarm", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        すべての手順が終わるのを待つ
+
+        Returns:
+            bool: 終わった場合True
+        """
+        return self._done.wait(timeout)
+
+    def _run(self) -> None:
+        """手順を順に実行する（専用スレッド）"""
+        started = time.perf_counter()
+        for name, step in self.steps:
+            step_started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                self.errors[name] = str(e)
+                self.log(f"{name}の事前読み込みに失敗しました: {str(e)}")
+            self.timings[name] = time.perf_counter() - step_started
+        self._done.set()
+        summary = "、".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.timings.items())
+        self.log(f"バックグラウンドの読み込みが完了しました（{time.perf_counter() - started:.1f}秒: {summary}）")
@@ -0,0 +1,128 @@
+"""
+商品解決キャッシュ
+
+商品名（add_product() でブランドを適用した後の表示名）から、前回エージェントが
+実際にカートに追加した商品ページのURL・商品コードを引けるようにするキャッシュです。
+毎週同じ商品を買う場合、次回からは検索せずに商品ページへ直接移動できます。
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from typing import Dict, Optional
+
+
+def normalize_product_name(name: str) -> str:
+    """
+    キャッシュのキーとして使う商品名の正規化
+
+    全角/半角の揺れ（NFKC）、大文字小文字、空白の揺れを吸収します。
+
+    Args:
+        name: 商品名
+
+    Returns:
+        str: 正規化した商品名
+    """
+    normalized = unicodedata.normalize("NFKC", name).lower()
+    return re.sub(r"\s+", " ", normalized).strip()
+
+
+class ProductCache:
+    """
+    商品名 → 商品ページ（URL・商品コード）の永続キャッシュ
+
+    Attributes:
+        path: キャッシュを保存するJSONファイルのパス
+        ttl: エントリを有効とみなす秒数
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = 30 * 24 * 3600):
+        self.path = path or os.path.join(os.getcwd(), "product_cache.json")
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        """キャッシュファイルを読み込む（なければ空辞書）"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        """キャッシュファイルに保存する（途中で落ちても壊れないよう置き換えで書き込む）"""
+        # 一時ファイル名は書き込みごとに変える（同じファイルを複数のプロセスが保存しても混ざらない）
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def get(self, product: str) -> Optional[Dict]:
+        """
+        商品のキャッシュエントリを取得
+
+        Args:
+            product: 商品名
+
+        Returns:
+            {"name", "url", "sku", "resolved_at"} の辞書。未登録・期限切れの場合はNone
+        """
+        key = normalize_product_name(product)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry.get("resolved_at", 0) > self.ttl:
+                del self._entries[key]
+                self._save()
+                return None
+            return dict(entry)
+
+    def put(self, product: str, url: str, sku: str = "") -> None:
+        """
+        エージェントがカートに追加した商品ページを記録
+
+        Args:
+            product: 商品名
+            url: 商品ページのURL
+            sku: 商品コード（分かる場合）
+        """
+        key = normalize_product_name(product)
+        with self._lock:
+            self._entries[key] = {
+                "name": product,
+                "url": url,
+                "sku": sku,
+                "resolved_at": time.time(),
+            }
+            self._save()
+
+    def invalidate(self, product: str) -> bool:
+        """
+        商品ページが存在しない・在庫切れの場合にエントリを削除
+
+        Args:
+            product: 商品名
+
+        Returns:
+            bool: エントリが存在して削除した場合True
+        """
+        key = normalize_product_name(product)
+        with self._lock:
+            if self._entries.pop(key, None) is None:
+                return False
+            self._save()
+            return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
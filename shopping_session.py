@@ -1,20 +1,54 @@
 import asyncio
+import importlib
 import threading
-import re
-from typing import List, Callable, Optional
-from browser_use import Agent, Browser
-from browser_use import ChatGroq
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Dict, List, Callable, Optional
 from dotenv import load_dotenv
 import os
+import time
+from browser_pool import BrowserPool, get_browser_pool
+from login_state import LoginStateCache, export_browser_state, restore_browser_state
+from product_cache import ProductCache, normalize_product_name
+from action_traces import ActionTraceStore, TraceRecorder, replay_trace
+from context_index import ChatContextIndex
+
+if TYPE_CHECKING:
+    from browser_use import Agent, Tools
 
 load_dotenv()
 
+
+def preload_browser_use() -> None:
+    """
+    browser-use のエージェント・ツール・LLM を読み込んでおく
+
+    browser-use の読み込みには1秒以上かかるため、このモジュールでは実際に使うまで
+    読み込みません。GUI は起動後にバックグラウンドでこの関数を呼んでおきます。
+    """
+    browser_use = importlib.import_module("browser_use")
+    # browser_use は属性を参照したときに読み込むため、使うものを参照しておく
+    for name in ("Agent", "ChatGroq", "Tools"):
+        getattr(browser_use, name)
+
+
+# 商品ごとの進捗（on_progress で通知する状態）
+PRODUCT_ADDED = "added"  # カートに追加した
+PRODUCT_RETRY = "retry"  # 追加に失敗したため注文前にもう一度追加する
+PRODUCT_UNAVAILABLE = "unavailable"  # 商品ページが存在しない・在庫切れ
+
+# 処理全体の結果（on_finished で通知する状態）
+RESULT_SUCCEEDED = "succeeded"
+RESULT_FAILED = "failed"
+RESULT_STOPPED = "stopped"
+
+
 class ShoppingThread(threading.Thread):
     """
     イオンネットスーパーでの買い物を自動化するスレッドクラス
 
     Attributes:
         products: 購入する商品のリスト
+        quantities: 商品名 → 購入数量（ない商品は1個）
         link: ネットスーパーのURL
         aeon_id: ログインID
         pass_word: ログインパスワード
@@ -22,6 +56,23 @@ class ShoppingThread(threading.Thread):
         error_callback: エラーメッセージ用のコールバック関数
         task_prompt: タスクプロンプト
         messages: チャット履歴
+        context_index: チャット履歴の商品コンテキスト索引（messages と共有可能）
+        browser_pool: ブラウザを借りるプール（省略時はプロセス共通のプール）
+        login_state_cache: ログイン状態の暗号化キャッシュ
+        product_cache: 商品名 → 商品ページの解決キャッシュ
+        trace_store: 商品ごとのカート追加アクション列の保存先
+        parallel: 商品ごとに別のブラウザで並列にカートへ追加するかどうか
+        max_concurrency: 並列モードで同時に動かすワーカー用ブラウザの最大数
+            （ワーカーのブラウザもプールから借りるため、プールの上限からメインの1台を除いた数までに抑える）
+        batch_size: 並列モードで1つのエージェントに任せる商品数
+        on_started: 処理開始時に呼ばれる（引数: 商品数）
+        on_progress: 商品の状態が変わるたびに呼ばれる（引数: 商品名, 状態, 追加済みの数, 商品数）
+        on_finished: 処理終了時に呼ばれる（引数: 結果, エラーメッセージ）
+        dispatch: イベントの呼び出しを別スレッドに渡す関数（Tk なら root.after(0, ...) を使う）
+        progress: 商品名 → 最新の状態
+        timings: 手順名 → 所要時間（秒）。product_times は商品名 → 開始からカート追加までの秒数
+        checkout_started: 注文手続きを含むエージェントを実行し始めたか（以降の失敗は注文済みの可能性がある）
+        completion: 処理終了時に結果（result() で結果と商品ごとの状態の辞書）が入る Future
     """
 
     def __init__(
@@ -32,10 +83,23 @@ class ShoppingThread(threading.Thread):
         pass_word: str,
         callback: Optional[Callable[[str], None]],
         error_callback: Optional[Callable[[str], None]],
-        task_prompt: str = ""
+        task_prompt: str = "",
+        browser_pool: Optional[BrowserPool] = None,
+        login_state_cache: Optional[LoginStateCache] = None,
+        product_cache: Optional[ProductCache] = None,
+        trace_store: Optional[ActionTraceStore] = None,
+        parallel: bool = False,
+        max_concurrency: int = 3,
+        batch_size: int = 1,
+        on_started: Optional[Callable[[int], None]] = None,
+        on_progress: Optional[Callable[[str, str, int, int], None]] = None,
+        on_finished: Optional[Callable[[str, Optional[str]], None]] = None,
+        dispatch: Optional[Callable[[Callable[[], None]], Any]] = None,
+        quantities: Optional[Dict[str, int]] = None
     ):
         super().__init__(daemon=True)
         self.products = products
+        self.quantities = {normalize_product_name(name): q for name, q in (quantities or {}).items()}
         self.link = link
         self.aeon_id = aeon_id
         self.pass_word = pass_word
@@ -46,61 +110,248 @@ class ShoppingThread(threading.Thread):
         self.running = True
         self.task_prompt = task_prompt
         self.messages = []
-        self._browser_reference = None
+        self.context_index = ChatContextIndex()
+        self.browser_pool = browser_pool or get_browser_pool()
+        self._lease = None
+        self.login_state_cache = login_state_cache or LoginStateCache()
+        self.product_cache = product_cache or ProductCache()
+        self.trace_store = trace_store or ActionTraceStore()
+        self.tools: Optional["Tools"] = None  # browser-use を読み込むため shopping_task の中で作る
+        self.parallel = parallel
+        self.max_concurrency = max(1, max_concurrency)
+        self.batch_size = max(1, batch_size)
         self.groq_api_key = os.environ.get("GROQ_API_KEY", "")
+        self.on_started = on_started
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.dispatch = dispatch
+        self.progress: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+        self.product_times: Dict[str, float] = {}
+        self._started_at = time.perf_counter()
+        self.completion: Future = Future()
+        self._progress_lock = threading.Lock()
+        self.checkout_started = False
+        self._active_agents: List["Agent"] = []  # 実行中のエージェント（stop() で止める）
 
     def log(self, message: str) -> None:
         """ログメッセージをコールバック経由で送信"""
         if self.callback:
             self.callback(message)
 
+    def _emit(self, handler: Optional[Callable[..., None]], *args) -> None:
+        """イベントを通知する（dispatch があればそのスレッドで呼ぶ）"""
+        if handler is None:
+            return
+
+        def call():
+            try:
+                handler(*args)
+            except Exception as e:
+                self.log(f"イベント処理中にエラー: {str(e)}")
+
+        if self.dispatch:
+            try:
+                self.dispatch(call)
+            except Exception as e:
+                # 画面を閉じた後などは通知できないが、処理は続ける
+                self.log(f"イベントを通知できませんでした: {str(e)}")
+        else:
+            call()
+
+    def report_progress(self, product: str, status: str) -> None:
+        """
+        商品の状態を更新し、変わった場合だけ on_progress で通知する
+
+        Args:
+            product: 商品名（商品リストにないものは無視する）
+            status: PRODUCT_ADDED / PRODUCT_RETRY / PRODUCT_UNAVAILABLE
+        """
+        with self._progress_lock:
+            if product not in self.products or self.progress.get(product) == status:
+                return
+            self.progress[product] = status
+            if status == PRODUCT_ADDED:
+                self.product_times[product] = round(time.perf_counter() - self._started_at, 3)
+            added = sum(1 for s in self.progress.values() if s == PRODUCT_ADDED)
+        self._emit(self.on_progress, product, status, added, len(self.products))
+
+    def _report_all_added(self, products: List[str]) -> None:
+        """エージェントが完了した商品をまとめて追加済みにする"""
+        for product in products:
+            self.report_progress(product, PRODUCT_ADDED)
+
+    def _record_timing(self, step: str, started: float) -> float:
+        """手順の所要時間を timings に記録し、その秒数を返す"""
+        elapsed = time.perf_counter() - started
+        self.timings[step] = round(elapsed, 3)
+        return elapsed
+
+    def _finish(self, result: str, error_msg: Optional[str] = None) -> None:
+        """処理全体の結果を completion と on_finished で通知する"""
+        self._record_timing("total", self._started_at)
+        with self._progress_lock:
+            progress = dict(self.progress)
+            product_times = dict(self.product_times)
+        self.completion.set_result({
+            "result": result,
+            "error": error_msg,
+            "products": progress,
+            "timings": dict(self.timings),
+            "product_times": product_times,
+            "checkout_started": self.checkout_started,
+        })
+        self._emit(self.on_finished, result, error_msg)
+
     def run(self) -> None:
         """スレッドのメイン実行メソッド"""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        self._started_at = time.perf_counter()
+        self._emit(self.on_started, len(self.products))
         try:
-            loop.run_until_complete(self.shopping_task())
+            # ブラウザはプールのイベントループに紐づくため、そこで実行する
+            self.browser_pool.run(self.shopping_task())
         except Exception as e:
             error_msg = f"エラーが発生しました: {str(e)}"
             self.log(error_msg)
             if self.error_callback:
                 self.error_callback(error_msg)
-        finally:
-            # ブラウザを開いたままにする
-            if self.browser:
-                self._browser_reference = self.browser
-                self.log("処理が完了しました。ブラウザは開いたままにしています。")
-            loop.close()
+            self._finish(RESULT_FAILED if self.running else RESULT_STOPPED, error_msg)
+            return
+        self._finish(RESULT_SUCCEEDED if self.running else RESULT_STOPPED)
+
+    def quantity_of(self, product: str) -> int:
+        """商品の購入数量"""
+        return self.quantities.get(normalize_product_name(product), 1)
 
-    def generate_task_prompt(self) -> str:
+    @property
+    def account_key(self) -> str:
+        """ブラウザプールでセッションを識別するキー"""
+        return f"{self.link}|{self.aeon_id}"
+
+    def generate_task_prompt(self, logged_in: bool = False, products: Optional[List[str]] = None) -> str:
         """
         チャット履歴と商品リストからタスクプロンプトを生成
 
+        Args:
+            logged_in: ログイン済みのセッションがある場合はログイン手順を省略する
+                （セッション切れに備えて、ログインを求められた場合のみログインさせる）
+            products: エージェントに任せる商品（省略時は商品リストすべて）
+
         Returns:
             str: 生成されたタスクプロンプト
         """
         # ログイン手順
         prompt = f"""以下の手順を順番に実行してください：
-1. {self.link} にアクセスしてログインしてください（ID: {self.aeon_id}, Password: {self.pass_word}）
+1. {self._login_step(logged_in)}
 """
 
-        # 商品リストの詳細情報を追加
-        for i, product in enumerate(self.products, 2):
-            context = self.get_product_context(product)
-            line = f"{i}. 「{product}」を検索してカートに追加してください。"
-
-            if context:
-                line += f" 補足情報：{context}"
+        products = self.products if products is None else products
 
-            prompt += line + "\n"
+        # 商品リストの詳細情報を追加
+        for i, product in enumerate(products, 2):
+            prompt += f"{i}. {self._product_step(product)}\n"
 
         # 注文手順
-        prompt += f"{len(self.products) + 2}. 注文画面に進み、注文手続きを完了してください。"
+        prompt += f"{len(products) + 2}. 注文画面に進み、注文手続きを完了してください。"
 
         self.task_prompt = prompt
         self.log("タスクプロンプトを生成しました")
         return prompt
 
+    def _login_step(self, logged_in: bool) -> str:
+        """ログイン手順の文言を生成"""
+        if logged_in:
+            return (f"{self.link} にアクセスしてください（ログイン済みです。ログイン画面が表示された場合のみ "
+                    f"ID: {self.aeon_id}, Password: {self.pass_word} でログインしてください）")
+        return f"{self.link} にアクセスしてログインしてください（ID: {self.aeon_id}, Password: {self.pass_word}）"
+
+    def _product_step(self, product: str) -> str:
+        """商品1つ分の「検索してカートに追加」手順の文言を生成"""
+        quantity = self.quantity_of(product)
+        amount = f"{quantity}個" if quantity > 1 else ""
+        cached = self.product_cache.get(product)
+        if cached:
+            # 前回カートに追加した商品ページへ直接移動させる
+            sku = f"（商品コード: {cached['sku']}）" if cached.get("sku") else ""
+            line = (f"「{product}」の商品ページ {cached['url']} {sku}を開いて{amount}カートに追加してください。"
+                    f"ページが存在しない・在庫切れの場合は report_product_unavailable で報告してから、"
+                    f"検索して{amount}カートに追加し record_product_page で記録してください。")
+        else:
+            line = (f"「{product}」を検索して{amount}カートに追加し、追加した商品のページで "
+                    f"record_product_page を呼び出して記録してください。")
+
+        context = self.get_product_context(product)
+        if context:
+            line += f" 補足情報：{context}"
+
+        return line
+
+    def generate_cart_prompt(self, products: List[str]) -> str:
+        """
+        並列モードで1つのエージェントに渡す、カート追加だけのタスクプロンプトを生成
+
+        Args:
+            products: このエージェントが担当する商品
+
+        Returns:
+            str: 生成されたタスクプロンプト
+        """
+        prompt = f"""以下の手順を順番に実行してください：
+1. {self.link} にアクセスしてください（ログイン済みです）
+"""
+        for i, product in enumerate(products, 2):
+            prompt += f"{i}. {self._product_step(product)}\n"
+
+        prompt += "注文手続きには進まず、カートへの追加が終わったら完了してください。"
+        return prompt
+
+    def generate_checkout_prompt(self, logged_in: bool, remaining: List[str]) -> str:
+        """
+        並列モードの最後に実行する注文手続きのタスクプロンプトを生成
+
+        Args:
+            logged_in: ログイン済みのセッションがある場合はログイン手順を省略する
+            remaining: 並列処理でカートに追加できなかった商品（注文前に追加させる）
+
+        Returns:
+            str: 生成されたタスクプロンプト
+        """
+        prompt = f"""以下の手順を順番に実行してください：
+1. {self._login_step(logged_in)}
+"""
+
+        for i, product in enumerate(remaining, 2):
+            prompt += f"{i}. {self._product_step(product)}\n"
+
+        prompt += f"{len(remaining) + 2}. カートを開いて商品が追加されていることを確認し、注文画面に進んで注文手続きを完了してください。"
+        return prompt
+
+    def _create_tools(self) -> "Tools":
+        """商品解決キャッシュを更新するためのカスタムアクションを登録したツールを作成"""
+        from browser_use import BrowserSession, Tools
+
+        tools = Tools()
+        product_cache = self.product_cache
+        log = self.log
+        report_progress = self.report_progress
+
+        @tools.action("カートに追加した商品の商品ページを記録する。product_name には手順に書かれた商品名をそのまま指定し、商品ページを開いた状態で呼び出すこと")
+        async def record_product_page(product_name: str, sku: str, browser_session: BrowserSession):
+            url = await browser_session.get_current_page_url()
+            product_cache.put(product_name, url, sku)
+            log(f"商品ページを記録しました: {product_name} → {url}")
+            report_progress(product_name, PRODUCT_ADDED)
+            return f"「{product_name}」の商品ページを記録しました"
+
+        @tools.action("記録済みの商品ページが存在しない・在庫切れの場合に報告する。product_name には手順に書かれた商品名をそのまま指定すること")
+        async def report_product_unavailable(product_name: str, reason: str):
+            if product_cache.invalidate(product_name):
+                log(f"商品ページのキャッシュを削除しました: {product_name}（{reason}）")
+            report_progress(product_name, PRODUCT_UNAVAILABLE)
+            return f"「{product_name}」を検索し直してください"
+
+        return tools
+
     def get_product_context(self, product: str) -> str:
         """
         商品に関連するチャット履歴のコンテキストを抽出
@@ -111,22 +362,9 @@ class ShoppingThread(threading.Thread):
         Returns:
             str: 抽出されたコンテキスト情報
         """
-        context = []
-        product_keywords = product.lower().split()
-
-        for msg in self.messages:
-            if msg.get("role") not in ["user", "assistant"]:
-                continue
-
-            content = msg.get("content", "").lower()
-
-            # 商品名に関連する会話を検出
-            if any(keyword in content for keyword in product_keywords):
-                # 関連情報を抽出
-                pattern = r'(.*' + re.escape(product) + r'.*(?:がいい|希望|欲しい|推奨|特徴|ブランド).*)'
-                relevant_info = re.findall(pattern, msg["content"], re.IGNORECASE)
-                if relevant_info:
-                    context.extend(relevant_info)
+        # まだ索引に入っていないメッセージだけを追加してから引く
+        self.context_index.sync(self.messages)
+        context = self.context_index.lookup(product)
 
         # 長すぎる場合は短縮
         combined = "; ".join(context)
@@ -139,59 +377,319 @@ class ShoppingThread(threading.Thread):
         """
         メインのショッピングタスクを実行
 
-        ブラウザを起動し、LLMエージェントを初期化して、
+        プールからブラウザを借り、LLMエージェントを初期化して、
         商品の検索・カートへの追加・注文を自動実行します。
         """
-        self.log("ブラウザを起動中...")
+        self.log("ブラウザを準備中...")
 
         try:
-            # ブラウザインスタンス作成
-            self.browser = Browser(
-                disable_security=True,
-                headless=False,
-            )
+            # プールからブラウザを借りる（起動済みなら起動・ログインを省略）
+            started = time.perf_counter()
+            self._lease = await self.browser_pool.acquire(self.account_key)
+            self.browser = self._lease.browser
+            if self._lease.uses > 1:
+                self.log(f"起動済みのブラウザを再利用します ({time.perf_counter() - started:.2f}秒)")
+            else:
+                self.log(f"ブラウザを起動しました ({time.perf_counter() - started:.1f}秒)")
+            self._record_timing("browser", started)
 
             # LLM設定
+            from browser_use import ChatGroq
+
+            if self.tools is None:
+                self.tools = self._create_tools()
             llm = ChatGroq(api_key=self.groq_api_key,
                 model="openai/gpt-oss-120b",
                 temperature=0.2,
             )
 
+            # 保存済みのログイン状態を復元
+            started = time.perf_counter()
+            logged_in = self._lease.logged_in or await self._restore_login_state()
+            self._record_timing("login_restore", started)
+
+            # 記録済みのアクション列がある商品はLLMを使わずに再生（ログイン済みの場合のみ）
+            products = self.products
+            if logged_in:
+                started = time.perf_counter()
+                products = await self._replay_recorded_products(llm)
+                self._record_timing("replay", started)
+
+            if self.parallel and len(products) > 1:
+                await self._parallel_shopping_task(llm, logged_in, products)
+                return
+
             # タスクプロンプト生成
-            task_prompt = self.generate_task_prompt()
-            self.log("イオンネットスーパーにログインして商品を追加します...")
+            task_prompt = self.generate_task_prompt(logged_in=logged_in, products=products)
+            if logged_in:
+                self.log("ログイン済みのセッションで商品を追加します...")
+            else:
+                self.log("イオンネットスーパーにログインして商品を追加します...")
 
             # エージェント初期化（フォールバック機能付き）
             self.agent = await self._initialize_agent(task_prompt, llm)
 
-            # タスク実行
-            await self.agent.run()
+            # タスク実行（このエージェントは注文手続きまで行う）
+            started = time.perf_counter()
+            self.checkout_started = True
+            history = await self._run_agent(self.agent)
+            self._record_timing("agent", started)
+            self._ensure_agent_succeeded(history, "買い物を完了できませんでした")
+            self._lease.logged_in = True
+            if self.running:
+                self._report_all_added(products)
+            await self._save_login_state()
             self.log("すべての処理が完了しました")
 
-            # ブラウザを閉じないように参照を保持
-            self._browser_reference = self.browser
-
         except Exception as e:
             self.log(f"ショッピングタスク中にエラーが発生しました: {str(e)}")
             raise
 
-    async def _initialize_agent(self, task_prompt: str, llm) -> Agent:
+        finally:
+            # ブラウザは開いたままプールに返却する（状態は次回の貸し出し時に確認）
+            if self._lease:
+                await self.browser_pool.release(self._lease)
+                self._lease = None
+                self.log("処理が完了しました。ブラウザは開いたまま次回の注文に備えています。")
+
+    async def _run_agent(self, agent: "Agent"):
+        """
+        エージェントを実行し、商品ごとのアクション列を記録する
+
+        Args:
+            agent: 実行するエージェント
+
+        Returns:
+            AgentHistoryList: エージェントの実行履歴
+        """
+        recorder = TraceRecorder(self.trace_store, secrets=[self.pass_word])
+        self._active_agents.append(agent)
+        try:
+            history = await agent.run(on_step_end=recorder.on_step_end)
+        finally:
+            self._active_agents.remove(agent)
+        recorded = []
+        for product in recorder.recorded:
+            # 数量を変える操作を含む記録は、1個で再生すると数量がずれるため残さない
+            if self.quantity_of(product) > 1:
+                self.trace_store.invalidate(product)
+            else:
+                recorded.append(product)
+        if recorded:
+            self.log(f"次回の再生用にアクションを記録しました: {'、'.join(recorded)}")
+        return history
+
+    def _ensure_agent_succeeded(self, history, failure: str) -> None:
+        """
+        エージェントが完了を報告し、成功したことを確認する
+
+        Args:
+            history: _run_agent() が返した実行履歴
+            failure: エージェントが理由を返さなかった場合のエラーメッセージ
+
+        Raises:
+            RuntimeError: 失敗を報告した（done(success=False)）、またはステップ数の上限・停止などで
+                完了しないまま終わった場合
+        """
+        if history.is_successful() is False:
+            raise RuntimeError(history.final_result() or failure)
+        if not history.is_done():
+            raise RuntimeError(f"{failure}（エージェントが完了しないまま終了しました）")
+
+    async def _replay_recorded_products(self, llm) -> List[str]:
+        """
+        記録済みのアクション列を再生して商品をカートに追加する（LLM呼び出しなし）
+
+        Args:
+            llm: 言語モデル（再生では呼び出さないが、エージェントの作成に必要）
+
+        Returns:
+            List[str]: 再生できずエージェントに任せる商品
+        """
+        from browser_use import Agent
+
+        remaining = []
+        for product in self.products:
+            # 記録は1個ずつの追加なので、2個以上の商品はエージェントに任せる
+            if not self.running or self.quantity_of(product) > 1 or not self.trace_store.has(product):
+                remaining.append(product)
+                continue
+
+            agent = Agent(task=f"「{product}」をカートに追加", llm=llm, browser=self.browser, tools=self.tools)
+            history = self.trace_store.load(product, agent.AgentOutput)
+            if history is None:
+                remaining.append(product)
+                continue
+
+            started = time.perf_counter()
+            try:
+                await self.browser.navigate_to(self.link)
+                await replay_trace(agent, history)
+                self.log(f"記録したアクションを再生して「{product}」をカートに追加しました "
+                         f"({time.perf_counter() - started:.1f}秒、LLM不使用)")
+                self.report_progress(product, PRODUCT_ADDED)
+            except Exception as e:
+                # 画面が変わって再生できない場合は記録を捨ててエージェントで記録し直す
+                self.log(f"「{product}」の再生に失敗したためエージェントで処理します: {str(e)}")
+                self.trace_store.invalidate(product)
+                remaining.append(product)
+        return remaining
+
+    async def _parallel_shopping_task(self, llm, logged_in: bool, products: List[str]) -> None:
+        """
+        商品ごとに別のブラウザでカート追加を並列実行し、最後に注文手続きだけを直列で行う
+
+        ワーカー用のブラウザにはメインのブラウザのログイン状態（Cookie）を
+        コピーするため、すべてのカート追加は同じアカウントのカートに入ります。
+        ワーカー用のブラウザもプールから借りて返すため、プールの上限とヘルスチェックの対象になります。
+
+        Args:
+            llm: 言語モデル
+            logged_in: メインのブラウザがログイン済みかどうか
+            products: カートに追加する商品
+        """
+        # ワーカーにログイン状態を配るため、先にメインのブラウザでログインしておく
+        if not logged_in:
+            self.log("イオンネットスーパーにログインしています...")
+            started = time.perf_counter()
+            self.agent = await self._initialize_agent(self._login_step(False), llm)
+            history = await self._run_agent(self.agent)
+            self._record_timing("login", started)
+            self._ensure_agent_succeeded(history, "ログインできませんでした")
+            self._lease.logged_in = True
+            await self._save_login_state()
+        state = await export_browser_state(self.browser, self.link)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for i in range(0, len(products), self.batch_size):
+            queue.put_nowait(products[i:i + self.batch_size])
+        failed: List[str] = []
+        # メインのブラウザが1台借りているため、ワーカーに使えるのはプールの残りの枠
+        workers = min(self.max_concurrency, queue.qsize(), self.browser_pool.max_size - 1)
+        if workers < 1:
+            self.log("ブラウザプールに空きがないため、商品は注文手続きの中で追加します")
+        else:
+            self.log(f"{len(products)}件の商品を{workers}並列でカートに追加します...")
+
+        async def cart_worker(worker_id: int) -> None:
+            try:
+                lease = await self.browser_pool.acquire(self.account_key)
+            except Exception as e:
+                self.log(f"ワーカー{worker_id}のブラウザ起動に失敗しました: {str(e)}")
+                return
+            try:
+                await restore_browser_state(lease.browser, state)
+                lease.logged_in = True
+            except Exception as e:
+                self.log(f"ワーカー{worker_id}のログイン状態の復元に失敗しました: {str(e)}")
+                await self.browser_pool.release(lease, healthy=False)
+                return
+
+            browser = lease.browser
+            try:
+                while self.running:
+                    try:
+                        batch = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    names = "、".join(batch)
+                    try:
+                        agent = await self._initialize_agent(self.generate_cart_prompt(batch), llm, browser)
+                        history = await self._run_agent(agent)
+                        self._ensure_agent_succeeded(history, "カート追加に失敗しました")
+                        self.log(f"ワーカー{worker_id}: 「{names}」をカートに追加しました")
+                        self._report_all_added(batch)
+                    except Exception as e:
+                        self.log(f"ワーカー{worker_id}: 「{names}」の追加に失敗しました: {str(e)}")
+                        failed.extend(batch)
+                        for product in batch:
+                            self.report_progress(product, PRODUCT_RETRY)
+            finally:
+                # 開いたまま返却する（壊れていれば次の貸し出し時のヘルスチェックで破棄される）
+                await self.browser_pool.release(lease)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(cart_worker(i + 1) for i in range(workers)))
+        self._record_timing("parallel_cart", started)
+
+        # 起動失敗や停止要求で処理されなかった商品も注文前に追加させる
+        while not queue.empty():
+            failed.extend(queue.get_nowait())
+        if not self.running:
+            self.log("停止が要求されたため注文手続きは行いません")
+            return
+
+        # 注文手続きはメインのブラウザで直列に実行
+        if failed:
+            self.log(f"並列で追加できなかった商品を注文前に追加します: {'、'.join(failed)}")
+        self.log("注文手続きを開始します...")
+        started = time.perf_counter()
+        self.agent = await self._initialize_agent(
+            self.generate_checkout_prompt(True, failed), llm
+        )
+        self.checkout_started = True
+        history = await self._run_agent(self.agent)
+        self._record_timing("checkout", started)
+        self._ensure_agent_succeeded(history, "注文手続きを完了できませんでした")
+        if self.running:
+            self._report_all_added(failed)
+        await self._save_login_state()
+        self.log("すべての処理が完了しました")
+
+    async def _restore_login_state(self) -> bool:
+        """
+        キャッシュからログイン状態を復元
+
+        Returns:
+            bool: 有効なログイン状態を復元できた場合True
+        """
+        try:
+            state = await asyncio.to_thread(
+                self.login_state_cache.load, self.link, self.aeon_id, self.pass_word
+            )
+            if not state:
+                return False
+            await restore_browser_state(self.browser, state)
+            self.log("保存済みのログイン状態を復元しました")
+            return True
+        except Exception as e:
+            self.log(f"ログイン状態の復元に失敗しました: {str(e)}")
+            return False
+
+    async def _save_login_state(self) -> None:
+        """現在のログイン状態を暗号化して保存"""
+        try:
+            state = await export_browser_state(self.browser, self.link)
+            await asyncio.to_thread(
+                self.login_state_cache.save, self.link, self.aeon_id, self.pass_word, state
+            )
+            self.log("ログイン状態を保存しました")
+        except Exception as e:
+            self.log(f"ログイン状態の保存に失敗しました: {str(e)}")
+
+    async def _initialize_agent(self, task_prompt: str, llm, browser=None) -> "Agent":
         """
         エージェントを初期化（複数の方法でフォールバック）
 
         Args:
             task_prompt: タスクプロンプト
             llm: 言語モデル
+            browser: 使用するブラウザ（省略時はメインのブラウザ）
 
         Returns:
             Agent: 初期化されたエージェント
         """
+        from browser_use import Agent
+
+        browser = browser or self.browser
+
         # 標準初期化を試行
         try:
             agent = Agent(
                 task=task_prompt,
                 llm=llm,
-                browser=self.browser,
+                browser=browser,
+                tools=self.tools,
                 use_vision=False,
             )
             self.log("エージェント初期化成功")
@@ -204,7 +702,8 @@ class ShoppingThread(threading.Thread):
             agent = Agent(
                 task=task_prompt,
                 llm=llm,
-                browser=self.browser
+                browser=browser,
+                tools=self.tools
             )
             self.log("基本初期化で成功")
             return agent
@@ -216,11 +715,19 @@ class ShoppingThread(threading.Thread):
         """
         ショッピングスレッドを停止
 
+        実行中のエージェント（並列モードのワーカーを含む）にも停止を伝え、
         ブラウザとエージェントをクリーンアップします。
         """
         self.running = False
         self.log("停止を要求されました...")
 
+        # エージェントはプールのイベントループで動いているため、そのループで止める
+        for agent in list(self._active_agents):
+            try:
+                self.browser_pool.loop.call_soon_threadsafe(agent.stop)
+            except Exception as e:
+                self.log(f"エージェントの停止中にエラー: {str(e)}")
+
         try:
             if self.browser:
                 self.log("ブラウザをクリーンアップしています...")
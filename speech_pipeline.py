@@ -0,0 +1,187 @@
+"""
+文単位の音声合成パイプライン
+
+AIの応答を「。」「！」「？」などの文末で区切り、文ごとに音声合成を並行して行いながら、
+合成できたものから順番に再生します。応答全体の合成を待たずに、最初の1文の合成が
+終わった時点で読み上げが始まります。ストリーミング中の応答も断片ごとに渡せます。
+"""
+
+import io
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+# 文末とみなす文字（直後に続く閉じ括弧なども同じ文に含める）
+SENTENCE_END = re.compile(r"[。！？!?\n]+[」』）)]*")
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    文末で区切った文の一覧を返す
+
+    Args:
+        text: 応答本文
+
+    Returns:
+        List[str]: 前後の空白を除いた空でない文
+    """
+    splitter = SentenceSplitter()
+    return splitter.feed(text) + splitter.flush()
+
+
+class SentenceSplitter:
+    """少しずつ届く文字列から、文末まで揃った文を取り出す"""
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """
+        文字列を追加し、完成した文を返す
+
+        Args:
+            text: 応答の断片
+
+        Returns:
+            List[str]: 文末まで揃った文
+        """
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            # 断片の末尾の文末記号は、続きに閉じ括弧が来るかもしれないので次回に回す
+            if match.end() == len(self._buffer) and match.group()[-1] not in "」』）)":
+                break
+            sentence = self._buffer[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """残りの文字列を最後の文として返す"""
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+class SpeechPipeline:
+    """
+    文ごとの合成を並行して行い、応答の順番どおりに再生するパイプライン
+
+    Attributes:
+        first_audio_time: 最初の文を再生に回すまでの秒数（feed/speak 開始から）
+    """
+
+    def __init__(
+        self,
+        synthesize: Callable[[str], io.BytesIO],
+        play: Callable[[io.BytesIO], None],
+        max_workers: int = 3,
+        callback: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Args:
+            synthesize: 1文を合成してWAVデータを返す関数
+            play: WAVデータを再生する関数（再生キューに積むだけでもよい。呼ばれる順番は応答の順番どおり）
+            max_workers: 同時に合成する文の数
+            callback: ログメッセージ用のコールバック関数
+        """
+        self.synthesize = synthesize
+        self.play = play
+        self.callback = callback
+        self.first_audio_time: Optional[float] = None
+
+        self._splitter = SentenceSplitter()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="SpeechSynthesis")
+        self._queue: "queue.Queue[Optional[Future]]" = queue.Queue()
+        self._cancelled = threading.Event()
+        self._started_at: Optional[float] = None
+        self._finished = False
+        self._player = threading.Thread(target=self._play_loop, name="SpeechPlayback", daemon=True)
+        self._player.start()
+
+    def log(self, message: str) -> None:
+        """ログメッセージをコールバック経由で送信"""
+        if self.callback:
+            self.callback(message)
+
+    def feed(self, text: str) -> None:
+        """
+        応答の断片を追加する（文末が揃った文から合成を始める）
+
+        Args:
+            text: 応答の断片
+        """
+        if self._started_at is None:
+            self._started_at = time.perf_counter()
+        for sentence in self._splitter.feed(text):
+            self._submit(sentence)
+
+    def finish(self) -> None:
+        """応答の終わりを通知する（残りの文を合成し、再生が終わったら後片付けする）"""
+        if self._finished:
+            return
+        self._finished = True
+        for sentence in self._splitter.flush():
+            self._submit(sentence)
+        self._queue.put(None)
+        self._executor.shutdown(wait=False)
+
+    def speak(self, text: str) -> None:
+        """応答全体を読み上げる（最後の文を再生に回すまで待つ）"""
+        self.feed(text)
+        self.finish()
+        self.wait()
+
+    @property
+    def done(self) -> bool:
+        """最後の文まで再生に回し終えたか（キャンセルを含む）"""
+        return not self._player.is_alive()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """最後の文を再生に回すまで待つ"""
+        self._player.join(timeout)
+
+    def cancel(self) -> None:
+        """未再生の文を破棄する（再生中の文は最後まで再生される）"""
+        self._cancelled.set()
+        self.finish()
+
+    def _submit(self, sentence: str) -> None:
+        """1文の合成を開始し、再生待ちの列に並べる"""
+        if self._cancelled.is_set():
+            return
+        try:
+            future = self._executor.submit(self.synthesize, sentence)
+        except RuntimeError:
+            # 別スレッドから cancel() されて合成用のスレッドが止められた
+            return
+        self._queue.put(future)
+
+    def _play_loop(self) -> None:
+        """合成結果を順番に待って再生する（専用スレッド）"""
+        while True:
+            future = self._queue.get()
+            if future is None or self._cancelled.is_set():
+                if future is not None:
+                    future.cancel()
+                    continue
+                return
+            try:
+                audio_io = future.result()
+            except Exception as e:
+                self.log(f"音声合成エラー: {str(e)}")
+                continue
+            if self._cancelled.is_set():
+                continue
+            if self.first_audio_time is None and self._started_at is not None:
+                self.first_audio_time = time.perf_counter() - self._started_at
+                self.log(f"読み上げ開始までの時間: {self.first_audio_time:.2f}秒")
+            try:
+                self.play(audio_io)
+            except Exception as e:
+                self.log(f"音声再生エラー: {str(e)}")
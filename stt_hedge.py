@@ -0,0 +1,153 @@
+"""
+複数の音声認識エンジンの並列実行（ヘッジ）
+
+同じ録音を Vosk と Whisper に同時に送り、先に返ってきた空でない結果を使います。
+先に返ったのが優先エンジン（精度の高い方）でなければ、優先エンジンの結果を
+猶予時間（grace）だけ待ちます。どちらかのサーバーが遅い・落ちている場合でも、
+もう一方の速さで結果が得られます。エンジンごとの所要時間と採用率を記録します。
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, Tuple
+
+# エンジン名 → (PCM, サンプリングレート) から認識結果を返す関数
+Engine = Callable[[bytes, int], str]
+
+
+class EngineStats:
+    """エンジンごとの統計"""
+
+    def __init__(self):
+        self.calls = 0
+        self.results = 0  # 空でない結果を返した回数
+        self.wins = 0  # 結果が採用された回数
+        self.total_latency = 0.0  # 結果を返すまでの時間の合計（失敗・空の結果を含む）
+        self.completed = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "results": self.results,
+            "wins": self.wins,
+            "win_rate": self.wins / self.calls if self.calls else 0.0,
+            "avg_latency": self.total_latency / self.completed if self.completed else 0.0,
+        }
+
+
+class HedgedRecognizer:
+    """
+    複数の認識エンジンに同時に送り、最初に得られた結果を返す
+
+    Attributes:
+        engines: エンジン名 → 認識関数
+        preferred: 精度の高いエンジン名（他のエンジンが先に返っても grace 秒だけ待つ）
+        grace: 優先エンジンの結果を待つ猶予（秒）
+        timeout: 全体のタイムアウト（秒）
+    """
+
+    def __init__(
+        self,
+        engines: Dict[str, Engine],
+        preferred: Optional[str] = None,
+        grace: float = 0.3,
+        timeout: float = 15.0,
+        callback: Optional[Callable[[str], None]] = None,
+    ):
+        self.engines = engines
+        self.preferred = preferred
+        self.grace = grace
+        self.timeout = timeout
+        self.callback = callback
+
+        self._lock = threading.Lock()
+        self._stats = {name: EngineStats() for name in engines}
+        self._executor = ThreadPoolExecutor(max_workers=len(engines) * 2, thread_name_prefix="HedgedSTT")
+
+    def log(self, message: str) -> None:
+        """ログメッセージをコールバック経由で送信"""
+        if self.callback:
+            self.callback(message)
+
+    def _run(self, name: str, engine: Engine, pcm: bytes, sample_rate: int) -> Tuple[str, float]:
+        """1つのエンジンで認識し、(結果, 所要時間) を返す（統計も更新する）"""
+        started = time.perf_counter()
+        try:
+            text = engine(pcm, sample_rate) or ""
+        except Exception as e:
+            self.log(f"{name} 認識エラー: {str(e)}")
+            text = ""
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            stats = self._stats[name]
+            stats.completed += 1
+            stats.total_latency += elapsed
+            if text:
+                stats.results += 1
+        return text, elapsed
+
+    def recognize(self, pcm: bytes, sample_rate: int) -> Tuple[str, Optional[str]]:
+        """
+        すべてのエンジンに同時に送り、採用した結果を返す
+
+        Args:
+            pcm: 16bit モノラルの PCM データ
+            sample_rate: サンプリングレート
+
+        Returns:
+            (認識結果, 採用したエンジン名)。どのエンジンも結果を返さなければ ("", None)
+        """
+        started = time.perf_counter()
+        futures = {}
+        with self._lock:
+            for name, engine in self.engines.items():
+                self._stats[name].calls += 1
+                futures[self._executor.submit(self._run, name, engine, pcm, sample_rate)] = name
+
+        best: Optional[Tuple[str, str]] = None
+        best_at: float = 0.0  # best を得た時刻
+        deadline = started + self.timeout
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if best is not None:
+                # 優先エンジン以外の結果が先に出た場合は、猶予時間だけ優先エンジンを待つ
+                remaining = min(remaining, best_at + self.grace - time.perf_counter())
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                name = futures[future]
+                text, _ = future.result()
+                if not text:
+                    continue
+                if name == self.preferred:
+                    best = (text, name)
+                    pending = set()
+                    break
+                if best is None:
+                    best = (text, name)
+                    best_at = time.perf_counter()
+                    if self.preferred not in self.engines:
+                        pending = set()
+                        break
+
+        # 採用しなかったエンジンは待たない（まだ始まっていなければ取り消す）
+        for future in futures:
+            future.cancel()
+
+        if best is None:
+            return "", None
+        text, winner = best
+        with self._lock:
+            self._stats[winner].wins += 1
+        self.log(f"STT（並列）: {winner} を採用（{(time.perf_counter() - started) * 1000:.0f}ms）")
+        return text, winner
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """エンジンごとの統計（呼び出し回数・採用率・平均所要時間）"""
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._stats.items()}
@@ -0,0 +1,158 @@
+"""
+Vosk サーバーへのストリーミング音声認識
+
+録音しながら音声チャンクを WebSocket で Vosk サーバー（vosk-server の
+websocket/asr_server.py）に送り、途中結果（partial）を受け取ります。
+録音が終わった時点でサーバー側の認識はほぼ済んでいるため、最終結果は
+最後のチャンクの処理時間だけで返ってきます。
+
+プロトコル:
+    1. {"config": {"sample_rate": 16000}} を送る
+    2. 16bit モノラルの PCM をバイナリで送る（1チャンクごとに JSON の結果が1つ返る）
+       途中結果は {"partial": "..."}、区切りの確定結果は {"text": "..."}
+    3. {"eof" : 1} を送ると最終結果 {"text": "..."} が返り、接続が閉じられる
+"""
+
+import json
+import threading
+import time
+from typing import Callable, List, Optional
+
+# vosk-server の WebSocket サーバーの既定のURL
+DEFAULT_STREAM_URL = "ws://192.168.1.5:2700"
+
+
+class VoskStreamingClient:
+    """
+    Vosk サーバーに音声を送りながら認識結果を受け取るクライアント
+
+    Attributes:
+        first_partial_time: 接続してから最初の途中結果が届くまでの秒数
+        final_latency: finish() を呼んでから最終結果が届くまでの秒数
+        failed: 音声の送信に失敗したか（以降の音声はサーバーに届いていない）
+    """
+
+    def __init__(
+        self,
+        url: str = DEFAULT_STREAM_URL,
+        sample_rate: int = 16000,
+        on_partial: Optional[Callable[[str], None]] = None,
+        callback: Optional[Callable[[str], None]] = None,
+        open_timeout: float = 3.0,
+    ):
+        """
+        Args:
+            url: Vosk サーバーの WebSocket URL
+            sample_rate: 送る音声のサンプリングレート
+            on_partial: 途中結果（それまでの確定結果を含む）が届くたびに呼ばれる関数
+            callback: ログメッセージ用のコールバック関数
+            open_timeout: 接続のタイムアウト（秒）
+        """
+        self.url = url
+        self.sample_rate = sample_rate
+        self.on_partial = on_partial
+        self.callback = callback
+        self.open_timeout = open_timeout
+        self.first_partial_time: Optional[float] = None
+        self.final_latency: Optional[float] = None
+        self.failed = False
+
+        self._ws = None
+        self._receiver: Optional[threading.Thread] = None
+        self._texts: List[str] = []
+        self._started_at = 0.0
+        self._error: Optional[Exception] = None
+
+    def log(self, message: str) -> None:
+        """ログメッセージをコールバック経由で送信"""
+        if self.callback:
+            self.callback(message)
+
+    def start(self) -> None:
+        """サーバーに接続して認識を始める"""
+        from websockets.sync.client import connect
+
+        self._started_at = time.perf_counter()
+        self._ws = connect(self.url, open_timeout=self.open_timeout, max_size=None)
+        self._ws.send(json.dumps({"config": {"sample_rate": self.sample_rate}}))
+        self._receiver = threading.Thread(target=self._receive_loop, name="VoskStream", daemon=True)
+        self._receiver.start()
+
+    def send(self, chunk: bytes) -> None:
+        """
+        録音した音声チャンクを送る
+
+        送信に失敗しても例外は投げず、failed を立てて以降の送信をやめる
+        （録音は続け、finish() の失敗を受けて録音データ全体をアップロードする）
+
+        Args:
+            chunk: 16bit モノラルの PCM データ
+        """
+        if self._ws is None or self._error is not None or self.failed:
+            return
+        try:
+            self._ws.send(chunk)
+        except Exception as e:
+            self.failed = True
+            self._error = e
+            self.log(f"Vosk ストリーミング: 音声の送信に失敗しました: {str(e)}")
+
+    def finish(self, timeout: float = 5.0) -> str:
+        """
+        音声の終わりを伝えて最終結果を受け取る
+
+        Args:
+            timeout: 最終結果を待つ最大秒数
+
+        Returns:
+            str: 認識結果（スペースを除去したもの）
+
+        Raises:
+            RuntimeError: 接続が切れて結果を受け取れなかった場合、または音声の送信に失敗した場合
+        """
+        if self._ws is None:
+            return ""
+        finished_at = time.perf_counter()
+        try:
+            self._ws.send('{"eof" : 1}')
+        except Exception as e:
+            self._error = self._error or e
+        self._receiver.join(timeout)
+        if self._receiver.is_alive():
+            self.log("Vosk ストリーミング: 最終結果がタイムアウトしました")
+        self.close()
+        self.final_latency = time.perf_counter() - finished_at
+
+        # 送信に失敗した場合は途中までの結果しかないため、録音データ全体で認識し直してもらう
+        if self._error is not None and (self.failed or not self._texts):
+            raise RuntimeError(f"Vosk ストリーミングエラー: {self._error}")
+        return "".join(self._texts)
+
+    def close(self) -> None:
+        """接続を閉じる"""
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+
+    def _receive_loop(self) -> None:
+        """サーバーからの結果を受け取る（専用スレッド）"""
+        try:
+            for message in self._ws:
+                result = json.loads(message)
+                if "partial" in result:
+                    partial = result["partial"].replace(" ", "")
+                    if partial and self.first_partial_time is None:
+                        self.first_partial_time = time.perf_counter() - self._started_at
+                    if partial and self.on_partial:
+                        self.on_partial("".join(self._texts) + partial)
+                elif "text" in result:
+                    text = result["text"].replace(" ", "")
+                    if text:
+                        self._texts.append(text)
+                        if self.on_partial:
+                            self.on_partial("".join(self._texts))
+        except Exception as e:
+            # 正常に閉じられた場合は ConnectionClosedOK でループを抜けるので、ここに来るのは異常時のみ
+            self._error = e
@@ -2,33 +2,124 @@ import io
 import json
 import threading
 from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator
 import requests
-from pydub import AudioSegment
-from pydub.playback import play
-import concurrent
+from requests.adapters import HTTPAdapter
 
 # APIサーバーのエンドポイントURL
 URL = "http://192.168.1.5:10101"
 # 話者ID (話させたい音声モデルidに変更してください)
 speaker = 127206176  # subaru
+# 一括合成で同時に問い合わせる最大数
+MAX_WORKERS = 4
 
+_session = None
+_session_lock = threading.Lock()
 
-def create_synthesis(text: str):
-    params = {"text": text, "speaker": speaker}
-    query_response = requests.post(f"{URL}/audio_query", params=params).json()
 
-    audio_response = requests.post(
-        f"{URL}/synthesis",
-        params={"speaker": speaker},
+def get_session() -> requests.Session:
+    """TTSサーバーへの接続を使い回す共有セッション（keep-alive）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS * 2)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def create_synthesis(
+    text: str, url: str = None, speaker_id: int = None, timeout: float = 30, cache=None, session=None
+):
+    """
+    AivisSpeech サーバーで text を音声合成する
+
+    Args:
+        text: 読み上げる文字列
+        url: サーバーのURL（省略時は URL）
+        speaker_id: 話者ID（省略時は speaker）
+        timeout: 各リクエストのタイムアウト（秒）
+        cache: 合成結果のキャッシュ（TTSCache）。同じ発話はサーバーに問い合わせない
+        session: 使用する requests.Session（省略時は共有セッション）
+
+    Returns:
+        io.BytesIO: WAVデータ
+    """
+    url = url or URL
+    speaker_id = speaker if speaker_id is None else speaker_id
+
+    if cache is not None:
+        return cache.get_or_synthesize(
+            text, speaker_id, url, lambda: create_synthesis(text, url, speaker_id, timeout, session=session)
+        )
+    session = session or get_session()
+
+    params = {"text": text, "speaker": speaker_id}
+    query_response = session.post(f"{url}/audio_query", params=params, timeout=timeout)
+    query_response.raise_for_status()
+
+    audio_response = session.post(
+        f"{url}/synthesis",
+        params={"speaker": speaker_id},
         headers={"accept": "audio/wav", "Content-Type": "application/json"},
-        data=json.dumps(query_response),
+        data=json.dumps(query_response.json()),
+        timeout=timeout,
     )
+    audio_response.raise_for_status()
 
     audio_io = io.BytesIO(audio_response.content)
     return audio_io
 
 
+def synthesize_batch(
+    texts: Iterable[str],
+    url: str = None,
+    speaker_id: int = None,
+    max_workers: int = MAX_WORKERS,
+    cache=None,
+    session=None,
+) -> Iterator[io.BytesIO]:
+    """
+    複数のテキストを並行して合成し、入力の順番どおりに1件ずつ返す
+
+    先頭のテキストの合成が終わった時点で最初の結果を返すため、呼び出し側は残りの合成を
+    待たずに再生を始められます。同じテキストは1回だけ合成します。
+
+    Args:
+        texts: 読み上げるテキストの並び
+        url: サーバーのURL（省略時は URL）
+        speaker_id: 話者ID（省略時は speaker）
+        max_workers: 同時に問い合わせる最大数
+        cache: 合成結果のキャッシュ（TTSCache）
+        session: 使用する requests.Session（省略時は共有セッション）
+
+    Yields:
+        io.BytesIO: 入力の順番どおりのWAVデータ
+    """
+    texts = [str(text) for text in texts]
+    if not texts:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(texts)))) as executor:
+        futures: Dict[str, object] = {}
+        for text in texts:
+            if text not in futures:
+                futures[text] = executor.submit(create_synthesis, text, url, speaker_id, cache=cache, session=session)
+        try:
+            for text in texts:
+                # 同じテキストが複数回あっても読み出し位置が共有されないよう複製して返す
+                yield io.BytesIO(futures[text].result().getvalue())
+        finally:
+            # 途中で打ち切られた場合はまだ始まっていない合成を取り消す
+            for future in futures.values():
+                future.cancel()
+
+
 def playback(end_of_playback, audio_io):
+    from pydub import AudioSegment
+    from pydub.playback import play
+
     wave_file = AudioSegment.from_file(audio_io, format="wav")
     play(wave_file)
     end_of_playback += 1
@@ -36,32 +127,18 @@ def playback(end_of_playback, audio_io):
 
 
 def threading_synthesis(a_dict, end_of_playback):
-    def create_synthesis_and_get_audio_io(text):
-        audio_io = create_synthesis(text)
-        return audio_io
-
-    # １回目の並列処理
-    executor = ThreadPoolExecutor(max_workers=len(a_dict))
-    futures = []
-    for i in range(len(a_dict)):
-        # tts_aivis.py の該当箇所
-        text_key = 'text' + str(i + 1)
-        if text_key in a_dict:
-            future = executor.submit(create_synthesis_and_get_audio_io, str(a_dict[text_key]))
-        # future = executor.submit(create_synthesis_and_get_audio_io, str(a_dict['text' + str(i + 1)]))
-            futures.append(future)
-    audio_ios = [future.result() for future in futures]
-
-    for i in range(len(a_dict)):
-        # 並列処理
-        thread = threading.Thread(
-            target=lambda: create_synthesis_and_get_audio_io(str(a_dict['text' + str(i + 1)])))
-        thread.start()
-    thread.join(5)
-
-    for i, audio_io in enumerate(audio_ios):
-        # 並列処理
-        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
-        executor.submit(end_of_playback)
-        end_of_playback = 0
-        playback(end_of_playback, audio_io)
\ No newline at end of file
+    """
+    {"text1": ..., "text2": ...} の順に合成し、合成できたものから順番に再生する
+
+    Args:
+        a_dict: "text" + 連番 をキーとする読み上げテキストの辞書
+        end_of_playback: 再生済みの件数（再生するたびに加算して返す）
+
+    Returns:
+        int: 再生済みの件数
+    """
+    texts = [a_dict[f"text{i}"] for i in range(1, len(a_dict) + 1) if f"text{i}" in a_dict]
+
+    for audio_io in synthesize_batch(texts):
+        end_of_playback = playback(end_of_playback, audio_io)
+    return end_of_playback
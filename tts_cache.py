@@ -0,0 +1,239 @@
+"""
+音声合成結果のキャッシュ
+
+アシスタントは「〜をリストに追加しました。他に必要な商品はありますか？」のような
+決まった言い回しを何度も話すため、合成したWAVを (正規化したテキスト, 話者ID, サーバーURL)
+をキーに保存し、同じ発話は TTS サーバーに問い合わせずに再生します。
+メモリ上はサイズ上限付きの LRU で保持し、必要ならディスクにも保存します。
+ディスクも合計サイズに上限があり、超えた分は最後に使われたのが古いファイルから削除します。
+"""
+
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+
+def normalize_tts_text(text: str) -> str:
+    """
+    キャッシュのキーとして使う読み上げテキストの正規化
+
+    全角/半角の揺れ（NFKC）と空白の揺れを吸収します（読みが変わりうる大文字小文字はそのまま）。
+
+    Args:
+        text: 読み上げるテキスト
+
+    Returns:
+        str: 正規化したテキスト
+    """
+    normalized = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", normalized).strip()
+
+
+class TTSCache:
+    """
+    合成済みWAVのサイズ上限付き LRU キャッシュ
+
+    Attributes:
+        max_bytes: メモリ上に保持するWAVの合計サイズの上限
+        directory: ディスクに保存するディレクトリ（Noneならメモリのみ）
+        max_disk_bytes: ディスクに保存するWAVの合計サイズの上限
+        hits: メモリまたはディスクから返した回数
+        disk_hits: そのうちディスクから読み込んだ回数
+        misses: 合成が必要だった回数
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 32 * 1024 * 1024,
+        directory: Optional[str] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        # ディスク上のファイル（キー → サイズ、最後に使われた順）。最初にディスクを使うときに読み込む
+        self._disk: Optional["OrderedDict[str, int]"] = None
+        self._disk_size = 0
+
+    @staticmethod
+    def make_key(text: str, speaker_id: int, url: str) -> str:
+        """(正規化したテキスト, 話者ID, サーバーURL) からキャッシュキーを作る"""
+        raw = f"{url.rstrip('/')}\0{speaker_id}\0{normalize_tts_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        """ディスク上のファイルのパス"""
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def get(self, text: str, speaker_id: int, url: str) -> Optional[bytes]:
+        """
+        キャッシュ済みのWAVを取得
+
+        Args:
+            text: 読み上げるテキスト
+            speaker_id: 話者ID
+            url: TTSサーバーのURL
+
+        Returns:
+            WAVデータ。キャッシュになければNone
+        """
+        key = self.make_key(text, speaker_id, url)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        if self.directory:
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+            except OSError:  # 未保存・読み込めない場合は合成し直す
+                data = None
+            if data:
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._store(key, data)
+                    self._touch_disk(key, len(data))
+                return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, text: str, speaker_id: int, url: str, data: bytes) -> None:
+        """
+        合成したWAVを保存
+
+        Args:
+            text: 読み上げたテキスト
+            speaker_id: 話者ID
+            url: TTSサーバーのURL
+            data: WAVデータ
+        """
+        if not data:
+            return
+        key = self.make_key(text, speaker_id, url)
+        with self._lock:
+            self._store(key, data)
+
+        if self.directory:
+            # ディスクに保存できなくても（容量不足・権限など）合成結果はそのまま使う
+            tmp_path = None
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                if tmp_path is not None:
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
+                return
+            with self._lock:
+                self._touch_disk(key, len(data))
+                self._evict_disk()
+
+    def _store(self, key: str, data: bytes) -> None:
+        """メモリに保存し、上限を超えた分を古いものから捨てる（ロック取得済みで呼ぶ）"""
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _load_disk(self) -> "OrderedDict[str, int]":
+        """ディスク上のファイルを更新時刻の古い順に読み込む（ロック取得済みで呼ぶ）"""
+        if self._disk is None:
+            files = []
+            try:
+                with os.scandir(self.directory) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".wav") and entry.is_file():
+                            st = entry.stat()
+                            files.append((st.st_mtime, entry.name[:-len(".wav")], st.st_size))
+            except OSError:
+                pass
+            files.sort()
+            self._disk = OrderedDict((key, size) for _, key, size in files)
+            self._disk_size = sum(self._disk.values())
+        return self._disk
+
+    def _touch_disk(self, key: str, size: int) -> None:
+        """ディスク上のファイルを最後に使われたものとして記録する（ロック取得済みで呼ぶ）"""
+        disk = self._load_disk()
+        self._disk_size += size - disk.pop(key, 0)
+        disk[key] = size
+        try:
+            # 次回起動時の並び順（更新時刻順）にも反映する
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _evict_disk(self) -> None:
+        """ディスクの上限を超えた分を最後に使われたのが古いファイルから削除する（ロック取得済みで呼ぶ）"""
+        disk = self._load_disk()
+        while self._disk_size > self.max_disk_bytes and disk:
+            key, size = disk.popitem(last=False)
+            self._disk_size -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get_or_synthesize(
+        self, text: str, speaker_id: int, url: str, synthesize: Callable[[], io.BytesIO]
+    ) -> io.BytesIO:
+        """
+        キャッシュにあればそれを、なければ合成して保存したものを返す
+
+        Args:
+            text: 読み上げるテキスト
+            speaker_id: 話者ID
+            url: TTSサーバーのURL
+            synthesize: キャッシュにない場合に呼ぶ合成関数
+
+        Returns:
+            io.BytesIO: WAVデータ
+        """
+        data = self.get(text, speaker_id, url)
+        if data is None:
+            data = synthesize().getvalue()
+            self.put(text, speaker_id, url, data)
+        return io.BytesIO(data)
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット数などの統計"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "disk_entries": len(self._disk or ()),
+                "disk_bytes": self._disk_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,148 @@
+"""
+音声区間検出（VAD）による発話終了の判定
+
+マイクから届く16bitの音声チャンクをフレームに分け、フレームごとの音量（RMS）を
+NumPy でまとめて計算します。話し始めた後に一定時間の無音が続いたら発話の終わりと
+判定し、前後の無音を切り落とした音声を返します。固定時間の録音を待たずに
+STT に送れるようにするためのものです。
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+
+class EnergyVAD:
+    """
+    音量ベースの発話区間検出
+
+    雑音レベルは話し始める前のフレームから推定し、その何倍かの音量を発話とみなします。
+
+    Attributes:
+        ended: 発話の終わり（または最大録音時間・無発話タイムアウト）に達したか
+        speech_detected: 発話を検出したか
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        trailing_silence: float = 0.8,
+        max_duration: float = 10.0,
+        no_speech_timeout: float = 5.0,
+        min_speech: float = 0.15,
+        min_rms: float = 300.0,
+        noise_ratio: float = 3.0,
+        padding: float = 0.2,
+    ):
+        """
+        Args:
+            sample_rate: サンプリングレート
+            frame_ms: 判定に使うフレームの長さ（ミリ秒）
+            trailing_silence: 発話の終わりとみなす無音の長さ（秒）
+            max_duration: 最大録音時間（秒）
+            no_speech_timeout: 話し始めないまま録音をやめるまでの時間（秒）
+            min_speech: 発話とみなす最短の連続した有音の長さ（秒。咳や物音を除くため）
+            min_rms: 発話とみなす最小の音量
+            noise_ratio: 雑音レベルの何倍を発話とみなすか
+            padding: 切り落とすときに発話の前後に残す長さ（秒）
+        """
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.frame_sec = self.frame_len / sample_rate
+        self.trailing_frames = max(1, round(trailing_silence / self.frame_sec))
+        self.max_frames = round(max_duration / self.frame_sec)
+        self.no_speech_frames = round(no_speech_timeout / self.frame_sec)
+        self.min_speech_frames = max(1, round(min_speech / self.frame_sec))
+        self.padding_frames = round(padding / self.frame_sec)
+        self.min_rms = min_rms
+        self.noise_ratio = noise_ratio
+
+        self.ended = False
+        self.speech_detected = False
+        self._samples: List[np.ndarray] = []
+        self._remainder = np.zeros(0, dtype=np.int16)
+        self._frames = 0
+        self._noise: Optional[float] = None
+        self._run = 0  # 連続した有音フレーム数
+        self._first_speech: Optional[int] = None
+        self._last_speech: Optional[int] = None
+
+    @property
+    def duration(self) -> float:
+        """判定済みの音声の長さ（秒）"""
+        return self._frames * self.frame_sec
+
+    def process(self, chunk: bytes) -> bool:
+        """
+        録音したチャンクを追加して判定する
+
+        Args:
+            chunk: 16bit モノラルの PCM データ
+
+        Returns:
+            bool: 録音をやめてよい場合True
+        """
+        if self.ended:
+            return True
+
+        samples = np.frombuffer(chunk, dtype=np.int16)
+        self._samples.append(samples)
+        if self._remainder.size:
+            samples = np.concatenate([self._remainder, samples])
+        count = samples.size // self.frame_len
+        self._remainder = samples[count * self.frame_len:]
+        if not count:
+            return False
+
+        frames = samples[:count * self.frame_len].reshape(count, self.frame_len).astype(np.float32)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+
+        for level in rms:
+            self._update(float(level))
+            if self.ended:
+                break
+        return self.ended
+
+    def _update(self, level: float) -> None:
+        """1フレーム分の音量で状態を更新する"""
+        index = self._frames
+        self._frames += 1
+
+        if self._noise is None:
+            # 最初のフレームが発話でも検出できるよう、初期値は min_rms で決まるしきい値を超えない値にする
+            self._noise = min(level, self.min_rms / self.noise_ratio)
+        threshold = max(self.min_rms, self._noise * self.noise_ratio)
+
+        if level >= threshold:
+            self._run += 1
+            if self._run >= self.min_speech_frames:
+                if not self.speech_detected:
+                    self.speech_detected = True
+                    self._first_speech = index - self._run + 1
+                self._last_speech = index
+        else:
+            self._run = 0
+            # 無音のフレームで雑音レベルを追従させる（下がるときはすぐ、上がるときはゆっくり）
+            self._noise = level if level < self._noise else 0.95 * self._noise + 0.05 * level
+
+        if self._frames >= self.max_frames:
+            self.ended = True
+        elif self.speech_detected and index - self._last_speech >= self.trailing_frames:
+            self.ended = True
+        elif not self.speech_detected and self._frames >= self.no_speech_frames:
+            self.ended = True
+
+    def trimmed(self) -> bytes:
+        """
+        前後の無音を切り落とした音声
+
+        Returns:
+            bytes: 16bit モノラルの PCM データ（発話を検出しなかった場合は空）
+        """
+        if not self.speech_detected:
+            return b""
+        audio = np.concatenate(self._samples)
+        start = max(0, self._first_speech - self.padding_frames) * self.frame_len
+        end = min(self._frames, self._last_speech + 1 + self.padding_frames) * self.frame_len
+        return audio[start:end].tobytes()
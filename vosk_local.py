@@ -0,0 +1,224 @@
+"""
+プロセス内の Vosk 音声認識
+
+Vosk のモデルを起動時にバックグラウンドで1回だけ読み込み、録音中の音声チャンクを
+そのまま認識器に渡します。別マシンの STT サーバーへの通信や WAV への変換が不要です。
+モデルの読み込み時間と実時間比（RTF: 認識にかかった時間 / 音声の長さ）を記録します。
+
+モデルは https://alphacephei.com/vosk/models から日本語モデル（vosk-model-small-ja-0.22 など）を
+ダウンロードし、VOSK_MODEL_PATH 環境変数またはカレントディレクトリに置いてください。
+"""
+
+import importlib.util
+import json
+import os
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+DEFAULT_MODEL_PATH = os.environ.get("VOSK_MODEL_PATH", os.path.join(os.getcwd(), "vosk-model-small-ja-0.22"))
+
+
+class LocalVosk:
+    """
+    一度読み込んだ Vosk モデルを使い回すプロセス内の認識エンジン
+
+    Attributes:
+        model_path: モデルのディレクトリ
+        load_time: モデルの読み込みにかかった秒数（読み込み前はNone）
+        audio_seconds: これまでに認識した音声の長さの合計（秒）
+        process_seconds: これまでの認識処理時間の合計（秒）
+    """
+
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH, callback: Optional[Callable[[str], None]] = None):
+        self.model_path = model_path
+        self.callback = callback
+        self.load_time: Optional[float] = None
+        self.audio_seconds = 0.0
+        self.process_seconds = 0.0
+
+        self._model = None
+        self._error: Optional[Exception] = None
+        self._loaded = threading.Event()
+        self._loader: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def log(self, message: str) -> None:
+        """ログメッセージをコールバック経由で送信"""
+        if self.callback:
+            self.callback(message)
+
+    @property
+    def available(self) -> bool:
+        """モデルを読み込めそうか（vosk がインストールされ、モデルのディレクトリがある）"""
+        if importlib.util.find_spec("vosk") is None:
+            return False
+        return os.path.isdir(self.model_path)
+
+    @property
+    def ready(self) -> bool:
+        """モデルの読み込みが終わって使えるか"""
+        return self._model is not None
+
+    @property
+    def real_time_factor(self) -> Optional[float]:
+        """これまでの実時間比（小さいほど速い）"""
+        if not self.audio_seconds:
+            return None
+        return self.process_seconds / self.audio_seconds
+
+    def preload(self) -> None:
+        """バックグラウンドでモデルの読み込みを始める（2回目以降は何もしない）"""
+        with self._lock:
+            if self._loader is not None:
+                return
+            self._loader = threading.Thread(target=self._load, name="VoskModelLoader", daemon=True)
+            self._loader.start()
+
+    def _load(self) -> None:
+        """モデルを読み込む（専用スレッド）"""
+        try:
+            from vosk import Model, SetLogLevel
+
+            SetLogLevel(-1)
+            started = time.perf_counter()
+            self._model = Model(self.model_path)
+            self.load_time = time.perf_counter() - started
+            self.log(f"Vosk モデルを読み込みました（{self.load_time:.1f}秒）")
+        except Exception as e:
+            self._error = e
+            self.log(f"Vosk モデルの読み込みに失敗しました: {str(e)}")
+        finally:
+            self._loaded.set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        モデルの読み込みを待つ（読み込みを始めていなければ始める）
+
+        Returns:
+            bool: 使える状態になった場合True
+        """
+        self.preload()
+        self._loaded.wait(timeout)
+        return self.ready
+
+    def session(self, sample_rate: int = 16000, on_partial: Optional[Callable[[str], None]] = None) -> "LocalVoskSession":
+        """
+        録音1回分の認識セッションを作る
+
+        Raises:
+            RuntimeError: モデルが読み込まれていない場合
+        """
+        if not self.ready:
+            raise RuntimeError(f"Vosk モデルが読み込まれていません: {self._error or '読み込み中'}")
+        return LocalVoskSession(self, sample_rate, on_partial)
+
+    def transcribe(self, pcm: bytes, sample_rate: int = 16000) -> str:
+        """
+        録音済みの音声をまとめて認識する
+
+        Args:
+            pcm: 16bit モノラルの PCM データ
+            sample_rate: サンプリングレート
+
+        Returns:
+            str: 認識結果（スペースを除去したもの）
+        """
+        session = self.session(sample_rate)
+        step = sample_rate // 4 * 2  # 0.25秒ずつ
+        for offset in range(0, len(pcm), step):
+            session.send(pcm[offset:offset + step])
+        return session.finish()
+
+    def _record(self, audio_seconds: float, process_seconds: float) -> None:
+        """RTF の集計"""
+        with self._lock:
+            self.audio_seconds += audio_seconds
+            self.process_seconds += process_seconds
+
+
+class LocalVoskSession:
+    """
+    録音1回分の認識（VoskStreamingClient と同じ start/send/finish で使える）
+
+    send() はすぐに戻り、認識は専用スレッドで順に行います（録音を止めないため）。
+
+    Attributes:
+        final_latency: finish() を呼んでから最終結果が出るまでの秒数
+        real_time_factor: このセッションの実時間比
+    """
+
+    def __init__(self, engine: LocalVosk, sample_rate: int, on_partial: Optional[Callable[[str], None]] = None):
+        from vosk import KaldiRecognizer
+
+        self.engine = engine
+        self.sample_rate = sample_rate
+        self.on_partial = on_partial
+        self.final_latency: Optional[float] = None
+        self.real_time_factor: Optional[float] = None
+
+        self._recognizer = KaldiRecognizer(engine._model, sample_rate)
+        self._texts = []
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._audio_bytes = 0
+        self._process_seconds = 0.0
+        self._worker = threading.Thread(target=self._run, name="VoskLocal", daemon=True)
+        self._worker.start()
+
+    def start(self) -> None:
+        """VoskStreamingClient との互換用（何もしない）"""
+
+    def send(self, chunk: bytes) -> None:
+        """録音した音声チャンクを認識に回す"""
+        self._queue.put(chunk)
+
+    def finish(self, timeout: float = 10.0) -> str:
+        """
+        音声の終わりを伝えて最終結果を受け取る
+
+        Returns:
+            str: 認識結果（スペースを除去したもの）
+        """
+        finished_at = time.perf_counter()
+        self._queue.put(None)
+        self._worker.join(timeout)
+        self.final_latency = time.perf_counter() - finished_at
+
+        audio_seconds = self._audio_bytes / 2 / self.sample_rate
+        if audio_seconds:
+            self.real_time_factor = self._process_seconds / audio_seconds
+        self.engine._record(audio_seconds, self._process_seconds)
+        return "".join(self._texts)
+
+    def close(self) -> None:
+        """認識を打ち切る"""
+        self._queue.put(None)
+
+    def _run(self) -> None:
+        """キューの音声を順に認識する（専用スレッド）"""
+        while True:
+            chunk = self._queue.get()
+            started = time.perf_counter()
+            if chunk is None:
+                result = json.loads(self._recognizer.FinalResult())
+                self._add_text(result.get("text", ""))
+                self._process_seconds += time.perf_counter() - started
+                return
+
+            self._audio_bytes += len(chunk)
+            if self._recognizer.AcceptWaveform(chunk):
+                self._add_text(json.loads(self._recognizer.Result()).get("text", ""))
+            elif self.on_partial:
+                partial = json.loads(self._recognizer.PartialResult()).get("partial", "").replace(" ", "")
+                if partial:
+                    self.on_partial("".join(self._texts) + partial)
+            self._process_seconds += time.perf_counter() - started
+
+    def _add_text(self, text: str) -> None:
+        """区切りの確定結果を追加する"""
+        text = text.replace(" ", "")
+        if text:
+            self._texts.append(text)
+            if self.on_partial:
+                self.on_partial("".join(self._texts))